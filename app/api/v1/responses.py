@@ -0,0 +1,65 @@
+from __future__ import annotations
+import functools
+import inspect
+from typing import Any, Callable, Coroutine
+
+import orjson
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.infra import timing
+
+class TimedRoute(APIRoute):
+    """Records the ``render`` phase for every response, however it is built.
+
+    It runs from the endpoint returning (or a ``FastJSONResponse`` starting to
+    render inside it) until the response is ready to send, so it covers FastAPI's
+    ``response_model`` validation and serialization as well as orjson.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def timed_endpoint(*args: Any, **kw: Any) -> Any:
+                try:
+                    return await endpoint(*args, **kw)
+                finally:
+                    timing.render_started()
+        else:
+            @functools.wraps(endpoint)
+            def timed_endpoint(*args: Any, **kw: Any) -> Any:
+                try:
+                    return endpoint(*args, **kw)
+                finally:
+                    timing.render_started()
+
+        super().__init__(path, timed_endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            try:
+                return await handler(request)
+            finally:
+                timing.render_finished()
+
+        return timed_handler
+
+class FastJSONResponse(Response):
+    """JSON rendered by orjson from plain dicts of already-typed column values.
+
+    Returning a ``Response`` bypasses ``response_model`` validation and serialization,
+    so routes keep ``response_model`` for the OpenAPI schema only. Output is
+    byte-identical to the Pydantic models' ``model_dump_json``.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        timing.render_started()
+        return orjson.dumps(content)
+
+def item_json(item: Any) -> dict[str, Any]:
+    """``ItemOut``-shaped dict from an ``Item`` or an ``(id, name, created_at)`` row."""
+    return {"id": item.id, "name": item.name, "created_at": item.created_at}
@@ -1,25 +1,54 @@
 from __future__ import annotations
+import csv
+import io
 import json
+import time
 from datetime import datetime
+from typing import Literal
 
-from fastapi import APIRouter, Depends, Header, Request, Response, status
-from sqlalchemy.orm import Session
-from sqlalchemy import asc, or_, and_
+import orjson
+from fastapi import APIRouter, Depends, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import asc, bindparam, delete, desc, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.v1.schemas import ItemCreate, ItemOut, ItemListOut, ItemUpdate, ErrorEnvelope
+from app.api.v1.schemas import (
+    ErrorEnvelope,
+    ItemBatchIn,
+    ItemBatchOut,
+    ItemBatchResult,
+    ItemChangesOut,
+    ItemCreate,
+    ItemListOut,
+    ItemOut,
+    ItemUpdate,
+)
+from app.api.v1.responses import FastJSONResponse, TimedRoute, item_json
 from app.domain import errors
-from app.infra.deps import db_session, request_id
+from app.config import settings
+from app.infra.changes import ChangesCompacted, change_notifier, fetch_changes, head_seq, record_changes
+from app.infra.db import stream_partitions
+from app.infra.deps import db_session, deadline_remaining, read_session, request_id
 from app.infra.auth import require_scopes, Principal
 from app.infra.models import Item
-from app.infra.pagination import decode_cursor, encode_cursor
+from app.infra.replicas import read_from_replica
+from app.infra.pagination import NEXT, PREV, decode_cursor, encode_cursor
+from app.infra.search import relevance, search_select, search_terms
+from app.infra.item_cache import CachedItem, etag_for, etag_matches, item_cache
+from app.infra.group_commit import CreateGroupCommitter, create_item_recorded
 from app.infra.idempotency import (
-    get_idempotent_response,
-    store_idempotent_response,
+    add_idempotent_responses,
+    PENDING_STATUS,
+    StoredResponse,
+    get_idempotent_records,
+    reserve_idempotency_key,
     hash_request,
     route_key,
 )
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post(
     "",
@@ -34,10 +63,10 @@ router = APIRouter()
     },
     summary="Create item (idempotent with Idempotency-Key)",
 )
-def create_item(
+async def create_item(
     payload: ItemCreate,
     request: Request,
-    db: Session = Depends(db_session),
+    db: AsyncSession = Depends(db_session),
     principal: Principal = Depends(require_scopes("items:write")),
     idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
 ):
@@ -48,118 +77,575 @@ def create_item(
     rk = route_key("POST", "/v1/items")
     req_hash = hash_request(payload.model_dump())
 
-    replay = get_idempotent_response(
+    async with reserve_idempotency_key(
         db,
         principal_id=principal.subject,
         route_key_value=rk,
         idem_key=idempotency_key,
-        request_hash=req_hash,
+        rid=rid,
+    ) as claim:
+        if claim.replay is not None:
+            return _replay(claim.replay, req_hash, rid)
+        # Item and idempotency record commit together (or not at all)
+        if create_group is not None:
+            stored = await create_group.create(payload.name, claim, req_hash)
+        else:
+            stored = await create_item_recorded(db, payload.name, claim, req_hash, _item_record)
+        if claim.replay is not None:
+            # A concurrent request with the key (another worker) recorded it first
+            return _replay(claim.replay, req_hash, rid)
+    # The recorded bytes, so a later replay is byte-identical
+    return Response(content=stored.body, status_code=stored.status_code, media_type="application/json")
+
+def _replay(stored: StoredResponse, req_hash: str, rid: str) -> Response:
+    if stored.request_hash != req_hash:
+        raise errors.conflict("idempotency key reused with different payload", rid)
+    # Replay original response bytes as stored; no re-validation
+    return Response(content=stored.body, status_code=stored.status_code, media_type="application/json")
+
+def _item_record(row) -> dict:
+    return ItemOut(id=row.id, name=row.name, created_at=row.created_at).model_dump(mode="json")
+
+create_group = (
+    CreateGroupCommitter(
+        settings.ITEMS_GROUP_COMMIT_WINDOW_MS / 1000, settings.ITEMS_GROUP_COMMIT_MAX, _item_record
     )
-    if replay:
-        kind, status_code, body = replay
-        if kind == "IDEMPOTENCY_KEY_REUSED":
-            raise errors.conflict("idempotency key reused with different payload", rid)
-        # Replay original response
-        return ItemOut.model_validate_json(body)
-
-    item = Item(name=payload.name)
-    db.add(item)
-    db.commit()
-    db.refresh(item)
+    if settings.ITEMS_GROUP_COMMIT_WINDOW_MS > 0
+    else None
+)
 
-    out = ItemOut(id=item.id, name=item.name, created_at=item.created_at)
-    store_idempotent_response(
-        db,
-        principal_id=principal.subject,
-        route_key_value=rk,
-        idem_key=idempotency_key,
-        request_hash=req_hash,
-        status_code=201,
-        response_body=out.model_dump(mode="json"),
+def _batch_error(index: int, op: str, err: errors.AppError) -> ItemBatchResult:
+    return ItemBatchResult(
+        index=index,
+        op=op,
+        status=err.http_status,
+        error={"code": err.code, "message": err.message, "request_id": err.request_id},
     )
-    return out
+
+@router.post(
+    ":batch",
+    response_model=ItemBatchOut,
+    responses={
+        401: {"model": ErrorEnvelope},
+        403: {"model": ErrorEnvelope},
+        504: {"model": ErrorEnvelope},
+    },
+    summary="Create/update/delete many items in one transaction",
+)
+async def batch_items(
+    payload: ItemBatchIn,
+    request: Request,
+    db: AsyncSession = Depends(db_session),
+    principal: Principal = Depends(require_scopes("items:write")),
+):
+    rid = request_id(request)
+    # A concurrent single create can claim one of our idempotency keys between the
+    # lookup and the insert; the retry then replays it instead.
+    for attempt in range(2):
+        try:
+            return await _apply_batch(db, payload, principal, rid)
+        except IntegrityError:
+            await db.rollback()
+            if attempt:
+                raise errors.conflict("idempotency key claimed concurrently; retry", rid) from None
+
+async def _apply_batch(
+    db: AsyncSession, payload: ItemBatchIn, principal: Principal, rid: str
+) -> ItemBatchOut:
+    ops = payload.operations
+    items = Item.__table__
+    results: list[ItemBatchResult | None] = [None] * len(ops)
+    changes: list[dict] = []
+    creates: list[int] = []
+    updates: list[int] = []
+    deletes: list[int] = []
+    for i, op in enumerate(ops):
+        if op.op == "create" and (op.name is None or not op.idempotency_key):
+            results[i] = _batch_error(i, op.op, errors.invalid_argument(
+                "create requires name and idempotency_key", rid))
+        elif op.op == "update" and (op.id is None or op.name is None):
+            results[i] = _batch_error(i, op.op, errors.invalid_argument(
+                "update requires id and name", rid))
+        elif op.op == "delete" and op.id is None:
+            results[i] = _batch_error(i, op.op, errors.invalid_argument(
+                "delete requires id", rid))
+        else:
+            {"create": creates, "update": updates, "delete": deletes}[op.op].append(i)
+
+    if creates:
+        rk = route_key("POST", "/v1/items")
+        hashes = {i: hash_request({"name": ops[i].name}) for i in creates}
+        stored = await get_idempotent_records(
+            db,
+            principal_id=principal.subject,
+            route_key_value=rk,
+            idem_keys=list({ops[i].idempotency_key for i in creates}),
+        )
+        fresh: list[int] = []
+        first_use: dict[str, int] = {}
+        duplicates: list[int] = []
+        for i in creates:
+            key = ops[i].idempotency_key
+            rec = stored.get(key)
+            if rec is not None:
+                if rec.status_code == PENDING_STATUS:
+                    results[i] = _batch_error(i, "create", errors.in_progress(
+                        "a request with this idempotency key is still in progress", rid))
+                elif rec.request_hash != hashes[i]:
+                    results[i] = _batch_error(i, "create", errors.conflict(
+                        "idempotency key reused with different payload", rid))
+                else:
+                    item = ItemOut.model_validate_json(rec.response_body)
+                    results[i] = ItemBatchResult(index=i, op="create", status=rec.status_code, item=item)
+            elif key in first_use:
+                duplicates.append(i)
+            else:
+                first_use[key] = i
+                fresh.append(i)
+
+        if fresh:
+            # One multi-VALUES INSERT on the Core table (no ORM bookkeeping per row).
+            # Ids are allocated in VALUES order, so sorting the RETURNING rows by id
+            # restores parameter order (sort_by_parameter_order would fall back to
+            # row-at-a-time inserts on SQLite).
+            rows = sorted(
+                (
+                    await db.execute(
+                        insert(items).returning(items.c.id, items.c.name, items.c.created_at),
+                        [{"name": ops[i].name} for i in fresh],
+                    )
+                ).all(),
+                key=lambda row: row.id,
+            )
+            changes.extend({"item_id": row.id, "op": "create", "name": row.name} for row in rows)
+            records = []
+            for i, row in zip(fresh, rows, strict=True):
+                out = ItemOut(id=row.id, name=row.name, created_at=row.created_at)
+                results[i] = ItemBatchResult(index=i, op="create", status=201, item=out)
+                records.append({
+                    "idem_key": ops[i].idempotency_key,
+                    "request_hash": hashes[i],
+                    "status_code": 201,
+                    "response_body": out.model_dump(mode="json"),
+                })
+            await add_idempotent_responses(
+                db, principal_id=principal.subject, route_key_value=rk, records=records
+            )
+
+        # Repeated key inside the batch: replay the first use, as a retry would
+        for i in duplicates:
+            first = first_use[ops[i].idempotency_key]
+            if hashes[i] != hashes[first]:
+                results[i] = _batch_error(i, "create", errors.conflict(
+                    "idempotency key reused with different payload", rid))
+            else:
+                results[i] = results[first].model_copy(update={"index": i})
+
+    if updates:
+        existing = {
+            item.id: item
+            for item in (
+                await db.execute(select(Item).where(Item.id.in_({ops[i].id for i in updates})))
+            ).scalars()
+        }
+        params = []
+        for i in updates:
+            item = existing.get(ops[i].id)
+            if item is None:
+                results[i] = _batch_error(i, "update", errors.not_found("item not found", rid))
+                continue
+            params.append({"b_id": item.id, "b_name": ops[i].name})
+            changes.append({"item_id": item.id, "op": "update", "name": ops[i].name})
+            out = ItemOut(id=item.id, name=ops[i].name, created_at=item.created_at)
+            results[i] = ItemBatchResult(index=i, op="update", status=200, item=out)
+        if params:
+            # Core executemany, bumping version as an ORM update would (last write wins)
+            await db.execute(
+                update(items)
+                .where(items.c.id == bindparam("b_id"))
+                .values(name=bindparam("b_name"), version=items.c.version + 1),
+                params,
+            )
+
+    if deletes:
+        deleted = (
+            await db.execute(
+                delete(Item).where(Item.id.in_({ops[i].id for i in deletes})).returning(Item.id)
+            )
+        ).scalars()
+        changes.extend({"item_id": item_id, "op": "delete", "name": None} for item_id in deleted)
+        for i in deletes:
+            results[i] = ItemBatchResult(index=i, op="delete", status=204)
+
+    await record_changes(db, changes)
+    await db.commit()
+    if changes:
+        change_notifier.notify()
+    await item_cache.invalidate({ops[i].id for i in updates + deletes})
+    return ItemBatchOut(results=results)
 
 @router.get(
     "",
     response_model=ItemListOut,
-    responses={401: {"model": ErrorEnvelope}, 403: {"model": ErrorEnvelope}, 504: {"model": ErrorEnvelope}},
-    summary="List items (cursor pagination, stable ordering)",
+    responses={
+        400: {"model": ErrorEnvelope},
+        401: {"model": ErrorEnvelope},
+        403: {"model": ErrorEnvelope},
+        504: {"model": ErrorEnvelope},
+    },
+    summary="List or search items (cursor pagination, stable ordering)",
 )
-def list_items(
+async def list_items(
     request: Request,
-    db: Session = Depends(db_session),
+    db: AsyncSession = Depends(read_session),
     principal: Principal = Depends(require_scopes("items:read")),
     limit: int = 25,
     cursor: str | None = None,
+    q: str | None = Query(
+        default=None,
+        max_length=200,
+        description=(
+            "Name search: items with a word starting with each term, newest first; "
+            "each page is ordered tightest match first."
+        ),
+    ),
 ):
     limit = max(1, min(limit, 100))
+    fast = settings.RESPONSE_FAST_PATH
+    rid = request_id(request)
+    if q is not None:
+        return await _search_items(db, q, limit, cursor, fast, rid)
 
-    q = db.query(Item)
-    # Stable ordering: created_at ASC, id ASC
-    q = q.order_by(asc(Item.created_at), asc(Item.id))
+    c = decode_cursor(cursor) if cursor else None
+    if c is not None and c.created_at is None:
+        raise errors.invalid_argument("cursor is from a search; pass the same q", rid)
+    # Fast path reads plain column tuples: no ORM identity map or instance state
+    stmt = select(Item.id, Item.name, Item.created_at) if fast else select(Item)
+    backward = c is not None and c.direction == PREV
 
-    if cursor:
-        c = decode_cursor(cursor)
-        # Return items strictly greater than (created_at, id)
-        q = q.filter(
-            or_(
-                Item.created_at > datetime.fromisoformat(c.created_at),
-                and_(Item.created_at == datetime.fromisoformat(c.created_at), Item.id > c.id),
-            )
-        )
+    if c:
+        # Row-value comparison so the planner seeks on ix_items_created_at_id
+        key = tuple_(Item.created_at, Item.id)
+        bound = (datetime.fromisoformat(c.created_at), c.id)
+        stmt = stmt.where(key < bound if backward else key > bound)
 
-    rows = q.limit(limit + 1).all()
+    # Stable ordering: created_at ASC, id ASC (walked in reverse for a previous page)
+    if backward:
+        stmt = stmt.order_by(desc(Item.created_at), desc(Item.id))
+    else:
+        stmt = stmt.order_by(asc(Item.created_at), asc(Item.id))
+
+    result = await db.execute(stmt.limit(limit + 1))
+    rows = result.all() if fast else result.scalars().all()
+    return _list_page(
+        rows, limit, c, lambda row, direction: encode_cursor(row.created_at.isoformat(), row.id, direction), fast
+    )
+
+async def _search_items(
+    db: AsyncSession, q: str, limit: int, cursor: str | None, fast: bool, rid: str
+) -> Response | ItemListOut:
+    terms = search_terms(q)
+    if not terms:
+        raise errors.invalid_argument("q needs at least one letter or digit", rid)
+    searched = search_select(terms)
+    if searched is None:
+        raise errors.invalid_argument("name search is not available on this database", rid)
+    stmt, key = searched
+    c = decode_cursor(cursor) if cursor else None
+    if c is not None and c.created_at is not None:
+        raise errors.invalid_argument("cursor is from the plain listing; drop it or q", rid)
+    backward = c is not None and c.direction == PREV
+    # Newest match first, keyset on id: pages stay put while items are written
+    if c:
+        stmt = stmt.where(key > c.id if backward else key < c.id)
+    stmt = stmt.order_by(asc(key) if backward else desc(key))
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    return _list_page(
+        rows,
+        limit,
+        c,
+        lambda row, direction: encode_cursor(None, row.id, direction),
+        fast,
+        order=lambda row: (-relevance(row.name, terms), -row.id),
+    )
+
+def _list_page(rows, limit: int, c, cursor_for, fast: bool, order=None) -> Response | ItemListOut:
+    """Page of ``limit + 1`` keyset rows (fetched in walk order) with its cursors;
+    ``order`` sorts the page once its cursors are taken."""
+    backward = c is not None and c.direction == PREV
     has_more = len(rows) > limit
     rows = rows[:limit]
+    if backward:
+        rows.reverse()
 
     next_cursor = None
-    if has_more and rows:
-        last = rows[-1]
-        next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+    prev_cursor = None
+    if rows:
+        # Walking backward we came from the next page, so it always exists
+        has_next = True if backward else has_more
+        has_prev = has_more if backward else c is not None
+        if has_next:
+            next_cursor = cursor_for(rows[-1], NEXT)
+        if has_prev:
+            prev_cursor = cursor_for(rows[0], PREV)
+        if order is not None:
+            rows.sort(key=order)
 
+    if fast:
+        return FastJSONResponse({
+            "items": [item_json(r) for r in rows],
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        })
     return ItemListOut(
         items=[ItemOut(id=r.id, name=r.name, created_at=r.created_at) for r in rows],
         next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
     )
 
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _export_ndjson(rows) -> bytes:
+    return "".join(
+        json.dumps(
+            {
+                "id": r.id,
+                "name": r.name,
+                "created_at": r.created_at.isoformat(),
+                "cursor": encode_cursor(r.created_at.isoformat(), r.id),
+            },
+            separators=(",", ":"),
+        ) + "\n"
+        for r in rows
+    ).encode("utf-8")
+
+def _export_csv(rows) -> bytes:
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    for r in rows:
+        w.writerow([r.id, r.name, r.created_at.isoformat(), encode_cursor(r.created_at.isoformat(), r.id)])
+    return buf.getvalue().encode("utf-8")
+
+@router.get(
+    ":export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "One item per line; each carries an opaque `cursor` to resume after it.",
+            "content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()},
+        },
+        400: {"model": ErrorEnvelope},
+        401: {"model": ErrorEnvelope},
+        403: {"model": ErrorEnvelope},
+    },
+    summary="Stream all items as NDJSON or CSV (resumable via cursor)",
+)
+async def export_items(
+    request: Request,
+    principal: Principal = Depends(require_scopes("items:read")),
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    cursor: str | None = None,
+):
+    rid = request_id(request)
+    q = select(Item.id, Item.name, Item.created_at)
+    if cursor:
+        c = decode_cursor(cursor)
+        if c.direction == PREV:
+            raise errors.invalid_argument("export only resumes forward", rid)
+        if c.created_at is None:
+            raise errors.invalid_argument("cursor is from a search; export resumes from listing cursors", rid)
+        q = q.where(tuple_(Item.created_at, Item.id) > (datetime.fromisoformat(c.created_at), c.id))
+    q = q.order_by(asc(Item.created_at), asc(Item.id))
+
+    encode = _export_csv if fmt == "csv" else _export_ndjson
+
+    async def body():
+        if fmt == "csv" and not cursor:
+            yield b"id,name,created_at,cursor\n"
+        async for rows in stream_partitions(q, settings.ITEMS_EXPORT_CHUNK_ROWS):
+            yield encode(rows)
+
+    # Headers go out before the first row, so the request deadline doesn't cover the body
+    return StreamingResponse(body(), media_type=EXPORT_MEDIA_TYPES[fmt])
+
+# Long-polls answer this long before the request deadline, so they never end in a 504
+CHANGES_DEADLINE_MARGIN_S = 0.25
+
+def _change_json(row) -> dict:
+    return {"seq": row.seq, "item_id": row.item_id, "op": row.op, "name": row.name, "changed_at": row.changed_at}
+
+async def _changes_since(since: int, limit: int, rid: str):
+    try:
+        return await fetch_changes(since, limit)
+    except ChangesCompacted:
+        raise errors.gone("changes since this seq are no longer retained; resync from the list", rid) from None
+
+def _change_event(row) -> bytes:
+    return b"id: %d\nevent: change\ndata: %s\n\n" % (row.seq, orjson.dumps(_change_json(row)))
+
+async def _change_stream(since: int, limit: int, rows, generation: int):
+    """SSE body: the changes already fetched, then each new batch as it commits.
+
+    ``generation`` is the notifier's, read before ``rows`` were fetched.
+    """
+    while True:
+        for row in rows:
+            yield _change_event(row)
+        if rows:
+            since = rows[-1].seq
+        if len(rows) < limit:
+            while not await change_notifier.wait(since, generation, settings.ITEMS_CHANGES_HEARTBEAT_S):
+                if change_notifier.closing:
+                    # Worker draining: the client reconnects with Last-Event-ID
+                    return
+                # Comment line: keeps proxies from closing an idle stream
+                yield b": keepalive\n\n"
+        generation = change_notifier.generation
+        try:
+            rows = await fetch_changes(since, limit)
+        except ChangesCompacted:
+            # Headers are long gone: tell the client to resync, then end the stream
+            yield b"event: reset\ndata: {}\n\n"
+            return
+
+@router.get(
+    "/changes",
+    response_model=ItemChangesOut,
+    responses={
+        200: {
+            "description": "JSON (long-poll), or Server-Sent Events with `Accept: text/event-stream`.",
+            "content": {"text/event-stream": {}},
+        },
+        401: {"model": ErrorEnvelope},
+        403: {"model": ErrorEnvelope},
+        410: {"model": ErrorEnvelope},
+    },
+    summary="Item change feed since a sequence number (long-poll or SSE)",
+)
+async def item_changes(
+    request: Request,
+    principal: Principal = Depends(require_scopes("items:read")),
+    since: int | None = Query(default=None, ge=0, description="Last seq seen; omit to start from now."),
+    limit: int = 100,
+    wait: float = Query(default=0.0, ge=0, description="Seconds to wait for a change if there are none."),
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
+    remaining: float | None = Depends(deadline_remaining),
+):
+    rid = request_id(request)
+    limit = max(1, min(limit, 1000))
+    if "text/event-stream" in request.headers.get("accept", ""):
+        # A reconnecting EventSource resumes from the last event it received
+        if last_event_id and last_event_id.isdigit():
+            since = int(last_event_id)
+        if since is None:
+            since = await head_seq()
+        generation = change_notifier.generation
+        rows = await _changes_since(since, limit, rid)
+        return StreamingResponse(
+            _change_stream(since, limit, rows, generation),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    if since is None:
+        return FastJSONResponse({"changes": [], "next_since": await head_seq()})
+    budget = min(wait, settings.ITEMS_CHANGES_MAX_WAIT_S)
+    if remaining is not None:
+        budget = min(budget, remaining - CHANGES_DEADLINE_MARGIN_S)
+    until = time.monotonic() + budget
+    while True:
+        generation = change_notifier.generation
+        rows = await _changes_since(since, limit, rid)
+        if rows or not await change_notifier.wait(since, generation, until - time.monotonic()):
+            break
+    return FastJSONResponse({
+        "changes": [_change_json(r) for r in rows],
+        "next_since": rows[-1].seq if rows else since,
+    })
+
+def _item_body(item: Item) -> bytes:
+    if settings.RESPONSE_FAST_PATH:
+        return orjson.dumps(item_json(item))
+    return ItemOut(id=item.id, name=item.name, created_at=item.created_at).model_dump_json().encode("utf-8")
+
 @router.get(
     "/{item_id}",
     response_model=ItemOut,
-    responses={404: {"model": ErrorEnvelope}, 401: {"model": ErrorEnvelope}, 403: {"model": ErrorEnvelope}},
+    responses={
+        304: {"description": "Not modified (If-None-Match matched the current ETag)."},
+        404: {"model": ErrorEnvelope},
+        401: {"model": ErrorEnvelope},
+        403: {"model": ErrorEnvelope},
+    },
 )
-def get_item(
+async def get_item(
     item_id: int,
     request: Request,
-    db: Session = Depends(db_session),
+    db: AsyncSession = Depends(read_session),
     principal: Principal = Depends(require_scopes("items:read")),
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
 ):
     rid = request_id(request)
-    item = db.query(Item).filter_by(id=item_id).one_or_none()
-    if not item:
-        raise errors.not_found("item not found", rid)
-    return ItemOut(id=item.id, name=item.name, created_at=item.created_at)
+    cached = item_cache.get(item_id)
+    if cached is None:
+        token = item_cache.fill_token()
+        item = await db.get(Item, item_id)
+        if not item:
+            raise errors.not_found("item not found", rid)
+        cached = CachedItem(etag=etag_for(item.id, item.version), body=_item_body(item))
+        # A lagging replica may return a version older than an invalidation this
+        # worker already applied; only primary reads are cached
+        if not read_from_replica(db):
+            item_cache.put(item_id, cached, token)
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers={"ETag": cached.etag})
+    return Response(content=cached.body, media_type="application/json", headers={"ETag": cached.etag})
 
 @router.put(
     "/{item_id}",
     response_model=ItemOut,
-    responses={404: {"model": ErrorEnvelope}, 401: {"model": ErrorEnvelope}, 403: {"model": ErrorEnvelope}},
-    summary="Update item (idempotent PUT)",
+    responses={
+        404: {"model": ErrorEnvelope},
+        401: {"model": ErrorEnvelope},
+        403: {"model": ErrorEnvelope},
+        409: {"model": ErrorEnvelope},
+        412: {"model": ErrorEnvelope},
+    },
+    summary="Update item (idempotent PUT; If-Match for optimistic concurrency)",
 )
-def update_item(
+async def update_item(
     item_id: int,
     payload: ItemUpdate,
     request: Request,
-    db: Session = Depends(db_session),
+    response: Response,
+    db: AsyncSession = Depends(db_session),
     principal: Principal = Depends(require_scopes("items:write")),
+    if_match: str | None = Header(default=None, alias="If-Match"),
 ):
     rid = request_id(request)
-    item = db.query(Item).filter_by(id=item_id).one_or_none()
+    item = await db.get(Item, item_id)
     if not item:
         raise errors.not_found("item not found", rid)
+    if if_match is not None and not etag_matches(if_match, etag_for(item.id, item.version), weak=False):
+        raise errors.precondition_failed("item has been modified (ETag mismatch)", rid)
     item.name = payload.name
     db.add(item)
-    db.commit()
-    db.refresh(item)
+    await record_changes(db, [{"item_id": item.id, "op": "update", "name": payload.name}])
+    try:
+        # The UPDATE is guarded by the version we read, so a concurrent write fails here
+        await db.commit()
+    except StaleDataError:
+        await db.rollback()
+        if if_match is not None:
+            raise errors.precondition_failed("item has been modified (ETag mismatch)", rid) from None
+        raise errors.conflict("item was modified concurrently; retry", rid) from None
+    change_notifier.notify()
+    await item_cache.invalidate([item_id])
+    await db.refresh(item)
+    etag = etag_for(item.id, item.version)
+    if settings.RESPONSE_FAST_PATH:
+        return FastJSONResponse(item_json(item), headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return ItemOut(id=item.id, name=item.name, created_at=item.created_at)
 
 @router.delete(
@@ -168,14 +654,17 @@ def update_item(
     responses={401: {"model": ErrorEnvelope}, 403: {"model": ErrorEnvelope}, 504: {"model": ErrorEnvelope}},
     summary="Delete item (idempotent DELETE)",
 )
-def delete_item(
+async def delete_item(
     item_id: int,
     request: Request,
-    db: Session = Depends(db_session),
+    db: AsyncSession = Depends(db_session),
     principal: Principal = Depends(require_scopes("items:write")),
 ):
-    item = db.query(Item).filter_by(id=item_id).one_or_none()
+    item = await db.get(Item, item_id)
     if item:
-        db.delete(item)
-        db.commit()
+        await db.delete(item)
+        await record_changes(db, [{"item_id": item_id, "op": "delete", "name": None}])
+        await db.commit()
+        change_notifier.notify()
+        await item_cache.invalidate([item_id])
     return Response(status_code=204)
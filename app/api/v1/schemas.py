@@ -1,8 +1,10 @@
 from __future__ import annotations
 from datetime import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 from pydantic import BaseModel, Field
 
+from app.config import settings
+
 class ErrorEnvelope(BaseModel):
     error: dict = Field(..., examples=[{
         "code": "INVALID_ARGUMENT",
@@ -28,3 +30,50 @@ class ItemListOut(BaseModel):
         description="Opaque cursor for next page (or null).",
         examples=["eyJjcmVhdGVkX2F0IjoiMjAyNi0wMi0wMlQxMDowMDowMFoiLCJpZCI6MTIzfQ"],
     )
+    prev_cursor: Optional[str] = Field(
+        default=None,
+        description="Opaque cursor for previous page (or null on the first page).",
+        examples=["eyJjcmVhdGVkX2F0IjoiMjAyNi0wMi0wMlQxMDowMDowMFoiLCJpZCI6MTAxLCJkaXIiOiJwcmV2In0"],
+    )
+
+class ItemBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = Field(default=None, description="Target item (update/delete).")
+    name: Optional[str] = Field(default=None, min_length=1, max_length=200, examples=["widget"])
+    idempotency_key: Optional[str] = Field(
+        default=None,
+        description="Required for create; shares scope with the Idempotency-Key header.",
+        examples=["ingest-2026-02-02-000123"],
+    )
+
+class ItemBatchIn(BaseModel):
+    operations: List[ItemBatchOperation] = Field(
+        min_length=1,
+        max_length=settings.ITEMS_BATCH_MAX_OPS,
+        description="Applied in one transaction: creates, then updates, then deletes.",
+    )
+
+class ItemBatchResult(BaseModel):
+    index: int = Field(description="Position of the operation in the request.")
+    op: str
+    status: int = Field(description="HTTP status the equivalent single request would return.")
+    item: Optional[ItemOut] = None
+    error: Optional[dict] = Field(default=None, examples=[{
+        "code": "NOT_FOUND",
+        "message": "item not found",
+        "request_id": "req_abc123",
+    }])
+
+class ItemBatchOut(BaseModel):
+    results: List[ItemBatchResult]
+
+class ItemChangeOut(BaseModel):
+    seq: int = Field(description="Position in the change log; resume with since=<seq>.")
+    item_id: int
+    op: Literal["create", "update", "delete"]
+    name: Optional[str] = Field(default=None, description="Name after the change (null for delete).")
+    changed_at: datetime
+
+class ItemChangesOut(BaseModel):
+    changes: List[ItemChangeOut]
+    next_since: int = Field(description="Pass as since= to continue after these changes.")
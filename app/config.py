@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -8,12 +10,145 @@ class Settings(BaseSettings):
     REQUEST_TIMEOUT_MS: int = 8000
 
     DATABASE_URL: str = "sqlite:///./dev.db"
+    # true: AsyncSession on the async driver (aiosqlite/asyncpg) on the event loop
+    # false: sync Session on the threadpool (previous behaviour)
+    DATABASE_ASYNC: bool = True
+    # Per engine (sync and async each have a pool); recycle -1 keeps connections forever
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_S: float = 30.0
+    DB_POOL_RECYCLE_S: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # SQLite connect-time pragmas; "" / 0 leaves the driver default. WAL lets readers
+    # run alongside the writer and NORMAL syncs only at checkpoints.
+    SQLITE_JOURNAL_MODE: Literal["", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] = "WAL"
+    SQLITE_SYNCHRONOUS: Literal["", "OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # Read replicas for read-only item endpoints, used round-robin, e.g.
+    # '["postgresql://replica1/app"]'; writes always go to DATABASE_URL. A principal
+    # reads from the primary for DB_REPLICA_STICKY_S after its last commit (per worker)
+    DATABASE_REPLICA_URLS: list[str] = []
+    DB_REPLICA_STICKY_S: float = 2.0
+    # A replica failing with a connection error is skipped for this long
+    DB_REPLICA_EJECT_S: float = 30.0
+
+    # Redis-protocol server for shared caches across workers (optional)
+    REDIS_URL: str | None = None
+
+    # Item endpoints render plain rows straight to JSON bytes (orjson), skipping ORM
+    # entities and response_model re-validation; false uses the model path
+    RESPONSE_FAST_PATH: bool = True
 
     JWT_ISSUER: str = "fastapi-prod-skeleton"
     JWT_AUDIENCE: str = "fastapi-prod-skeleton"
     JWT_SECRET: str = "change-me"
     JWT_ALGORITHM: str = "HS256"
+    # JWKS file with public keys (by kid) for RS256/ES256; re-read when it changes
+    JWT_KEYS_FILE: str | None = None
+    JWT_KEYS_RELOAD_S: float = 5.0
+    # Verified-token cache entries (0 disables); entries expire at the token's exp
+    JWT_CACHE_SIZE: int = 10_000
+
+    ITEMS_BATCH_MAX_OPS: int = 1000
+    # Rows fetched per server-side cursor round trip (and per streamed chunk) on export
+    ITEMS_EXPORT_CHUNK_ROWS: int = 1000
+    # Group commit: concurrent creates on a worker arriving within this window share one
+    # transaction (up to ITEMS_GROUP_COMMIT_MAX); 0 commits each create on its own
+    ITEMS_GROUP_COMMIT_WINDOW_MS: float = 0.0
+    ITEMS_GROUP_COMMIT_MAX: int = 256
+    # Change feed (GET /v1/items/changes): longest long-poll wait (the request timeout
+    # caps it too), SSE keepalive interval, and how often a worker with waiting readers
+    # checks for changes committed by other workers
+    ITEMS_CHANGES_MAX_WAIT_S: float = 30.0
+    ITEMS_CHANGES_HEARTBEAT_S: float = 15.0
+    ITEMS_CHANGES_POLL_MS: int = 500
+    # Newest changes kept by compaction; readers further behind get 410 and resync
+    ITEMS_CHANGES_RETAIN_ROWS: int = 100_000
+    ITEMS_CHANGES_COMPACT_S: float = 60.0
+
+    # In-process idempotency replay cache in front of Redis/SQL (0 disables)
+    IDEMPOTENCY_CACHE_SIZE: int = 10_000
+    IDEMPOTENCY_CACHE_TTL_S: float = 300.0
+    IDEMPOTENCY_REDIS_TTL_S: float = 86_400.0
+    # Concurrent requests with the same key wait for the first one instead of redoing it.
+    # local: in-process only (single worker); db: pending-row lock; redis: SET NX lock
+    IDEMPOTENCY_LOCK: Literal["local", "db", "redis"] = "local"
+    IDEMPOTENCY_WAIT_MS: int = 5000
+    # A lock older than this is presumed abandoned (crashed worker) and can be taken over
+    IDEMPOTENCY_LOCK_TTL_S: float = 30.0
+    # Records older than this are ignored (the key can be reused) and swept every
+    # IDEMPOTENCY_SWEEP_INTERVAL_S, IDEMPOTENCY_SWEEP_BATCH rows per transaction with
+    # a pause in between so writers aren't held up; 0 keeps records forever
+    IDEMPOTENCY_TTL_S: float = 86_400.0
+    IDEMPOTENCY_SWEEP_INTERVAL_S: float = 60.0
+    IDEMPOTENCY_SWEEP_BATCH: int = 1000
+    IDEMPOTENCY_SWEEP_PAUSE_MS: int = 10
+
+    # Token bucket per principal and route scope: RATE_LIMIT_BURST requests, refilled at
+    # RATE_LIMIT_PER_S. "memory" is per process; "redis" shares buckets across nodes.
+    RATE_LIMIT_BACKEND: Literal["off", "memory", "redis"] = "memory"
+    RATE_LIMIT_BURST: int = 100
+    RATE_LIMIT_PER_S: float = 50.0
+    # Per-scope overrides as [burst, per_s], e.g. '{"items:write": [20, 5]}'
+    RATE_LIMIT_SCOPES: dict[str, tuple[int, float]] = {}
+
+    # Adaptive in-flight limit per worker (AIMD on latency); excess requests queue, reads
+    # ahead of writes, and get a fast 503 when the expected wait exceeds
+    # ADMISSION_MAX_QUEUE_WAIT_MS or the queue is full
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_INITIAL_LIMIT: int = 32
+    ADMISSION_MIN_LIMIT: int = 4
+    ADMISSION_MAX_LIMIT: int = 512
+    # Latency above this multiple of the no-load latency shrinks the limit
+    ADMISSION_LATENCY_TOLERANCE: float = 2.0
+    ADMISSION_MAX_QUEUE_WAIT_MS: int = 1000
+    ADMISSION_MAX_QUEUE: int = 1024
+
+    # Response compression negotiated from Accept-Encoding, in this order of preference
+    # (br and zstd need the brotli / zstandard packages). Complete bodies under
+    # COMPRESSION_MIN_BYTES go out as they are; streams are always compressed.
+    # Per-route-template levels, 0 disabling an encoding for that route. Exports are
+    # large enough that level 1 saves nearly as much for a third of the CPU
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_ENCODINGS: list[str] = ["zstd", "br", "gzip"]
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_LEVELS: dict[str, int] = {"zstd": 3, "br": 4, "gzip": 6}
+    COMPRESSION_ROUTES: dict[str, dict[str, int]] = {"/v1/items:export": {"zstd": 1, "br": 1, "gzip": 1}}
+
+    # Read-through cache for GET /v1/items/{id} (0 disables)
+    ITEM_CACHE_SIZE: int = 10_000
+    ITEM_CACHE_TTL_S: float = 60.0
+
+    # python -m app.serve: imports the app and checks the schema once, then forks
+    # SERVE_WORKERS workers (0: one per CPU core) sharing one listening socket. A worker
+    # is replaced after SERVE_MAX_REQUESTS requests (plus up to 10% jitter, so they
+    # don't all restart at once) or above SERVE_MAX_RSS_MB resident (0 disables either).
+    # On SIGTERM workers stop accepting and get SERVE_GRACEFUL_TIMEOUT_S to finish.
+    SERVE_HOST: str = "127.0.0.1"
+    SERVE_PORT: int = 8000
+    SERVE_WORKERS: int = 0
+    SERVE_MAX_REQUESTS: int = 0
+    SERVE_MAX_RSS_MB: int = 0
+    SERVE_GRACEFUL_TIMEOUT_S: int = 30
+    # Change log compaction and the idempotency sweeper run in this process. app.serve
+    # keeps them to its first worker; with several nodes, leave them on in one only
+    BACKGROUND_JOBS: bool = True
 
     LOG_LEVEL: str = "INFO"
+    # Lines buffered for the background log writer; full buffer drops (0: write inline)
+    LOG_QUEUE_SIZE: int = 10_000
+    # Fraction of successful access logs kept, with per-route-template overrides,
+    # e.g. LOG_SAMPLE_ROUTES='{"/v1/items/{item_id}": 0.01}'. Errors and requests
+    # slower than LOG_SLOW_MS are always logged.
+    LOG_SAMPLE_RATE: float = 1.0
+    LOG_SAMPLE_ROUTES: dict[str, float] = {}
+    LOG_SLOW_MS: int = 500
+    # Per-phase timings (auth, db, idempotency, render) as per-route histograms and a
+    # Server-Timing response header
+    PHASE_TIMING_ENABLED: bool = True
+    # Requests sent with "X-Profile: 1" and a token holding this scope get a sampling
+    # profile of themselves (folded stacks) instead of their response; "" disables
+    PROFILE_SCOPE: str = "debug:profile"
+    PROFILE_INTERVAL_MS: float = 1.0
 
 settings = Settings()
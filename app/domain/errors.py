@@ -1,5 +1,5 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 @dataclass
@@ -8,6 +8,8 @@ class AppError(Exception):
     message: str
     http_status: int = 400
     request_id: str = "unknown"
+    # Extra response headers (e.g. Retry-After)
+    headers: dict[str, str] = field(default_factory=dict)
 
 def with_request_id(err: AppError, request_id: str) -> AppError:
     err.request_id = request_id
@@ -28,3 +30,17 @@ def unauthorized(msg: str, request_id: str) -> AppError:
 
 def invalid_argument(msg: str, request_id: str) -> AppError:
     return AppError(code="INVALID_ARGUMENT", message=msg, http_status=400, request_id=request_id)
+
+def precondition_failed(msg: str, request_id: str) -> AppError:
+    return AppError(code="PRECONDITION_FAILED", message=msg, http_status=412, request_id=request_id)
+
+def gone(msg: str, request_id: str) -> AppError:
+    return AppError(code="GONE", message=msg, http_status=410, request_id=request_id)
+
+def in_progress(msg: str, request_id: str) -> AppError:
+    return AppError(code="IN_PROGRESS", message=msg, http_status=409, request_id=request_id)
+
+def rate_limited(msg: str, request_id: str, headers: dict[str, str]) -> AppError:
+    return AppError(
+        code="RATE_LIMITED", message=msg, http_status=429, request_id=request_id, headers=headers
+    )
@@ -0,0 +1,250 @@
+from __future__ import annotations
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infra import deadline as request_deadline
+from app.infra.metrics import observe_admission_limit, observe_admission_queue, observe_admission_rejection
+from app.infra.middleware import route_template
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# Lower runs first: reads are cheap and usually what a degraded client needs most
+PRIORITY_READ = 0
+PRIORITY_WRITE = 1
+
+def overloaded_body(rid: str) -> bytes:
+    return (
+        f'{{"error": {{"code":"OVERLOADED","message":"server overloaded; retry later",'
+        f'"request_id":"{rid}"}}}}'
+    ).encode("utf-8")
+
+class AdaptiveLimit:
+    """AIMD concurrency limit driven by latency.
+
+    Each route's no-load latency is the lowest seen for it (drifting up slowly so it
+    can re-learn after a real slowdown); comparing against the route's own baseline
+    keeps a mix of fast reads and slow writes from reading as congestion. While the
+    smoothed latency ratio stays within ``tolerance`` and the limit is in use, it grows
+    by about one per limit's worth of requests; above it, or on a failed request, it
+    is cut by ``backoff`` at most once per (smoothed) request latency.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        *,
+        min_limit: int,
+        max_limit: int,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+    ):
+        self.value = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        # Keyed by route template, so bounded like the request metrics
+        self.baselines: dict[str, float] = {}
+        self.ratio = 1.0
+        self.latency = 0.0
+        self._last_decrease = 0.0
+
+    def update(self, route: str, latency_s: float, in_flight: int, failed: bool, now: float) -> None:
+        baseline = self.baselines.get(route)
+        if baseline is None or latency_s < baseline:
+            baseline = latency_s
+        else:
+            baseline += (latency_s - baseline) * 0.0005
+        self.baselines[route] = baseline
+        self.ratio = self.ratio * 0.9 + latency_s / max(baseline, 1e-6) * 0.1
+        self.latency = self.latency * 0.9 + latency_s * 0.1
+
+        if failed or self.ratio > self.tolerance:
+            if now - self._last_decrease >= self.latency:
+                self.value = max(self.min_limit, self.value * self.backoff)
+                self._last_decrease = now
+        elif in_flight >= self.value / 2:
+            self.value = min(self.max_limit, self.value + 1 / self.value)
+
+class AdmissionController:
+    """In-flight limit with a priority wait queue and early rejection.
+
+    A request that can't start immediately waits for a slot, unless the estimated
+    wait (queue position x mean time between completions while saturated) exceeds
+    ``max_wait_s``, or would leave too little of the request deadline for the mean
+    service time, or the queue is full; then it is rejected straight away. Freed slots go to reads
+    first, but a write that has waited half of ``max_wait_s`` goes ahead, so a steady
+    stream of reads can't starve writes.
+    """
+
+    def __init__(self, limit: AdaptiveLimit, *, max_queue: int, max_wait_s: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self.in_flight = 0
+        self.service_s = 0.0
+        # Mean gap between completions while requests were queued (1 / throughput)
+        self.completion_gap_s = 0.0
+        self._last_completion = 0.0
+        # One FIFO per priority: (enqueued_at, future)
+        self._queues: tuple[deque[tuple[float, asyncio.Future]], ...] = (deque(), deque())
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues)
+
+    def estimated_wait(self, priority: int) -> float:
+        ahead = sum(len(q) for q in self._queues[: priority + 1])
+        return (ahead + 1) * self.completion_gap_s
+
+    async def acquire(self, priority: int) -> Optional[str]:
+        """Take a slot; returns the rejection reason instead when shedding."""
+        if self.in_flight < int(self.limit.value) and not self.queued:
+            self.in_flight += 1
+            return None
+        if self.queued >= self.max_queue:
+            return "queue_full"
+        # Time it can queue and still be served before its own deadline
+        budget = self.max_wait_s
+        remaining = request_deadline.remaining()
+        if remaining is not None:
+            budget = min(budget, remaining - self.service_s)
+        if self.estimated_wait(priority) > budget:
+            return "deadline"
+        entry = (time.monotonic(), asyncio.get_running_loop().create_future())
+        queue = self._queues[priority]
+        queue.append(entry)
+        observe_admission_queue(self.queued)
+        try:
+            await asyncio.wait_for(entry[1], budget)
+        except TimeoutError:
+            self._forget(queue, entry)
+            return "timeout"
+        except asyncio.CancelledError:
+            if entry[1].cancelled():
+                self._forget(queue, entry)
+            else:
+                # Handed a slot just as we were cancelled: give it back
+                self.release()
+            raise
+        return None
+
+    @staticmethod
+    def _forget(queue: deque, entry: tuple[float, asyncio.Future]) -> None:
+        # Normally still queued; _next may already have dropped it as done
+        try:
+            queue.remove(entry)
+        except ValueError:
+            pass
+
+    def _next(self) -> Optional[asyncio.Future]:
+        reads, writes = self._queues
+        for q in self._queues:
+            # Cancelled in the same loop iteration, before the waiter could dequeue itself
+            while q and q[0][1].done():
+                q.popleft()
+        if writes and (not reads or time.monotonic() - writes[0][0] >= self.max_wait_s / 2):
+            return writes.popleft()[1]
+        return reads.popleft()[1] if reads else None
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        while self.in_flight < int(self.limit.value) and (fut := self._next()) is not None:
+            self.in_flight += 1
+            fut.set_result(None)
+        observe_admission_queue(self.queued)
+
+    def record(self, route: str, latency_s: float, failed: bool) -> None:
+        now = time.monotonic()
+        self.service_s = latency_s if not self.service_s else self.service_s * 0.9 + latency_s * 0.1
+        if self.queued and self._last_completion:
+            gap = now - self._last_completion
+            self.completion_gap_s = gap if not self.completion_gap_s else self.completion_gap_s * 0.9 + gap * 0.1
+        self._last_completion = now
+        self.limit.update(route, latency_s, self.in_flight, failed, now)
+        observe_admission_limit(self.limit.value)
+
+class AdmissionControlMiddleware:
+    """Pure ASGI load shedding in front of the handlers.
+
+    Sits inside ``RequestContextMiddleware``, so queue time counts against the request
+    deadline and rejections get a request id, access log and metrics. Shed requests
+    get a fast 503 with ``Retry-After`` instead of timing out after the work started.
+    Latency is measured to the first response byte, so long streams don't read as
+    slowness; their slot is held until the body is done.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        exempt_paths: tuple[str, ...] = ("/metrics",),
+    ):
+        self.app = app
+        self.controller = controller
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        priority = PRIORITY_READ if scope["method"] in READ_METHODS else PRIORITY_WRITE
+        reason = await controller.acquire(priority)
+        if reason is not None:
+            observe_admission_rejection(reason)
+            await self._reject(scope, send)
+            return
+
+        start = time.perf_counter()
+        first_byte: Optional[float] = None
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal first_byte, status_code
+            if message["type"] == "http.response.start":
+                first_byte = time.perf_counter()
+                status_code = message["status"]
+            await send(message)
+
+        failed = True
+        try:
+            await self.app(scope, receive, send_wrapper)
+            failed = status_code >= 500
+        finally:
+            end = first_byte if first_byte is not None else time.perf_counter()
+            controller.record(route_template(scope), end - start, failed)
+            controller.release()
+
+    async def _reject(self, scope: Scope, send: Send) -> None:
+        rid = scope.get("state", {}).get("request_id", "unknown")
+        body = overloaded_body(rid)
+        retry_after = max(1, math.ceil(self.controller.service_s * 2))
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def build_admission_controller(
+    *,
+    initial: int,
+    min_limit: int,
+    max_limit: int,
+    tolerance: float,
+    max_queue: int,
+    max_wait_ms: int,
+) -> AdmissionController:
+    limit = AdaptiveLimit(initial, min_limit=min_limit, max_limit=max_limit, tolerance=tolerance)
+    observe_admission_limit(limit.value)
+    return AdmissionController(limit, max_queue=max_queue, max_wait_s=max_wait_ms / 1000)
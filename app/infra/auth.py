@@ -1,13 +1,24 @@
 from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from typing import Callable, Optional
 
 from fastapi import Depends, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import jwt, JWTError
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
 
 from app.config import settings
 from app.domain import errors
+from app.infra import timing
+from app.infra.metrics import observe_token_cache
+from app.infra.rate_limit import enforce_rate_limit
+from app.infra.replicas import bind_principal
 
 bearer = HTTPBearer(auto_error=False)
 
@@ -16,11 +27,136 @@ class Principal:
     subject: str
     scopes: set[str]
 
+class TokenCache:
+    """Bounded LRU of verified principals keyed by token digest.
+
+    Entries are dropped at the token's ``exp``, so a hit never outlives the token and
+    skips signature verification and claims checks entirely.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[Principal, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[Principal]:
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[key]
+                observe_token_cache("eviction")
+                entry = None
+            if entry is None:
+                observe_token_cache("miss")
+                return None
+            self._entries.move_to_end(key)
+        observe_token_cache("hit")
+        return entry[0]
+
+    def put(self, token: str, principal: Principal, exp: float) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[self.key(token)] = (principal, exp)
+            evicted = 0
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            observe_token_cache("eviction", evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class KeySet:
+    """Public verification keys indexed by ``kid``, loaded from a local JWKS file.
+
+    The file's mtime is checked at most every ``reload_s`` seconds (and on an unknown
+    ``kid``), so rotating keys only needs the file to be replaced.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        algorithm: str,
+        reload_s: float = 5.0,
+        on_reload: Callable[[], None] | None = None,
+    ):
+        self.path = path
+        self.algorithm = algorithm
+        self.reload_s = reload_s
+        self.on_reload = on_reload
+        self._keys: dict[str, Key] = {}
+        self._mtime: float | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def get(self, kid: str | None) -> Optional[Key]:
+        if time.monotonic() - self._checked_at >= self.reload_s:
+            self.reload()
+        key = self._keys.get(kid)
+        if key is None:
+            self.reload()
+            key = self._keys.get(kid)
+        return key
+
+    def reload(self) -> None:
+        with self._lock:
+            self._checked_at = time.monotonic()
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            with open(self.path, encoding="utf-8") as f:
+                jwks = json.load(f)
+            self._keys = {
+                k["kid"]: jwk.construct(k, k.get("alg", self.algorithm)) for k in jwks["keys"]
+            }
+            self._mtime = mtime
+        if self.on_reload:
+            # Rotated-out keys must stop authenticating cached tokens
+            self.on_reload()
+
+token_cache = TokenCache(settings.JWT_CACHE_SIZE)
+_keyset: KeySet | None = None
+
+def get_keyset() -> KeySet:
+    global _keyset
+    if _keyset is None or _keyset.path != settings.JWT_KEYS_FILE:
+        if not settings.JWT_KEYS_FILE:
+            raise JWTError(f"JWT_KEYS_FILE required for {settings.JWT_ALGORITHM}")
+        _keyset = KeySet(
+            settings.JWT_KEYS_FILE,
+            algorithm=settings.JWT_ALGORITHM,
+            reload_s=settings.JWT_KEYS_RELOAD_S,
+            on_reload=token_cache.clear,
+        )
+    return _keyset
+
+def verification_key(token: str):
+    if settings.JWT_ALGORITHM.startswith("HS"):
+        return settings.JWT_SECRET
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = get_keyset().get(kid)
+    if key is None:
+        raise JWTError("unknown kid")
+    return key
+
 def decode_token(token: str) -> Principal:
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     try:
         payload = jwt.decode(
             token,
-            settings.JWT_SECRET,
+            verification_key(token),
             algorithms=[settings.JWT_ALGORITHM],
             audience=settings.JWT_AUDIENCE,
             issuer=settings.JWT_ISSUER,
@@ -29,29 +165,39 @@ def decode_token(token: str) -> Principal:
         scopes = set(payload.get("scopes", []))
         if not sub:
             raise ValueError("missing sub")
-        return Principal(subject=sub, scopes=scopes)
+        principal = Principal(subject=sub, scopes=scopes)
     except (JWTError, ValueError) as e:
         raise e
+    # Tokens without exp are never cached
+    if "exp" in payload:
+        token_cache.put(token, principal, float(payload["exp"]))
+    return principal
 
-def get_principal(
+async def get_principal(
     request: Request, creds: Optional[HTTPAuthorizationCredentials] = Depends(bearer)
 ) -> Principal:
     rid = getattr(request.state, "request_id", "unknown")
     if not creds:
         raise errors.unauthorized("missing bearer token", rid)
     try:
-        return decode_token(creds.credentials)
+        with timing.phase("auth"):
+            return decode_token(creds.credentials)
     except Exception:
         raise errors.unauthorized("invalid token", rid)
 
 def require_scopes(*required: str):
     required_set = set(required)
+    # Rate-limit bucket per principal and scope set, e.g. "items:read"
+    bucket = ",".join(sorted(required_set))
 
-    def _dep(principal: Principal = Depends(get_principal), request: Request = None) -> Principal:
+    async def _dep(principal: Principal = Depends(get_principal), request: Request = None) -> Principal:
         # request is injected by FastAPI if included; tolerate None for tests
         rid = getattr(getattr(request, "state", None), "request_id", "unknown")
         if not required_set.issubset(principal.scopes):
             raise errors.forbidden("insufficient scope", rid)
+        await enforce_rate_limit(principal.subject, bucket, rid)
+        # Read-your-writes routing (see app.infra.replicas)
+        bind_principal(principal.subject)
         return principal
 
     return _dep
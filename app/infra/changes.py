@@ -0,0 +1,153 @@
+from __future__ import annotations
+import asyncio
+import contextvars
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import Row, delete, func, insert, make_url, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.infra.db import session_scope
+from app.infra.metrics import observe_change_waiters, observe_changes_compacted
+from app.infra.models import ItemChange
+from app.logging import log
+
+logger = log()
+
+# Key of the Postgres advisory lock serializing outbox writers
+CHANGES_LOCK_KEY = 0x6974656D
+_POSTGRES = make_url(settings.DATABASE_URL).get_backend_name() == "postgresql"
+
+async def record_changes(db: AsyncSession, changes: Sequence[dict[str, Any]]) -> None:
+    """Append ``{"item_id", "op", "name"}`` changes in the caller's transaction (no commit).
+
+    Call ``change_notifier.notify()`` once it has committed.
+    """
+    if not changes:
+        return
+    if _POSTGRES:
+        # Readers resume after the highest seq they saw, so seqs must become visible in
+        # order: a transaction holding a lower seq can't commit after a higher one
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGES_LOCK_KEY})
+    # Core table: an executemany without the ORM's per-row bulk bookkeeping
+    await db.execute(insert(ItemChange.__table__), list(changes))
+
+class ChangesCompacted(Exception):
+    """Changes after the requested seq have been compacted away."""
+
+async def fetch_changes(since: int, limit: int) -> list[Row]:
+    """Up to ``limit`` changes with seq > ``since``, oldest first.
+
+    Uses its own short session, so readers waiting between fetches hold no connection.
+    """
+    columns = (ItemChange.seq, ItemChange.item_id, ItemChange.op, ItemChange.name, ItemChange.changed_at)
+    async with session_scope() as db:
+        rows = (
+            await db.execute(
+                select(*columns).where(ItemChange.seq > since).order_by(ItemChange.seq).limit(limit)
+            )
+        ).all()
+        if rows and rows[0].seq > since + 1:
+            # A gap right after since: compacted, unless rows up to since are still
+            # there (a sequence gap left by a rolled-back transaction on Postgres)
+            kept = await db.scalar(select(ItemChange.seq).where(ItemChange.seq <= since).limit(1))
+            if kept is None:
+                raise ChangesCompacted(f"changes after {since} have been compacted")
+    return rows
+
+async def head_seq() -> int:
+    """Highest committed seq (0 if there are none)."""
+    async with session_scope() as db:
+        return await db.scalar(select(func.max(ItemChange.seq))) or 0
+
+class ChangeNotifier:
+    """Wakes change feed readers on this worker when there may be new changes.
+
+    Writers on this worker call ``notify`` after committing. Changes committed by other
+    workers are picked up by a single watcher per worker, polling the head seq every
+    ``poll_s`` while anyone waits, rather than by every reader polling the table.
+    """
+
+    def __init__(self, poll_s: float):
+        self.poll_s = poll_s
+        # Bumped on notify; read it before fetching so a notify in between isn't lost
+        self.generation = 0
+        # Set while the worker drains: waits end at once and streams close
+        self.closing = False
+        self._waiters: dict[asyncio.Future, int] = {}
+        self._watcher: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        self.generation += 1
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def close(self) -> None:
+        """Wake every reader and stop waiting: long-polls answer with what they have and
+        streams end, so they don't hold up a draining worker (clients reconnect)."""
+        self.closing = True
+        self.notify()
+
+    async def wait(self, since: int, generation: int, timeout: float) -> bool:
+        """Wait for a notify after ``generation`` (or a change past ``since`` on another
+        worker) for up to ``timeout`` seconds; False on timeout or once closing."""
+        if self.generation != generation:
+            return True
+        if timeout <= 0 or self.closing:
+            return False
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters[waiter] = since
+        observe_change_waiters(1)
+        if self._watcher is None or self._watcher.done() or self._watcher.get_loop() is not loop:
+            # Fresh context: the watcher outlives this request's deadline
+            self._watcher = loop.create_task(self._watch(), context=contextvars.Context())
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            del self._waiters[waiter]
+            observe_change_waiters(-1)
+
+    async def _watch(self) -> None:
+        while self._waiters:
+            await asyncio.sleep(self.poll_s)
+            if not self._waiters:
+                return
+            try:
+                head = await head_seq()
+            except Exception as e:
+                logger.warning("item_changes_watch_error", error=str(e))
+                continue
+            if any(head > since for since in self._waiters.values()):
+                self.notify()
+
+change_notifier = ChangeNotifier(settings.ITEMS_CHANGES_POLL_MS / 1000)
+
+async def compact_changes(retain_rows: int) -> int:
+    """Delete all but the newest ``retain_rows`` changes; returns rows removed."""
+    async with session_scope() as db:
+        head = await db.scalar(select(func.max(ItemChange.seq)))
+        if head is None or head <= retain_rows:
+            return 0
+        result = await db.execute(delete(ItemChange).where(ItemChange.seq <= head - retain_rows))
+        await db.commit()
+    observe_changes_compacted(result.rowcount)
+    return result.rowcount
+
+async def run_compaction() -> None:
+    """Compact the change log every ITEMS_CHANGES_COMPACT_S until cancelled."""
+    while True:
+        await asyncio.sleep(settings.ITEMS_CHANGES_COMPACT_S)
+        try:
+            removed = await compact_changes(settings.ITEMS_CHANGES_RETAIN_ROWS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("item_changes_compact_error", error=str(e))
+            continue
+        if removed:
+            logger.info("item_changes_compacted", rows=removed)
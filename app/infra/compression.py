@@ -0,0 +1,211 @@
+from __future__ import annotations
+import zlib
+from typing import Any, Callable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infra import timing
+from app.infra.metrics import observe_compression
+from app.infra.middleware import route_template
+
+try:  # optional: pip install zstandard
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+try:  # optional: pip install brotli
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Bodies that don't shrink (images, archives) aren't worth the CPU
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/xml")
+NO_BODY_STATUSES = frozenset({204, 304})
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def flush(self) -> bytes:
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+class _Brotli:
+    def __init__(self, level: int):
+        self._c = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+class _Zstd:
+    def __init__(self, level: int):
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+# Content-Encoding token -> incremental compressor taking a level
+COMPRESSORS: dict[str, Callable[[int], Any]] = {"gzip": _Gzip}
+if brotli is not None:
+    COMPRESSORS["br"] = _Brotli
+if zstandard is not None:
+    COMPRESSORS["zstd"] = _Zstd
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """``Accept-Encoding`` as token -> q (RFC 9110; q=0 means not acceptable)."""
+    accepted: dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+def compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
+
+class CompressionMiddleware:
+    """Pure ASGI response compression negotiated from ``Accept-Encoding``.
+
+    Picks the client's highest-q encoding among ``encodings`` that are installed
+    (gzip always; ``br`` and ``zstd`` with the optional ``brotli`` / ``zstandard``
+    packages), server preference breaking ties. Bodies declaring a ``Content-Length``
+    below ``min_bytes``, 204/304s, HEAD and already-encoded or non-text responses pass
+    through untouched. Streamed bodies (no ``Content-Length``) have their headers sent
+    at once and are compressed chunk by chunk, flushed after each, so nothing is
+    buffered and every event still reaches the client when it's sent.
+
+    ``levels`` maps encoding -> level; ``route_levels`` overrides it per route
+    template, a level of 0 turning the encoding off for that route. ETags are left
+    as they are: here they name the item version, not the bytes.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        min_bytes: int = 1024,
+        encodings: tuple[str, ...] = ("zstd", "br", "gzip"),
+        levels: Optional[dict[str, int]] = None,
+        route_levels: Optional[dict[str, dict[str, int]]] = None,
+    ):
+        self.app = app
+        self.min_bytes = min_bytes
+        self.encodings = tuple(e for e in encodings if e in COMPRESSORS)
+        self.levels = {"gzip": 6, "br": 4, "zstd": 3, **(levels or {})}
+        self.route_levels = route_levels or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        header = Headers(scope=scope).get("accept-encoding")
+        if not header:
+            await self.app(scope, receive, send)
+            return
+        accepted = accepted_encodings(header)
+
+        start: Optional[Message] = None
+        # Set from the start message: a compressor, or False to pass the body through
+        compressor: Any = False
+        encoding = ""
+        bytes_in = bytes_out = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor, encoding, bytes_in, bytes_out
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message.get("headers", [])))
+                status = message["status"]
+                if compressible(headers.get("content-type", "")) and status not in NO_BODY_STATUSES:
+                    headers.add_vary_header("Accept-Encoding")
+                encoding = self._choose(scope, status, headers, accepted)
+                message = {**message, "headers": headers.raw}
+                if not encoding:
+                    await send(message)
+                    return
+                compressor = COMPRESSORS[encoding](self._level(scope, encoding))
+                headers["Content-Encoding"] = encoding
+                if "content-length" not in headers:
+                    # Streamed (export, SSE): headers go out now, the first chunk may be
+                    # a long way off on an idle event stream
+                    await send(message)
+                    return
+                # Complete body: held back so Content-Length can become the compressed size
+                del headers["Content-Length"]
+                start = {**message, "headers": headers.raw}
+                return
+            if message["type"] != "http.response.body" or compressor is False:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            with timing.phase("compress"):
+                out = compressor.compress(body) + (compressor.flush() if more else compressor.finish())
+            bytes_in += len(body)
+            bytes_out += len(out)
+            if start is not None:
+                if not more:
+                    MutableHeaders(raw=start["headers"])["Content-Length"] = str(len(out))
+                await send(start)
+                start = None
+            await send({"type": "http.response.body", "body": out, "more_body": more})
+            if not more:
+                observe_compression(encoding, bytes_in, bytes_out)
+
+        await self.app(scope, receive, send_wrapper)
+        if start is not None:
+            await send(start)  # ended without a body message
+
+    def _choose(self, scope: Scope, status: int, headers: MutableHeaders, accepted: dict[str, float]) -> str:
+        if status < 200 or status in NO_BODY_STATUSES or "content-encoding" in headers:
+            return ""
+        if not compressible(headers.get("content-type", "")):
+            return ""
+        # Complete bodies declare their size; streams are always worth compressing
+        declared = headers.get("content-length")
+        if declared is not None and declared.isdigit() and int(declared) < self.min_bytes:
+            return ""
+        route = self.route_levels.get(route_template(scope), {})
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = "", 0.0
+        for encoding in self.encodings:
+            if route.get(encoding, 1) == 0:
+                continue
+            q = accepted.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def _level(self, scope: Scope, encoding: str) -> int:
+        route = self.route_levels.get(route_template(scope))
+        if route and encoding in route:
+            return route[encoding]
+        return self.levels[encoding]
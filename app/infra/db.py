@@ -1,19 +1,397 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from __future__ import annotations
+import os
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Sequence, TypeVar
+
+import anyio
+from sqlalchemy import Connection, Engine, Executable, Row, create_engine, event, inspect, make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
 
 from app.config import settings
+from app.infra import deadline as request_deadline
+from app.infra import timing
+from app.infra.metrics import (
+    observe_db_checkout_wait,
+    observe_db_connection_lifetime,
+    observe_db_deadline,
+    observe_db_pool,
+    observe_db_statement,
+)
+
+T = TypeVar("T")
+
+# Async drivers used when DATABASE_ASYNC is on; DATABASE_URL stays driver-agnostic
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        return url
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+class _TimedCheckout:
+    """Records how long each pool checkout waited, including opening a connection."""
+
+    metrics_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe_db_checkout_wait(self.metrics_label, time.perf_counter() - start)
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+def is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+def engine_options(url: str, poolclass: type[QueuePool]) -> dict[str, Any]:
+    options: dict[str, Any] = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_S,
+    }
+    if make_url(url).get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    if is_memory_sqlite(url):
+        # In-memory databases live in one connection; keep SQLAlchemy's default pool
+        return options
+    return {
+        **options,
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_S,
+    }
+
+def _sqlite_pragmas(dbapi_connection: Any, _record: Any) -> None:
+    # busy_timeout first so switching journal mode waits out other writers
+    pragmas = (
+        ("busy_timeout", settings.SQLITE_BUSY_TIMEOUT_MS),
+        ("journal_mode", settings.SQLITE_JOURNAL_MODE),
+        ("synchronous", settings.SQLITE_SYNCHRONOUS),
+    )
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            if value:
+                cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+# Connection.info key holding the deadline of the statement currently running on it
+DEADLINE_INFO_KEY = "statement_deadline"
+# SQLite VM instructions between deadline checks (roughly well under a millisecond)
+SQLITE_PROGRESS_STEPS = 10_000
+# Postgres query_canceled, raised when statement_timeout fires
+PG_QUERY_CANCELED = "57014"
+
+def _sqlite_interrupt(dbapi_connection: Any, record: Any) -> None:
+    # Runs on whichever thread executes the statement (aiosqlite's, a threadpool
+    # worker), so the deadline is handed over through the connection's info dict
+    info = record.info
+
+    def check() -> int:
+        deadline = info.get(DEADLINE_INFO_KEY)
+        # Non-zero aborts the statement with OperationalError("interrupted")
+        return 1 if deadline is not None and deadline.expired() else 0
+
+    if hasattr(dbapi_connection, "run_async"):
+        dbapi_connection.run_async(lambda conn: conn.set_progress_handler(check, SQLITE_PROGRESS_STEPS))
+    else:
+        dbapi_connection.set_progress_handler(check, SQLITE_PROGRESS_STEPS)
+
+def is_deadline_cancel(error: BaseException) -> bool:
+    code = getattr(error, "sqlstate", None) or getattr(error, "pgcode", None)
+    return code == PG_QUERY_CANCELED or "interrupted" in str(error)
+
+def enforce_deadlines(engine: Engine) -> None:
+    """Bound every statement by the current request deadline.
+
+    SQLite statements are interrupted from a progress handler; on Postgres the first
+    statement of each transaction sets ``statement_timeout`` to the time remaining.
+    Statements are refused once the deadline has passed, so work for a request that
+    already got its 504 stops and the connection goes back to the pool.
+    """
+    postgres = engine.dialect.name == "postgresql"
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _sqlite_interrupt)
+
+    def before_execute(conn, cursor, _statement, _parameters, _context, _executemany) -> None:
+        deadline = request_deadline.current()
+        if deadline is None:
+            return
+        if deadline.expired():
+            observe_db_deadline("cancelled")
+            raise request_deadline.DeadlineExceeded("request deadline passed before statement")
+        conn.info[DEADLINE_INFO_KEY] = deadline
+        if postgres and not conn.info.get("statement_timeout_set"):
+            timeout_ms = max(1, int(deadline.remaining() * 1000))
+            if timeout_ms < 2**31:  # lifted deadline (streaming): leave the server default
+                cursor.execute(f"SET LOCAL statement_timeout = {timeout_ms}")
+            conn.info["statement_timeout_set"] = True
+
+    def after_execute(conn, *_args) -> None:
+        deadline = conn.info.pop(DEADLINE_INFO_KEY, None)
+        if deadline is not None and deadline.expired():
+            # Finished, but nobody is waiting for the result any more
+            observe_db_deadline("abandoned")
+
+    def on_error(context) -> None:
+        if not isinstance(context.original_exception, Exception):
+            # Task cancelled mid-await: the statement may still be running on the
+            # driver's thread, so leave its deadline for the progress handler
+            return
+        conn = context.connection
+        deadline = conn.info.pop(DEADLINE_INFO_KEY, None) if conn is not None else None
+        if deadline is not None and deadline.expired() and is_deadline_cancel(context.original_exception):
+            observe_db_deadline("cancelled")
+
+    def end_transaction(conn) -> None:
+        conn.info.pop("statement_timeout_set", None)
+
+    def checkin(_dbapi_connection, record) -> None:
+        # Returned without commit/rollback events (reset-on-return)
+        record.info.pop("statement_timeout_set", None)
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    event.listen(engine, "after_cursor_execute", after_execute)
+    event.listen(engine, "handle_error", on_error)
+    if postgres:
+        event.listen(engine, "commit", end_transaction)
+        event.listen(engine, "rollback", end_transaction)
+        event.listen(engine, "checkin", checkin)
+
+def instrument_pool(engine: Engine, name: str) -> None:
+    """Connect-time pragmas plus pool gauges and connection lifetime metrics."""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _sqlite_pragmas)
+
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+    capacity = pool.size() + max(settings.DB_MAX_OVERFLOW, 0)
+
+    def _update(returning: int) -> None:
+        # engine.pool, not pool: dispose() swaps in a new pool carrying these listeners
+        current = engine.pool
+        # checkin fires before the connection is back in the pool
+        checked_out = current.checkedout() - returning
+        observe_db_pool(name, checked_out, current.overflow(), checked_out / capacity)
+
+    def _connect(_dbapi_connection: Any, record: Any) -> None:
+        record.info["connected_at"] = time.monotonic()
+
+    def _close(_dbapi_connection: Any, record: Any) -> None:
+        connected_at = record.info.pop("connected_at", None)
+        if connected_at is not None:
+            observe_db_connection_lifetime(name, time.monotonic() - connected_at)
+
+    event.listen(pool, "checkout", lambda *_: _update(0))
+    event.listen(pool, "checkin", lambda *_: _update(1))
+    event.listen(pool, "connect", _connect)
+    event.listen(pool, "close", _close)
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {},
-    pool_pre_ping=True,
+def time_statements(engine: Engine, name: str) -> None:
+    def before(conn, *_args) -> None:
+        conn.info["statement_start"] = time.perf_counter()
+
+    def after(conn, *_args) -> None:
+        start = conn.info.pop("statement_start", None)
+        if start is not None:
+            elapsed = time.perf_counter() - start
+            observe_db_statement(name, elapsed)
+            timing.record("db", elapsed)
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+
+def build_engine(url: str, name: str = "sync") -> Engine:
+    engine = create_engine(url, **engine_options(url, TimedQueuePool))
+    instrument_pool(engine, name)
+    enforce_deadlines(engine)
+    time_statements(engine, name)
+    return engine
+
+def build_async_engine(url: str, name: str = "async") -> AsyncEngine:
+    engine = create_async_engine(async_url(url), **engine_options(url, TimedAsyncQueuePool))
+    instrument_pool(engine.sync_engine, name)
+    enforce_deadlines(engine.sync_engine)
+    time_statements(engine.sync_engine, name)
+    return engine
+
+engine = build_engine(settings.DATABASE_URL)
+
+# expire_on_commit=False: attributes stay loaded after commit, so reading them never
+# triggers lazy I/O from the event loop.
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+
+async_engine = build_async_engine(settings.DATABASE_URL) if settings.DATABASE_ASYNC else None
+
+AsyncSessionLocal = (
+    async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    if async_engine is not None
+    else None
 )
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+def _reset_pools_after_fork() -> None:
+    # Connections inherited from the preloading parent (python -m app.serve) share its
+    # sockets/files; start with empty pools and leave those to the parent
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+class ThreadedSession:
+    """AsyncSession-shaped facade over a sync ``Session`` (``DATABASE_ASYNC=false``).
+
+    Each awaited call runs on Starlette's threadpool with the sync driver, so handlers
+    are written once against the async API and the two modes can be A/B tested.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def run_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        try:
+            return await anyio.to_thread.run_sync(partial(fn, self.sync_session, *args, **kwargs))
+        finally:
+            # The thread can't be cancelled; if the request was while it ran (e.g. its
+            # statement interrupted at the deadline), surface that, not the DB error
+            await anyio.lowlevel.checkpoint_if_cancelled()
+
+    def add(self, obj: Any) -> None:
+        self.sync_session.add(obj)
+
+    def add_all(self, objs: Any) -> None:
+        self.sync_session.add_all(objs)
+
+    async def execute(self, statement: Any, params: Any = None, **kwargs: Any):
+        # Buffer rows in the worker thread, as AsyncSession.execute does
+        options = {**kwargs.pop("execution_options", {}), "prebuffer_rows": True}
+        return await self.run_sync(
+            Session.execute, statement, params, execution_options=options, **kwargs
+        )
+
+    async def scalar(self, statement: Any, params: Any = None, **kwargs: Any):
+        return await self.run_sync(Session.scalar, statement, params, **kwargs)
+
+    async def get(self, entity: Any, ident: Any, **kwargs: Any):
+        return await self.run_sync(Session.get, entity, ident, **kwargs)
+
+    async def delete(self, obj: Any) -> None:
+        await self.run_sync(Session.delete, obj)
+
+    async def flush(self) -> None:
+        await self.run_sync(Session.flush)
+
+    async def refresh(self, obj: Any) -> None:
+        await self.run_sync(Session.refresh, obj)
+
+    async def commit(self) -> None:
+        await self.run_sync(Session.commit)
+
+    async def rollback(self) -> None:
+        await self.run_sync(Session.rollback)
+
+    async def close(self) -> None:
+        await self.run_sync(Session.close)
+
+@asynccontextmanager
+async def session_scope(
+    async_factory: async_sessionmaker | None = None, sync_factory: sessionmaker | None = None
+) -> AsyncIterator[AsyncSession]:
+    """Session for the configured mode (see ``DATABASE_ASYNC``), closed on exit even
+    when the caller is cancelled, so the connection always goes back to the pool.
+
+    Factories default to the primary's ``AsyncSessionLocal`` / ``SessionLocal``.
+    """
+    if settings.DATABASE_ASYNC:
+        async with (async_factory or AsyncSessionLocal)() as db:
+            yield db
+        return
+    db = ThreadedSession((sync_factory or SessionLocal)())
+    try:
+        yield db
+    finally:
+        # Shielded: after a timeout the close would otherwise be cancelled before it
+        # starts, leaving the connection checked out until garbage collection
+        with anyio.CancelScope(shield=True):
+            await db.close()
+
+async def stream_partitions(statement: Executable, size: int) -> AsyncIterator[Sequence[Row]]:
+    """Yield result rows in chunks of ``size`` from a server-side cursor.
+
+    Uses its own session so it can outlive the request's ``db_session`` while a
+    streaming response is being sent; memory is bounded by ``size`` rows.
+    """
+    statement = statement.execution_options(yield_per=size)
+    if settings.DATABASE_ASYNC:
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(statement)
+            async for partition in result.partitions():
+                yield partition
+        return
+    db = SessionLocal()
+    try:
+        result = await anyio.to_thread.run_sync(db.execute, statement)
+        partitions = result.partitions()
+        while (partition := await anyio.to_thread.run_sync(next, partitions, None)) is not None:
+            yield partition
+    finally:
+        await anyio.to_thread.run_sync(db.close)
 
 class Base(DeclarativeBase):
     pass
 
+_schema_ready = False
+
+# Columns added to tables that existed before them: (table, column, default, backfill).
+# create_all never alters an existing table, so databases created earlier get these
+# through ALTER TABLE; the default must be a constant (SQLite), backfill an expression
+ADDED_COLUMNS = (
+    ("items", "updated_at", "'1970-01-01 00:00:00'", "created_at"),
+    ("items", "version", "1", None),
+)
+
+def add_missing_columns(conn: Connection) -> None:
+    inspector = inspect(conn)
+    for table_name, column_name, default, backfill in ADDED_COLUMNS:
+        if column_name in {c["name"] for c in inspector.get_columns(table_name)}:
+            continue
+        column = Base.metadata.tables[table_name].c[column_name]
+        ddl_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(
+            f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl_type} NOT NULL DEFAULT {default}"
+        ))
+        if backfill is not None:
+            conn.execute(text(f"UPDATE {table_name} SET {column_name} = {backfill}"))
+
 def init_db() -> None:
-    from app.infra.models import Item, IdempotencyRecord  # noqa: F401
+    global _schema_ready
+    from app.infra.models import Item, ItemChange, IdempotencyRecord  # noqa: F401
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes on tables that already exist; add any new ones
+    with engine.begin() as conn:
+        add_missing_columns(conn)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    from app.infra.search import install_search_index
+    install_search_index(engine)
+    _schema_ready = True
+
+def ensure_schema() -> None:
+    """``init_db`` unless this process, or the server that forked it, already ran it."""
+    if not _schema_ready:
+        init_db()
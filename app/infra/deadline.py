@@ -0,0 +1,51 @@
+from __future__ import annotations
+import math
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+class Deadline:
+    """Absolute monotonic deadline for the current request.
+
+    Mutable so every copy of the request's context (threadpool calls, streaming tasks)
+    sees it lifted once the response has started.
+    """
+
+    __slots__ = ("at",)
+
+    def __init__(self, at: float):
+        self.at = at
+
+    def remaining(self) -> float:
+        return self.at - time.monotonic()
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.at
+
+    def lift(self) -> None:
+        self.at = math.inf
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+def start(at: float) -> tuple[Deadline, Token]:
+    """Set the request deadline (a ``time.monotonic()`` value); pass the token to
+    ``reset`` when the request ends."""
+    deadline = Deadline(at)
+    return deadline, _current.set(deadline)
+
+def reset(token: Token) -> None:
+    _current.reset(token)
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request (<= 0 once passed); None outside a request
+    or after the response has started."""
+    deadline = _current.get()
+    if deadline is None or deadline.at == math.inf:
+        return None
+    return deadline.remaining()
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting database work for a request that has already timed out."""
@@ -1,16 +1,25 @@
 from __future__ import annotations
-from typing import Generator
+from typing import AsyncGenerator
 from fastapi import Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.infra.db import SessionLocal
+from app.infra import deadline
+from app.infra.db import session_scope
+from app.infra.replicas import read_session_scope
 
-def db_session() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with session_scope() as db:
+        yield db
+
+async def read_session() -> AsyncGenerator[AsyncSession, None]:
+    """For read-only handlers: a replica session when replicas are configured, except
+    for a principal that wrote recently (see ``DATABASE_REPLICA_URLS``)."""
+    async with read_session_scope() as db:
         yield db
-    finally:
-        db.close()
 
 def request_id(request: Request) -> str:
     return getattr(request.state, "request_id", "unknown")
+
+def deadline_remaining() -> float | None:
+    """Seconds left before the request deadline (statements are cut off there too)."""
+    return deadline.remaining()
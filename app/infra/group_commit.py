@@ -0,0 +1,188 @@
+from __future__ import annotations
+import asyncio
+import contextvars
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from sqlalchemy import Row, bindparam, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infra import replicas
+from app.infra.changes import change_notifier, record_changes
+from app.infra.db import session_scope
+from app.infra.idempotency import Claim, StoredResponse, record_expiry
+from app.infra.metrics import observe_group_commit
+from app.infra.models import IdempotencyRecord, Item
+from app.logging import log
+
+logger = log()
+
+# Renders an inserted (id, name, created_at) row as the response body to record
+RenderItem = Callable[[Row], dict]
+
+async def create_item_recorded(
+    db: AsyncSession, name: str, claim: Claim, request_hash: str, render: RenderItem
+) -> StoredResponse:
+    """Insert an item, its change log entry and its idempotency record in one
+    transaction (one commit).
+
+    Returns the committed response, or the one recorded first by a concurrent request
+    with the same key (``claim.replay`` is then set and the insert was rolled back).
+    """
+    row = (
+        await db.execute(
+            insert(Item).values(name=name).returning(Item.id, Item.name, Item.created_at)
+        )
+    ).one()
+    await record_changes(db, [{"item_id": row.id, "op": "create", "name": row.name}])
+    stored = await claim.complete(db, request_hash=request_hash, status_code=201, response_body=render(row))
+    if claim.replay is None:
+        change_notifier.notify()
+    return stored
+
+@dataclass
+class _PendingCreate:
+    name: str
+    claim: Claim
+    request_hash: str
+    future: asyncio.Future
+
+class CreateGroupCommitter:
+    """Group commit for item creates on this worker.
+
+    The first create opens a window of ``window_s`` (closed early once ``max_batch``
+    are waiting); everything that arrived is then written with one multi-row INSERT
+    each for the items, their change log entries and their idempotency records, and a
+    single commit. Creates
+    arriving while a group is being written form the next group, which is written as
+    soon as the current one commits. Each caller still gets its own response, and an
+    item is never committed without its record.
+    """
+
+    def __init__(self, window_s: float, max_batch: int, render: RenderItem):
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.render = render
+        self._pending: list[_PendingCreate] = []
+        # Resolved to close the current window early once max_batch are waiting
+        self._window: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def create(self, name: str, claim: Claim, request_hash: str) -> StoredResponse:
+        """Same contract as ``create_item_recorded``, committed with the current group."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_PendingCreate(name, claim, request_hash, future))
+        if len(self._pending) >= self.max_batch and self._window is not None and not self._window.done():
+            self._window.set_result(None)
+        if self._task is None or self._task.done():
+            # Fresh context: the writer outlives this request and must not inherit its
+            # deadline
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(), context=contextvars.Context()
+            )
+        return await future
+
+    async def _run(self) -> None:
+        self._window = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._window, self.window_s)
+        except TimeoutError:
+            pass
+        self._window = None
+        while self._pending:
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+            # Callers cancelled (e.g. timed out) before their group started are dropped
+            live = [p for p in batch if not p.future.done()]
+            if live:
+                await self._write(live)
+
+    async def _write(self, batch: list[_PendingCreate]) -> None:
+        try:
+            async with session_scope() as db:
+                results = await self._insert_group(db, batch)
+        except IntegrityError:
+            # A key recorded meanwhile by another worker: settle each on its own so
+            # only that create turns into a replay
+            logger.info("group_commit_split", size=len(batch))
+            for pending in batch:
+                await self._write_one(pending)
+            return
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+        observe_group_commit(len(batch))
+        change_notifier.notify()
+        for pending, result in zip(batch, results, strict=True):
+            # Committed outside the callers' contexts: mark them for read-your-writes
+            replicas.replica_router.mark_write(pending.claim.scope["principal_id"])
+            await pending.claim.resolve(result)
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    async def _insert_group(self, db: AsyncSession, batch: list[_PendingCreate]) -> list[StoredResponse]:
+        # Ids are allocated in VALUES order, so sorting RETURNING by id restores it
+        rows = sorted(
+            (
+                await db.execute(
+                    insert(Item).returning(Item.id, Item.name, Item.created_at),
+                    [{"name": p.name} for p in batch],
+                )
+            ).all(),
+            key=lambda row: row.id,
+        )
+        await record_changes(db, [{"item_id": row.id, "op": "create", "name": row.name} for row in rows])
+        results: list[StoredResponse] = []
+        fresh: list[dict[str, Any]] = []
+        reserved: list[dict[str, Any]] = []
+        for pending, row in zip(batch, rows, strict=True):
+            body = json.dumps(self.render(row), separators=(",", ":"))
+            results.append(StoredResponse(pending.request_hash, 201, body.encode("utf-8"), record_expiry()))
+            values = {"request_hash": pending.request_hash, "status_code": 201, "response_body": body}
+            if pending.claim.pending_row:
+                # Column names are reserved for SET/VALUES: bind under b_ names
+                reserved.append({f"b_{k}": v for k, v in {**pending.claim.scope, **values}.items()})
+            else:
+                fresh.append({**pending.claim.scope, **values})
+        if fresh:
+            await db.execute(insert(IdempotencyRecord), fresh)
+        if reserved:
+            # DB lock (IDEMPOTENCY_LOCK=db): the reservation rows become the records
+            records = IdempotencyRecord.__table__
+            await db.execute(
+                update(records)
+                .where(
+                    records.c.principal_id == bindparam("b_principal_id"),
+                    records.c.route_key == bindparam("b_route_key"),
+                    records.c.idem_key == bindparam("b_idem_key"),
+                )
+                .values(
+                    request_hash=bindparam("b_request_hash"),
+                    status_code=bindparam("b_status_code"),
+                    response_body=bindparam("b_response_body"),
+                ),
+                reserved,
+            )
+        await db.commit()
+        return results
+
+    async def _write_one(self, pending: _PendingCreate) -> None:
+        if pending.future.done():
+            return
+        try:
+            async with session_scope() as db:
+                result = await create_item_recorded(
+                    db, pending.name, pending.claim, pending.request_hash, self.render
+                )
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+            return
+        observe_group_commit(1)
+        replicas.replica_router.mark_write(pending.claim.scope["principal_id"])
+        if not pending.future.done():
+            pending.future.set_result(result)
@@ -1,10 +1,41 @@
 from __future__ import annotations
+import asyncio
 import hashlib
+import itertools
 import json
-from sqlalchemy.orm import Session
+import secrets
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any, AsyncIterator, Optional, Protocol
+
+import anyio
+from sqlalchemy import delete, func, insert, make_url, select, text, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.domain import errors
+from app.logging import log
+from app.infra import timing
+from app.infra.db import session_scope
+from app.infra.metrics import (
+    observe_idempotency_lookup,
+    observe_idempotency_swept,
+    observe_idempotency_table,
+    observe_idempotency_wait,
+)
 from app.infra.models import IdempotencyRecord
+from app.infra.redis_client import get_redis
+
+logger = log()
+
+# status_code of an idempotency_records row that is a DB-lock reservation, not a response
+PENDING_STATUS = 0
+LOCK_POLL_S = 0.025
+_POSTGRES = make_url(settings.DATABASE_URL).get_backend_name() == "postgresql"
 
 def hash_request(body: dict) -> str:
     raw = json.dumps(body, sort_keys=True, separators=(",", ":")).encode("utf-8")
@@ -13,47 +44,486 @@ def hash_request(body: dict) -> str:
 def route_key(method: str, path: str) -> str:
     return f"{method.upper()} {path}"
 
-def get_idempotent_response(
-    db: Session,
+def expiry_cutoff() -> Optional[datetime]:
+    """``created_at`` before which records have expired; None if they never do."""
+    if settings.IDEMPOTENCY_TTL_S <= 0:
+        return None
+    return datetime.utcnow() - timedelta(seconds=settings.IDEMPOTENCY_TTL_S)
+
+def record_expiry(created_at: Optional[datetime] = None) -> Optional[float]:
+    """Unix time at which a record created at ``created_at`` (naive UTC, default now)
+    expires; None if records never do."""
+    if settings.IDEMPOTENCY_TTL_S <= 0:
+        return None
+    created = created_at.replace(tzinfo=UTC).timestamp() if created_at is not None else time.time()
+    return created + settings.IDEMPOTENCY_TTL_S
+
+def is_expired(rec: IdempotencyRecord, cutoff: Optional[datetime]) -> bool:
+    # Reservations expire by IDEMPOTENCY_LOCK_TTL_S instead
+    return cutoff is not None and rec.status_code != PENDING_STATUS and rec.created_at < cutoff
+
+async def discard_expired(ids: list[int]) -> None:
+    """Delete expired records now, in a short transaction of their own, so their keys
+    can be used again before the sweeper gets to them."""
+    cutoff = expiry_cutoff()
+    if not ids or cutoff is None:
+        return
+    async with session_scope() as db:
+        result = await db.execute(
+            delete(IdempotencyRecord).where(IdempotencyRecord.id.in_(ids), IdempotencyRecord.created_at < cutoff)
+        )
+        await db.commit()
+    observe_idempotency_swept(result.rowcount)
+
+@dataclass(frozen=True)
+class StoredResponse:
+    request_hash: str
+    status_code: int
+    # Serialized response exactly as first sent; replays return it without re-validation
+    body: bytes
+    # Unix time the record expires (created_at + IDEMPOTENCY_TTL_S); None: never. Tiers
+    # holding a copy drop it then too, however recently it was copied up
+    expires_at: Optional[float] = None
+
+    def remaining_s(self) -> float:
+        return float("inf") if self.expires_at is None else self.expires_at - time.time()
+
+class IdempotencyTier(Protocol):
+    name: str
+
+    async def get(self, key: str) -> Optional[StoredResponse]: ...
+
+    async def put(self, key: str, value: StoredResponse) -> None: ...
+
+class MemoryTier:
+    """Per-process TTL/LRU tier."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int, ttl_s: float):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[str, tuple[StoredResponse, float]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic() or entry[0].remaining_s() <= 0:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def put(self, key: str, value: StoredResponse) -> None:
+        ttl_s = min(self.ttl_s, value.remaining_s())
+        if ttl_s <= 0:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = (value, time.monotonic() + ttl_s)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+class RedisTier:
+    """Shared tier on a Redis-protocol server. Failures degrade to a miss."""
+
+    name = "redis"
+
+    def __init__(self, client: Any, ttl_s: float, prefix: str = "idem:"):
+        self.client = client
+        self.ttl_ms = int(ttl_s * 1000)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        try:
+            raw = await self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning("idempotency_redis_error", op="get", error=str(e))
+            return None
+        if raw is None:
+            return None
+        request_hash, status_code, expires_at, body = raw.split(b":", 3)
+        value = StoredResponse(
+            request_hash.decode("ascii"), int(status_code), body, float(expires_at) if expires_at else None
+        )
+        # px already ends it at expires_at; this covers clock skew between writers
+        return value if value.remaining_s() > 0 else None
+
+    async def put(self, key: str, value: StoredResponse) -> None:
+        ttl_ms = int(min(self.ttl_ms, value.remaining_s() * 1000))
+        if ttl_ms <= 0:
+            return
+        expires_at = b"" if value.expires_at is None else b"%.3f" % value.expires_at
+        raw = b"%s:%d:%s:%s" % (value.request_hash.encode("ascii"), value.status_code, expires_at, value.body)
+        try:
+            await self.client.set(self.prefix + key, raw, px=ttl_ms)
+        except Exception as e:
+            logger.warning("idempotency_redis_error", op="put", error=str(e))
+
+class IdempotencyStore:
+    """Cache tiers (fastest first) in front of the durable ``idempotency_records`` table.
+
+    A hit in a lower tier is copied into the tiers above it. Records are immutable
+    once written, so tiers never need invalidating; each entry carries its record's
+    expiry and no tier keeps or returns it past that.
+    """
+
+    def __init__(self, tiers: list[IdempotencyTier]):
+        self.tiers = tiers
+
+    @staticmethod
+    def key(principal_id: str, route_key_value: str, idem_key: str) -> str:
+        raw = f"{principal_id}\x1f{route_key_value}\x1f{idem_key}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    async def lookup(
+        self, db: AsyncSession, *, principal_id: str, route_key_value: str, idem_key: str
+    ) -> Optional[StoredResponse]:
+        with timing.phase("idempotency"):
+            return await self._lookup(
+                db, principal_id=principal_id, route_key_value=route_key_value, idem_key=idem_key
+            )
+
+    async def _lookup(
+        self, db: AsyncSession, *, principal_id: str, route_key_value: str, idem_key: str
+    ) -> Optional[StoredResponse]:
+        key = self.key(principal_id, route_key_value, idem_key)
+        for depth, tier in enumerate(self.tiers):
+            value = await tier.get(key)
+            observe_idempotency_lookup(tier.name, value is not None)
+            if value is not None:
+                for upper in self.tiers[:depth]:
+                    await upper.put(key, value)
+                return value
+
+        rec = (
+            await db.execute(
+                select(IdempotencyRecord).filter_by(
+                    principal_id=principal_id, route_key=route_key_value, idem_key=idem_key
+                )
+            )
+        ).scalar_one_or_none()
+        # A pending row is a reservation by a request still in flight, not a response
+        if rec is not None and rec.status_code == PENDING_STATUS:
+            rec = None
+        elif rec is not None and is_expired(rec, expiry_cutoff()):
+            await discard_expired([rec.id])
+            rec = None
+        observe_idempotency_lookup("sql", rec is not None)
+        if rec is None:
+            return None
+        value = StoredResponse(
+            rec.request_hash, rec.status_code, rec.response_body.encode("utf-8"), record_expiry(rec.created_at)
+        )
+        await self.remember(key, value)
+        return value
+
+    async def remember(self, key: str, value: StoredResponse) -> None:
+        with timing.phase("idempotency"):
+            for tier in self.tiers:
+                await tier.put(key, value)
+
+def build_store() -> IdempotencyStore:
+    tiers: list[IdempotencyTier] = []
+    ttl_s = settings.IDEMPOTENCY_TTL_S if settings.IDEMPOTENCY_TTL_S > 0 else float("inf")
+    if settings.IDEMPOTENCY_CACHE_SIZE > 0:
+        tiers.append(MemoryTier(settings.IDEMPOTENCY_CACHE_SIZE, min(settings.IDEMPOTENCY_CACHE_TTL_S, ttl_s)))
+    client = get_redis()
+    if client is not None:
+        tiers.append(RedisTier(client, min(settings.IDEMPOTENCY_REDIS_TTL_S, ttl_s)))
+    return IdempotencyStore(tiers)
+
+idempotency_store = build_store()
+
+# Requests currently executing per store key on this worker; duplicates await these
+_inflight: dict[str, asyncio.Future] = {}
+
+class Claim:
+    """Outcome of ``reserve_idempotency_key``.
+
+    Either ``replay`` is set (another request with the key finished first) or the holder
+    has the exclusive right to run the request and must call ``complete``.
+    """
+
+    def __init__(self, key: str, *, principal_id: str, route_key_value: str, idem_key: str):
+        self.key = key
+        self.scope = {"principal_id": principal_id, "route_key": route_key_value, "idem_key": idem_key}
+        self.replay: Optional[StoredResponse] = None
+        self.result: Optional[StoredResponse] = None
+        self.lock_token: Optional[str] = None
+        self.pending_row = False
+
+    async def complete(
+        self, db: AsyncSession, *, request_hash: str, status_code: int, response_body: dict
+    ) -> StoredResponse:
+        """Record the response and commit it together with the caller's uncommitted
+        writes, so the work and its record are durable together or not at all.
+
+        If another worker recorded the key first (possible without a shared lock), the
+        transaction is rolled back and that response is returned (and set as ``replay``).
+        """
+        body = json.dumps(response_body, separators=(",", ":"))
+        if self.pending_row:
+            # DB lock: the reservation row becomes the record
+            await db.execute(
+                update(IdempotencyRecord)
+                .filter_by(**self.scope)
+                .values(request_hash=request_hash, status_code=status_code, response_body=body)
+            )
+        else:
+            db.add(IdempotencyRecord(
+                **self.scope, request_hash=request_hash, status_code=status_code, response_body=body
+            ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            self.replay = await idempotency_store.lookup(db, **_lookup_args(self))
+            if self.replay is None:
+                raise
+            return self.replay
+        await self.resolve(StoredResponse(request_hash, status_code, body.encode("utf-8"), record_expiry()))
+        return self.result
+
+    async def resolve(self, result: StoredResponse) -> None:
+        """Mark the claim done with a response that has been committed."""
+        self.result = result
+        await idempotency_store.remember(self.key, result)
+
+async def _wait_for_leader(leader: asyncio.Future, deadline: float, rid: str):
+    try:
+        stored = await asyncio.wait_for(asyncio.shield(leader), max(deadline - time.monotonic(), 0))
+    except TimeoutError:
+        observe_idempotency_wait("timeout")
+        raise errors.in_progress("a request with this idempotency key is still in progress", rid) from None
+    if stored is not None:
+        observe_idempotency_wait("replayed")
+    return stored
+
+async def _try_lock(db: AsyncSession, claim: Claim) -> bool:
+    if settings.IDEMPOTENCY_LOCK == "redis":
+        token = secrets.token_hex(8)
+        if await get_redis().set(
+            "idem-lock:" + claim.key, token, px=int(settings.IDEMPOTENCY_LOCK_TTL_S * 1000), nx=True
+        ):
+            claim.lock_token = token
+            return True
+        return False
+
+    # db: the unique (principal, route, key) constraint makes a pending row a lock
+    try:
+        await db.execute(
+            insert(IdempotencyRecord).values(
+                **claim.scope, request_hash="", status_code=PENDING_STATUS, response_body=""
+            )
+        )
+        await db.commit()
+        claim.pending_row = True
+        return True
+    except IntegrityError:
+        await db.rollback()
+    # Take over a reservation whose holder has presumably died
+    now = datetime.utcnow()
+    taken = await db.execute(
+        update(IdempotencyRecord)
+        .filter_by(**claim.scope, status_code=PENDING_STATUS)
+        .where(IdempotencyRecord.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TTL_S))
+        .values(created_at=now)
+    )
+    await db.commit()
+    claim.pending_row = taken.rowcount == 1
+    return claim.pending_row
+
+async def _release(db: AsyncSession, claim: Claim) -> None:
+    if claim.lock_token is not None:
+        client = get_redis()
+        lock_key = "idem-lock:" + claim.key
+        # Only drop our own lock; an expired-and-retaken one belongs to someone else
+        if await client.get(lock_key) == claim.lock_token.encode("ascii"):
+            await client.delete(lock_key)
+        claim.lock_token = None
+    if claim.pending_row and claim.result is None:
+        await db.rollback()
+        await db.execute(delete(IdempotencyRecord).filter_by(**claim.scope, status_code=PENDING_STATUS))
+        await db.commit()
+
+async def _claim_shared(db: AsyncSession, claim: Claim, deadline: float, rid: str):
+    """Take the cross-worker lock or wait for its holder's result; None means we hold it."""
+    while True:
+        locked = settings.IDEMPOTENCY_LOCK == "local" or await _try_lock(db, claim)
+        if claim.pending_row:
+            # Inserting the reservation proved no record existed
+            return None
+        stored = await idempotency_store.lookup(db, **_lookup_args(claim))
+        # Don't hold a pooled connection (or a SQLite read lock) while polling or working
+        await db.rollback()
+        if stored is not None:
+            await _release(db, claim)
+            observe_idempotency_wait("replayed")
+            return stored
+        if locked:
+            return None
+        if time.monotonic() >= deadline:
+            observe_idempotency_wait("timeout")
+            raise errors.in_progress("a request with this idempotency key is still in progress", rid)
+        await asyncio.sleep(LOCK_POLL_S)
+
+def _lookup_args(claim: Claim) -> dict:
+    return {
+        "principal_id": claim.scope["principal_id"],
+        "route_key_value": claim.scope["route_key"],
+        "idem_key": claim.scope["idem_key"],
+    }
+
+@asynccontextmanager
+async def reserve_idempotency_key(
+    db: AsyncSession, *, principal_id: str, route_key_value: str, idem_key: str, rid: str
+) -> AsyncIterator[Claim]:
+    """Claim an idempotency key before doing the work it guards.
+
+    Duplicates arriving while the first request runs wait (up to IDEMPOTENCY_WAIT_MS) and
+    replay its response rather than redoing it: on an in-process future for requests on
+    this worker, and on the DB/Redis lock (IDEMPOTENCY_LOCK) for other workers. A wait
+    that times out raises ``IN_PROGRESS`` (409).
+    """
+    key = idempotency_store.key(principal_id, route_key_value, idem_key)
+    claim = Claim(key, principal_id=principal_id, route_key_value=route_key_value, idem_key=idem_key)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_MS / 1000
+
+    while (leader := _inflight.get(key)) is not None:
+        with timing.phase("idempotency"):
+            claim.replay = await _wait_for_leader(leader, deadline, rid)
+        if claim.replay is not None:
+            yield claim
+            return
+        # Leader failed without a response; contend for the key ourselves
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        with timing.phase("idempotency"):
+            claim.replay = await _claim_shared(db, claim, deadline, rid)
+        yield claim
+    except BaseException:
+        future.set_result(None)
+        with anyio.CancelScope(shield=True):
+            await _release(db, claim)
+        raise
+    else:
+        future.set_result(claim.replay or claim.result)
+        with anyio.CancelScope(shield=True):
+            await _release(db, claim)
+    finally:
+        del _inflight[key]
+
+async def get_idempotent_records(
+    db: AsyncSession,
     *,
     principal_id: str,
     route_key_value: str,
-    idem_key: str,
-    request_hash: str,
-):
-    rec = (
-        db.query(IdempotencyRecord)
-        .filter_by(principal_id=principal_id, route_key=route_key_value, idem_key=idem_key)
-        .one_or_none()
-    )
-    if not rec:
-        return None
-    if rec.request_hash != request_hash:
-        # Same key reused with different payload: reject
-        return ("IDEMPOTENCY_KEY_REUSED", 409, None)
-    return ("REPLAY", rec.status_code, rec.response_body)
+    idem_keys: list[str],
+) -> dict[str, IdempotencyRecord]:
+    """Unexpired records for many keys of one principal and route in a single query."""
+    rows = (
+        await db.execute(
+            select(IdempotencyRecord).where(
+                IdempotencyRecord.principal_id == principal_id,
+                IdempotencyRecord.route_key == route_key_value,
+                IdempotencyRecord.idem_key.in_(idem_keys),
+            )
+        )
+    ).scalars().all()
+    cutoff = expiry_cutoff()
+    await discard_expired([rec.id for rec in rows if is_expired(rec, cutoff)])
+    return {rec.idem_key: rec for rec in rows if not is_expired(rec, cutoff)}
 
-def store_idempotent_response(
-    db: Session,
+async def add_idempotent_responses(
+    db: AsyncSession,
     *,
     principal_id: str,
     route_key_value: str,
-    idem_key: str,
-    request_hash: str,
-    status_code: int,
-    response_body: dict,
-):
-    rec = IdempotencyRecord(
-        principal_id=principal_id,
-        route_key=route_key_value,
-        idem_key=idem_key,
-        request_hash=request_hash,
-        status_code=status_code,
-        response_body=json.dumps(response_body, separators=(",", ":")),
+    records: list[dict],
+) -> None:
+    """Insert many records (idem_key, request_hash, status_code, response_body) in one
+    executemany. Doesn't commit: the caller's transaction makes them atomic with the
+    writes they describe.
+    """
+    if not records:
+        return
+    await db.execute(
+        insert(IdempotencyRecord.__table__),
+        [
+            {
+                "principal_id": principal_id,
+                "route_key": route_key_value,
+                "idem_key": r["idem_key"],
+                "request_hash": r["request_hash"],
+                "status_code": r["status_code"],
+                "response_body": json.dumps(r["response_body"], separators=(",", ":")),
+            }
+            for r in records
+        ],
     )
-    db.add(rec)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        # Concurrent insert: safe to ignore; next read will replay
+
+async def sweep_expired(cutoff: datetime, batch: int, pause_s: float = 0.0) -> int:
+    """Delete records created before ``cutoff``, oldest first and ``batch`` rows per
+    transaction, pausing ``pause_s`` between batches so writers get the lock in
+    between; returns rows removed."""
+    removed = 0
+    oldest = (
+        select(IdempotencyRecord.id)
+        .where(IdempotencyRecord.created_at < cutoff)
+        .order_by(IdempotencyRecord.created_at)
+        .limit(batch)
+    )
+    while True:
+        async with session_scope() as db:
+            result = await db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.id.in_(oldest)))
+            await db.commit()
+        removed += result.rowcount
+        observe_idempotency_swept(result.rowcount)
+        if result.rowcount < batch:
+            return removed
+        await asyncio.sleep(pause_s)
+
+# Sweeps between exact row counts; the ones in between estimate
+EXACT_COUNT_EVERY = 60
+
+async def table_stats(exact: bool = False) -> tuple[int, float]:
+    """Row count of idempotency_records and the age in seconds of its oldest record.
+
+    Counting is a full scan, so unless ``exact`` the count is an estimate: the
+    planner's on Postgres, the span of ids on SQLite (ids follow created_at, so
+    it overcounts only by keys discarded out of order)."""
+    async with session_scope() as db:
+        if exact:
+            rows = await db.scalar(select(func.count()).select_from(IdempotencyRecord))
+        elif _POSTGRES:
+            rows = await db.scalar(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'idempotency_records'")
+            )
+        else:
+            rows = await db.scalar(
+                select(func.max(IdempotencyRecord.id) - func.min(IdempotencyRecord.id) + 1)
+            )
+        oldest = await db.scalar(select(func.min(IdempotencyRecord.created_at)))
+    age = (datetime.utcnow() - oldest).total_seconds() if oldest is not None else 0.0
+    return max(int(rows or 0), 0), age
+
+async def run_sweeper() -> None:
+    """Sweep expired records every IDEMPOTENCY_SWEEP_INTERVAL_S until cancelled."""
+    for sweeps in itertools.count():
+        await asyncio.sleep(settings.IDEMPOTENCY_SWEEP_INTERVAL_S)
+        try:
+            removed = await sweep_expired(
+                expiry_cutoff(), settings.IDEMPOTENCY_SWEEP_BATCH, settings.IDEMPOTENCY_SWEEP_PAUSE_MS / 1000
+            )
+            observe_idempotency_table(*await table_stats(exact=sweeps % EXACT_COUNT_EVERY == 0))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("idempotency_sweep_error", error=str(e))
+            continue
+        if removed:
+            logger.info("idempotency_swept", rows=removed)
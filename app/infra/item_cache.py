@@ -0,0 +1,115 @@
+from __future__ import annotations
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from app.config import settings
+from app.logging import log
+from app.infra.metrics import observe_item_cache
+from app.infra.redis_client import get_redis
+
+logger = log()
+
+INVALIDATION_CHANNEL = "items:invalidate"
+
+@dataclass(frozen=True)
+class CachedItem:
+    etag: str
+    # Serialized ItemOut, sent as-is on a hit
+    body: bytes
+
+def etag_for(item_id: int, version: int) -> str:
+    return f'"{item_id}-{version}"'
+
+def etag_matches(header: Optional[str], etag: str, *, weak: bool = True) -> bool:
+    """RFC 9110 list match; If-None-Match uses weak comparison, If-Match strong."""
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if weak and candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+class ItemCache:
+    """Bounded read-through cache of single items for ``GET /v1/items/{id}``.
+
+    Writers invalidate after committing; with REDIS_URL set the ids are also published
+    so other workers drop their copies. The TTL bounds staleness if a message is lost.
+    """
+
+    def __init__(self, maxsize: int, ttl_s: float):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[int, tuple[CachedItem, float]] = OrderedDict()
+        self._invalidations = 0
+
+    def get(self, item_id: int) -> Optional[CachedItem]:
+        entry = self._entries.get(item_id)
+        if entry is not None and entry[1] <= time.monotonic():
+            del self._entries[item_id]
+            entry = None
+        if entry is None:
+            observe_item_cache("miss")
+            return None
+        self._entries.move_to_end(item_id)
+        observe_item_cache("hit")
+        return entry[0]
+
+    def fill_token(self) -> int:
+        """Take before reading the row; ``put`` drops the fill if anything was
+        invalidated meanwhile, so a slow reader can't cache a pre-update row."""
+        return self._invalidations
+
+    def put(self, item_id: int, value: CachedItem, token: int) -> None:
+        if self.maxsize <= 0 or token != self._invalidations:
+            return
+        self._entries[item_id] = (value, time.monotonic() + self.ttl_s)
+        self._entries.move_to_end(item_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, item_ids: Iterable[int]) -> None:
+        self._invalidations += 1
+        for item_id in item_ids:
+            if self._entries.pop(item_id, None) is not None:
+                observe_item_cache("invalidation")
+
+    async def invalidate(self, item_ids: Iterable[int]) -> None:
+        item_ids = list(item_ids)
+        self.discard(item_ids)
+        client = get_redis()
+        if client is None or not item_ids:
+            return
+        try:
+            await client.publish(INVALIDATION_CHANNEL, ",".join(map(str, item_ids)))
+        except Exception as e:
+            logger.warning("item_cache_publish_error", error=str(e))
+
+    async def listen(self) -> None:
+        """Apply invalidations published by other workers until cancelled."""
+        client = get_redis()
+        if client is None:
+            return
+        while True:
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.discard(int(i) for i in message["data"].split(b","))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Entries may have missed invalidations while disconnected
+                self._entries.clear()
+                logger.warning("item_cache_subscribe_error", error=str(e))
+                await asyncio.sleep(1)
+
+item_cache = ItemCache(settings.ITEM_CACHE_SIZE, settings.ITEM_CACHE_TTL_S)
@@ -1,26 +1,317 @@
 from __future__ import annotations
+import os
+from typing import Optional
+
 from fastapi import APIRouter, Response
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
 
 metrics_router = APIRouter()
 
+# Set (to an empty, per-deployment directory) before the workers start to aggregate
+# metrics across uvicorn/gunicorn workers; prometheus_client reads it at import.
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Anything else (e.g. made-up methods) shares one label value
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+# Dense around the 50-250ms latency objectives, up to the 8s request timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5, 5.0, 8.0)
+
 REQ_COUNT = Counter(
     "http_requests_total",
     "HTTP requests",
-    ["method", "path", "status_code"],
+    ["method", "path", "status_code"],  # path: route template, never the raw URL
 )
 
 REQ_LATENCY = Histogram(
     "http_request_duration_seconds",
     "HTTP request latency",
     ["method", "path", "status_code"],
-    # buckets left default by prometheus_client if not specified
+    buckets=LATENCY_BUCKETS,
+)
+
+REQ_PHASE_LATENCY = Histogram(
+    "http_request_phase_duration_seconds",
+    "Time per request spent in each phase (auth | db | idempotency | render | compress); phases overlap",
+    ["path", "phase"],
+    # Auth and rendering take well under a millisecond
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 8.0),
+)
+
+RESPONSE_COMPRESSION_BYTES = Counter(
+    "http_response_compression_bytes_total",
+    "Response body bytes before and after compression",
+    ["encoding", "stage"],  # stage: in | out
+)
+
+REQ_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    ["engine"],  # sync | async
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond pool_size",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation_ratio",
+    "Checked-out connections / (pool_size + max_overflow)",
+    ["engine"],
+    multiprocess_mode="livemax",
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to get a connection from the pool, including connecting",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+DB_CONNECTION_LIFETIME = Histogram(
+    "db_connection_lifetime_seconds",
+    "Age of database connections when closed (recycle, invalidation, dispose)",
+    ["engine"],
+    buckets=(1, 10, 60, 300, 900, 1800, 3600, 7200, 86400),
+)
+
+DB_STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "Statement execution time per engine (sync | async | replica<n>)",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+DB_READ_ROUTES = Counter(
+    "db_read_routes_total",
+    "Read-only sessions by the engine they were routed to",
+    ["engine", "reason"],  # reason: replica | sticky (read-your-writes) | no_replica
+)
+
+DB_REPLICA_EJECTIONS = Counter(
+    "db_replica_ejections_total",
+    "Replicas taken out of rotation after a connection error",
+    ["engine"],
+)
+
+DB_DEADLINE_STATEMENTS = Counter(
+    "db_deadline_statements_total",
+    "Statements hit by the request deadline",
+    # cancelled: interrupted or refused at the deadline; abandoned: ran to completion
+    # after it (result discarded, connection held meanwhile)
+    ["outcome"],
+)
+
+ITEM_GROUP_COMMIT_SIZE = Histogram(
+    "item_group_commit_size",
+    "Item creates committed per transaction in group-commit mode",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+ITEM_CHANGE_WAITERS = Gauge(
+    "item_change_feed_waiters",
+    "Change feed readers (long-poll or SSE) waiting for new changes",
+    multiprocess_mode="livesum",
+)
+
+ITEM_CHANGES_COMPACTED = Counter(
+    "item_changes_compacted_total",
+    "Change log rows removed by compaction",
+)
+
+AUTH_TOKEN_CACHE = Counter(
+    "auth_token_cache_events_total",
+    "Verified-token cache events",
+    ["event"],  # hit | miss | eviction
+)
+
+IDEMPOTENCY_LOOKUPS = Counter(
+    "idempotency_lookups_total",
+    "Idempotency store lookups by tier",
+    ["tier", "result"],  # tier: memory | redis | sql; result: hit | miss
+)
+
+IDEMPOTENCY_WAITS = Counter(
+    "idempotency_inflight_waits_total",
+    "Requests that waited on an in-flight request with the same idempotency key",
+    ["outcome"],  # replayed | timeout
+)
+
+IDEMPOTENCY_RECORDS = Gauge(
+    "idempotency_records",
+    "Rows in idempotency_records as of the last sweep (exact every 60th sweep, estimated between)",
+    multiprocess_mode="max",
+)
+
+IDEMPOTENCY_OLDEST_RECORD_AGE = Gauge(
+    "idempotency_oldest_record_age_seconds",
+    "Age of the oldest idempotency record after the last sweep; stays near the TTL "
+    "while the sweeper keeps up",
+    multiprocess_mode="max",
+)
+
+IDEMPOTENCY_SWEPT = Counter(
+    "idempotency_records_swept_total",
+    "Expired idempotency records deleted (by the sweeper, or on reuse of their key)",
+)
+
+ITEM_CACHE = Counter(
+    "item_cache_events_total",
+    "Single-item read cache events",
+    ["event"],  # hit | miss | invalidation
+)
+
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total",
+    "Rate limiter decisions by route scope set",
+    ["scope", "result"],  # result: allowed | limited
+)
+
+ADMISSION_LIMIT = Gauge(
+    "admission_concurrency_limit",
+    "Current adaptive in-flight request limit",
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for an admission slot",
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests shed with 503 by admission control",
+    ["reason"],  # deadline | queue_full | timeout
+)
+
+LOG_LINES_DROPPED = Counter(
+    "log_lines_dropped_total",
+    "Log lines dropped because the queued writer's buffer was full",
 )
 
 def observe_request(*, method: str, path: str, status_code: int, duration_s: float) -> None:
+    if method not in KNOWN_METHODS:
+        method = "OTHER"
     REQ_COUNT.labels(method=method, path=path, status_code=str(status_code)).inc()
     REQ_LATENCY.labels(method=method, path=path, status_code=str(status_code)).observe(duration_s)
 
+def observe_request_phases(path: str, durations: dict[str, float]) -> None:
+    for phase, seconds in durations.items():
+        REQ_PHASE_LATENCY.labels(path=path, phase=phase).observe(seconds)
+
+def observe_compression(encoding: str, bytes_in: int, bytes_out: int) -> None:
+    RESPONSE_COMPRESSION_BYTES.labels(encoding=encoding, stage="in").inc(bytes_in)
+    RESPONSE_COMPRESSION_BYTES.labels(encoding=encoding, stage="out").inc(bytes_out)
+
+def observe_token_cache(event: str, count: int = 1) -> None:
+    AUTH_TOKEN_CACHE.labels(event=event).inc(count)
+
+def observe_idempotency_lookup(tier: str, hit: bool) -> None:
+    IDEMPOTENCY_LOOKUPS.labels(tier=tier, result="hit" if hit else "miss").inc()
+
+def observe_idempotency_wait(outcome: str) -> None:
+    IDEMPOTENCY_WAITS.labels(outcome=outcome).inc()
+
+def observe_idempotency_table(rows: int, oldest_age_s: float) -> None:
+    IDEMPOTENCY_RECORDS.set(rows)
+    IDEMPOTENCY_OLDEST_RECORD_AGE.set(oldest_age_s)
+
+def observe_idempotency_swept(rows: int) -> None:
+    IDEMPOTENCY_SWEPT.inc(rows)
+
+def observe_item_cache(event: str) -> None:
+    ITEM_CACHE.labels(event=event).inc()
+
+_rate_limit_children: dict[tuple[str, bool], Counter] = {}
+
+def observe_rate_limit(scope: str, allowed: bool) -> None:
+    # On every authorized request: skip the labels() lookup after the first call
+    child = _rate_limit_children.get((scope, allowed))
+    if child is None:
+        child = RATE_LIMIT_DECISIONS.labels(scope=scope, result="allowed" if allowed else "limited")
+        _rate_limit_children[(scope, allowed)] = child
+    child.inc()
+
+def observe_admission_limit(limit: float) -> None:
+    ADMISSION_LIMIT.set(int(limit))
+
+def observe_admission_queue(depth: int) -> None:
+    ADMISSION_QUEUE_DEPTH.set(depth)
+
+def observe_admission_rejection(reason: str) -> None:
+    ADMISSION_REJECTIONS.labels(reason=reason).inc()
+
+def observe_change_waiters(delta: int) -> None:
+    ITEM_CHANGE_WAITERS.inc(delta)
+
+def observe_changes_compacted(rows: int) -> None:
+    ITEM_CHANGES_COMPACTED.inc(rows)
+
+def observe_log_drop() -> None:
+    LOG_LINES_DROPPED.inc()
+
+def observe_in_flight(delta: int) -> None:
+    REQ_IN_FLIGHT.inc(delta)
+
+def observe_db_pool(engine: str, checked_out: int, overflow: int, saturation: float) -> None:
+    DB_POOL_CHECKED_OUT.labels(engine=engine).set(checked_out)
+    DB_POOL_OVERFLOW.labels(engine=engine).set(max(overflow, 0))
+    DB_POOL_SATURATION.labels(engine=engine).set(saturation)
+
+def observe_db_checkout_wait(engine: str, duration_s: float) -> None:
+    DB_POOL_CHECKOUT_WAIT.labels(engine=engine).observe(duration_s)
+
+def observe_db_connection_lifetime(engine: str, duration_s: float) -> None:
+    DB_CONNECTION_LIFETIME.labels(engine=engine).observe(duration_s)
+
+def observe_db_statement(engine: str, duration_s: float) -> None:
+    DB_STATEMENT_LATENCY.labels(engine=engine).observe(duration_s)
+
+def observe_db_read_route(engine: str, reason: str) -> None:
+    DB_READ_ROUTES.labels(engine=engine, reason=reason).inc()
+
+def observe_replica_ejection(engine: str) -> None:
+    DB_REPLICA_EJECTIONS.labels(engine=engine).inc()
+
+def observe_db_deadline(outcome: str) -> None:
+    DB_DEADLINE_STATEMENTS.labels(outcome=outcome).inc()
+
+def observe_group_commit(size: int) -> None:
+    ITEM_GROUP_COMMIT_SIZE.observe(size)
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get(MULTIPROC_DIR_ENV))
+
+def mark_worker_dead(pid: Optional[int] = None) -> None:
+    """Drop a worker's live gauges from the aggregate: this one on shutdown, or one
+    that a supervisor reaped (it may have been killed before it could)."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid or os.getpid())
+
 @metrics_router.get("/metrics", include_in_schema=False)
 def metrics():
+    if multiprocess_enabled():
+        # Sum the per-worker files, so any worker answers for all of them
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
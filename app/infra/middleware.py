@@ -1,76 +1,152 @@
 from __future__ import annotations
+import math
 import secrets
 import time
-from typing import Callable
 
 import anyio
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import get_route_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.logging import log
-from app.infra.metrics import observe_request
+from app.logging import RequestLogSampler, log
+from app.infra import deadline as request_deadline
+from app.infra import timing
+from app.infra.metrics import observe_in_flight, observe_request, observe_request_phases
 
 logger = log()
 
 REQUEST_ID_HEADER = "X-Request-Id"
 TRACEPARENT_HEADER = "traceparent"
+SERVER_TIMING_HEADER = "Server-Timing"
 
-class RequestContextMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
+# Template for requests that matched no route (404s, probes); keeps labels bounded
+UNMATCHED_ROUTE = "<unmatched>"
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        rid = request.headers.get(REQUEST_ID_HEADER) or f"req_{secrets.token_urlsafe(12)}"
-        request.state.request_id = rid
-        request.state.traceparent = request.headers.get(TRACEPARENT_HEADER)
+def route_template(scope: Scope) -> str:
+    """Path template of the matched route, e.g. ``/v1/items/{item_id}``."""
+    route = scope.get("route")
+    template = getattr(route, "path_format", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    # A route of a router included with a prefix carries only its own part of the
+    # path; the prefix is what precedes that part in the request path (router
+    # prefixes here are literal, so the result stays bounded)
+    params = scope.get("path_params", {})
+    own = template.format_map(
+        {name: convertor.to_string(params[name]) for name, convertor in route.param_convertors.items()}
+    )
+    path = get_route_path(scope)
+    return path[: len(path) - len(own)] + template if path.endswith(own) else template
 
-        start = time.perf_counter()
-        try:
-            resp: Response = await call_next(request)
-            return resp
-        finally:
-            duration = time.perf_counter() - start
-            status = getattr(getattr(request, "scope", {}), "status", None)
-            # Response status isn't directly in scope; metrics is recorded in observe_request middleware below.
-            logger.info(
-                "request",
-                request_id=rid,
-                method=request.method,
-                path=request.url.path,
-                query=str(request.url.query),
-                traceparent=request.state.traceparent,
-                duration_ms=int(duration * 1000),
-            )
+def timeout_body(rid: str) -> bytes:
+    return (
+        f'{{"error": {{"code":"TIMEOUT","message":"request timed out","request_id":"{rid}"}}}}'
+    ).encode("utf-8")
+
+class RequestContextMiddleware:
+    """Pure ASGI request context: ids, deadline, access log and metrics.
 
-class TimeoutMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp, timeout_ms: int):
-        super().__init__(app)
+    One middleware instead of a ``BaseHTTPMiddleware`` pair, so requests don't pay
+    for extra task groups/memory streams and response bodies pass through unbuffered.
+    The deadline covers the handler up to ``http.response.start``; once headers are
+    sent the body is streamed without a timeout. With ``phase_timing`` the time spent
+    in each phase up to then goes out as ``Server-Timing``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        timeout_ms: int,
+        sampler: RequestLogSampler | None = None,
+        phase_timing: bool = False,
+    ):
+        self.app = app
         self.timeout_ms = timeout_ms
+        self.sampler = sampler
+        self.phase_timing = phase_timing
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        method = request.method
-        path = request.url.path
-        start = time.perf_counter()
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
+        headers = Headers(scope=scope)
+        rid = headers.get(REQUEST_ID_HEADER) or f"req_{secrets.token_urlsafe(12)}"
+        traceparent = headers.get(TRACEPARENT_HEADER)
+        state = scope.setdefault("state", {})
+        state["request_id"] = rid
+        state["traceparent"] = traceparent
+
+        status_code = 500
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                # Deadline only guards time-to-first-byte; don't cut streams short
+                deadline.deadline = math.inf
+                budget.lift()
+                out = MutableHeaders(scope=message)
+                out[REQUEST_ID_HEADER] = rid
+                if traceparent:
+                    out[TRACEPARENT_HEADER] = traceparent
+                if phases_token is not None:
+                    out[SERVER_TIMING_HEADER] = phases.server_timing(time.perf_counter() - start)
+            await send(message)
+
+        start = time.perf_counter()
+        observe_in_flight(1)
+        budget_token = None
+        phases_token = None
+        if self.phase_timing:
+            phases, phases_token = timing.start()
         try:
-            with anyio.fail_after(self.timeout_ms / 1000):
-                response = await call_next(request)
-        except TimeoutError:
-            # 504 with consistent envelope
-            rid = getattr(request.state, "request_id", "unknown")
-            response = Response(
-                content=f'{{"error": {{"code":"TIMEOUT","message":"request timed out","request_id":"{rid}"}}}}',
-                media_type="application/json",
-                status_code=504,
-            )
+            with anyio.move_on_after(self.timeout_ms / 1000) as deadline:
+                # Handlers and database statements share the cancel scope's deadline
+                # (anyio's clock is time.monotonic() on asyncio), so an interrupted
+                # statement always finds the request already cancelled
+                budget, budget_token = request_deadline.start(deadline.deadline)
+                await self.app(scope, receive, send_wrapper)
+            if deadline.cancelled_caught and not response_started:
+                # 504 with consistent envelope
+                body = timeout_body(rid)
+                await send_wrapper({
+                    "type": "http.response.start",
+                    "status": 504,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode("latin-1")),
+                    ],
+                })
+                await send_wrapper({"type": "http.response.body", "body": body})
         finally:
+            if budget_token is not None:
+                request_deadline.reset(budget_token)
+            if phases_token is not None:
+                timing.reset(phases_token)
             duration = time.perf_counter() - start
-            status_code = getattr(locals().get("response", None), "status_code", 500)
-            observe_request(method=method, path=path, status_code=status_code, duration_s=duration)
-
-        # Propagate request id and trace headers back
-        response.headers[REQUEST_ID_HEADER] = getattr(request.state, "request_id", "unknown")
-        if getattr(request.state, "traceparent", None):
-            response.headers[TRACEPARENT_HEADER] = request.state.traceparent
-        return response
+            observe_in_flight(-1)
+            path = scope["path"]
+            route = route_template(scope)
+            observe_request(
+                method=scope["method"], path=route, status_code=status_code, duration_s=duration
+            )
+            if phases_token is not None:
+                observe_request_phases(route, phases.durations)
+            rate = self.sampler.rate(route, status_code, duration) if self.sampler else 1.0
+            if RequestLogSampler.keep(rate):
+                logger.info(
+                    "request",
+                    request_id=rid,
+                    method=scope["method"],
+                    path=path,
+                    route=route,
+                    query=scope.get("query_string", b"").decode("latin-1"),
+                    status_code=status_code,
+                    traceparent=traceparent,
+                    duration_ms=int(duration * 1000),
+                    # Kept 1-in-(1/rate); lets log consumers re-weight counts
+                    **({"sample_rate": rate} if rate < 1.0 else {}),
+                )
@@ -1,21 +1,51 @@
 from __future__ import annotations
 from datetime import datetime
-from sqlalchemy import String, DateTime, Integer, Text, UniqueConstraint
+from typing import Optional
+
+from sqlalchemy import String, DateTime, Index, Integer, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.infra.db import Base
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        # Matches the list ordering so keyset pages are an index seek, not a scan + sort
+        Index("ix_items_created_at_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(200), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+    # Bumped on every UPDATE (and checked in its WHERE clause); source of the strong ETag
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+    __mapper_args__ = {"version_id_col": version}
+
+class ItemChange(Base):
+    """Outbox of item writes in commit order, written in the same transaction; read by
+    the change feed (``GET /v1/items/changes``)."""
+
+    __tablename__ = "item_changes"
+    # AUTOINCREMENT: seq is never reused, even once compaction has emptied the table
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    item_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[str] = mapped_column(String(16), nullable=False)  # create | update | delete
+    # Name after the change; null for deletes
+    name: Mapped[Optional[str]] = mapped_column(String(200), nullable=True)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
 class IdempotencyRecord(Base):
     __tablename__ = "idempotency_records"
     __table_args__ = (
         UniqueConstraint("principal_id", "route_key", "idem_key", name="uq_idem_scope"),
+        # The sweeper walks expired records oldest first
+        Index("ix_idem_created_at", "created_at"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
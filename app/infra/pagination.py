@@ -4,13 +4,22 @@ import json
 from dataclasses import dataclass
 from typing import Optional, Tuple
 
+NEXT = "next"
+PREV = "prev"
+
 @dataclass(frozen=True)
 class Cursor:
-    created_at: str
+    # Listing position; None in search cursors, which page by id alone
+    created_at: Optional[str]
     id: int
+    # NEXT: the rows after this position in walk order; PREV: the rows before it
+    direction: str = NEXT
 
-def encode_cursor(created_at_iso: str, id: int) -> str:
-    payload = {"created_at": created_at_iso, "id": id}
+def encode_cursor(created_at_iso: Optional[str], id: int, direction: str = NEXT) -> str:
+    payload: dict = {"created_at": created_at_iso} if created_at_iso is not None else {}
+    payload["id"] = id
+    if direction != NEXT:
+        payload["dir"] = direction
     raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
     return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
@@ -19,4 +28,8 @@ def decode_cursor(cursor: str) -> Cursor:
     pad = "=" * (-len(cursor) % 4)
     raw = base64.urlsafe_b64decode((cursor + pad).encode("ascii"))
     payload = json.loads(raw.decode("utf-8"))
-    return Cursor(created_at=payload["created_at"], id=int(payload["id"]))
+    return Cursor(
+        created_at=payload.get("created_at"),
+        id=int(payload["id"]),
+        direction=PREV if payload.get("dir") == PREV else NEXT,
+    )
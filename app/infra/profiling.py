@@ -0,0 +1,141 @@
+from __future__ import annotations
+import os
+import sys
+import sysconfig
+import threading
+from collections import Counter
+from types import CodeType, FrameType
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infra.auth import decode_token
+from app.logging import log
+
+logger = log()
+
+PROFILE_HEADER = "X-Profile"
+
+_SITE_PACKAGES = "site-packages" + os.sep
+_STDLIB = sysconfig.get_paths()["stdlib"] + os.sep
+
+def _label(code: CodeType) -> str:
+    path = code.co_filename
+    site = path.rfind(_SITE_PACKAGES)
+    if site >= 0:
+        path = path[site + len(_SITE_PACKAGES):]
+    elif path.startswith(_STDLIB):
+        path = path[len(_STDLIB):]
+    else:
+        path = os.path.relpath(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Samples the stack of the current thread from a background thread.
+
+    Only samples with ``anchor`` (the request's outermost frame) on the stack are the
+    request's own code running; the rest is time the request spent awaiting (I/O, the
+    threadpool, other requests on the event loop). The effective interval is bounded
+    below by the interpreter's switch interval (5ms by default).
+    """
+
+    def __init__(self, anchor: FrameType, interval_s: float):
+        self.anchor = anchor
+        self.interval_s = interval_s
+        self.stacks: Counter[tuple[CodeType, ...]] = Counter()
+        self.awaiting = 0
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def __enter__(self) -> StackSampler:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and frame is not self.anchor:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if frame is None:
+                self.awaiting += 1
+            else:
+                self.stacks[tuple(stack)] += 1
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values()) + self.awaiting
+
+    def folded(self) -> str:
+        """Collapsed stacks, root first (flamegraph.pl / speedscope input)."""
+        lines = [
+            ";".join(_label(code) for code in reversed(stack)) + f" {count}"
+            for stack, count in self.stacks.most_common()
+        ]
+        if self.awaiting:
+            lines.append(f"<awaiting> {self.awaiting}")
+        return "\n".join(lines) + "\n"
+
+class ProfileMiddleware:
+    """Sampling profile of a single request on demand.
+
+    A request with ``X-Profile: 1`` whose bearer token has ``scope`` is run under a
+    ``StackSampler``; its response is replaced by the profile (folded stacks, as an
+    attachment), with the original status in ``X-Profile-Status``. Without the header
+    (or the scope) requests pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp, scope: str, interval_ms: float = 1.0):
+        self.app = app
+        self.scope = scope
+        self.interval_s = interval_ms / 1000
+
+    def _authorized(self, headers: Headers) -> bool:
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        try:
+            return self.scope in decode_token(token).scopes
+        except Exception:
+            return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if headers.get(PROFILE_HEADER) in (None, "0") or not self._authorized(headers):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        with StackSampler(sys._getframe(), self.interval_s) as sampler:
+            await self.app(scope, receive, capture)
+
+        rid = scope.get("state", {}).get("request_id", "unknown")
+        logger.info("request_profiled", request_id=rid, samples=sampler.samples, status_code=status_code)
+        body = sampler.folded().encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"content-disposition", f'attachment; filename="profile-{rid}.folded"'.encode("latin-1")),
+                (b"x-profile-status", str(status_code).encode("latin-1")),
+                (b"x-profile-samples", str(sampler.samples).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,171 @@
+from __future__ import annotations
+import math
+import time
+from typing import Any, NamedTuple, Optional, Protocol
+
+from app.config import settings
+from app.domain import errors
+from app.infra.metrics import observe_rate_limit
+from app.infra.redis_client import get_redis
+from app.logging import log
+
+logger = log()
+
+# NamedTuples rather than frozen dataclasses: both are built on every request
+
+class Limit(NamedTuple):
+    burst: int
+    per_s: float
+
+    @property
+    def interval(self) -> float:
+        """Seconds to refill one token."""
+        return 1.0 / self.per_s
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until the bucket is full again / until the next request is allowed
+    reset_s: float
+    retry_after_s: float = 0.0
+
+def gcra(tat: float, now: float, limit: Limit) -> tuple[Decision, Optional[float]]:
+    """Token bucket as GCRA: the state is one "theoretical arrival time" per key.
+
+    Returns the decision and the new TAT to store (None when denied).
+    """
+    interval = limit.interval
+    tat = max(tat, now)
+    new_tat = tat + interval
+    allow_at = new_tat - limit.burst * interval
+    if now < allow_at:
+        return Decision(False, limit.burst, 0, tat - now, allow_at - now), None
+    remaining = int((now - allow_at) / interval + 1e-9)
+    return Decision(True, limit.burst, remaining, new_tat - now), new_tat
+
+class RateLimiter(Protocol):
+    async def acquire(self, key: str, limit: Limit) -> Decision: ...
+
+class MemoryRateLimiter:
+    """GCRA state in hash-sharded dicts, for single-node deployments.
+
+    Only touched from the event loop thread, so the read-modify-write needs no lock.
+    Shards stay small, and when one outgrows ``max_keys`` only that shard is swept
+    of keys whose bucket has refilled.
+    """
+
+    def __init__(self, shards: int = 64, max_keys: int = 4096):
+        self._mask = shards - 1
+        assert shards & self._mask == 0, "shards must be a power of two"
+        self._shards: list[dict[str, float]] = [{} for _ in range(shards)]
+        self.max_keys = max_keys
+
+    def acquire_now(self, key: str, limit: Limit, now: float | None = None) -> Decision:
+        now = time.monotonic() if now is None else now
+        shard = self._shards[hash(key) & self._mask]
+        decision, new_tat = gcra(shard.get(key, now), now, limit)
+        if new_tat is not None:
+            shard[key] = new_tat
+            if len(shard) > self.max_keys:
+                for stale in [k for k, tat in shard.items() if tat <= now]:
+                    del shard[stale]
+        return decision
+
+    async def acquire(self, key: str, limit: Limit) -> Decision:
+        return self.acquire_now(key, limit)
+
+# GCRA with the server clock, so every node sees the same buckets. Floats go back as
+# strings: Lua numbers are truncated to integers in replies.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - burst * interval
+if now < allow_at then
+  return {0, tostring(tat - now), tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+return {1, tostring(new_tat - now), tostring(now - allow_at)}
+"""
+
+class RedisRateLimiter:
+    """GCRA evaluated atomically in Redis (one script call per request).
+
+    Fails open: if Redis is unreachable requests are allowed and a warning is logged.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:"):
+        self.prefix = prefix
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    async def acquire(self, key: str, limit: Limit) -> Decision:
+        interval_ms = limit.interval * 1000
+        try:
+            allowed, reset_ms, other_ms = await self._script(
+                keys=[self.prefix + key], args=[interval_ms, limit.burst]
+            )
+        except Exception as e:
+            logger.warning("rate_limit_redis_error", error=str(e))
+            return Decision(True, limit.burst, limit.burst, 0.0)
+        reset_s = float(reset_ms) / 1000
+        if int(allowed):
+            remaining = int(float(other_ms) / interval_ms + 1e-9)
+            return Decision(True, limit.burst, remaining, reset_s)
+        return Decision(False, limit.burst, 0, reset_s, float(other_ms) / 1000)
+
+_limiter: RateLimiter | None = None
+_limiter_backend: str | None = None
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Limiter for RATE_LIMIT_BACKEND, or None when rate limiting is off."""
+    global _limiter, _limiter_backend
+    backend = settings.RATE_LIMIT_BACKEND
+    if backend == "off":
+        return None
+    if _limiter is None or _limiter_backend != backend:
+        if backend == "redis":
+            client = get_redis()
+            if client is None:
+                raise RuntimeError("RATE_LIMIT_BACKEND=redis requires REDIS_URL")
+            _limiter = RedisRateLimiter(client)
+        else:
+            _limiter = MemoryRateLimiter()
+        _limiter_backend = backend
+    return _limiter
+
+def set_rate_limiter(limiter: RateLimiter | None) -> None:
+    """Swap the limiter (tests); None rebuilds from settings on next use."""
+    global _limiter, _limiter_backend
+    _limiter = limiter
+    _limiter_backend = settings.RATE_LIMIT_BACKEND if limiter is not None else None
+
+def limit_for(scope: str) -> Limit:
+    burst, per_s = settings.RATE_LIMIT_SCOPES.get(
+        scope, (settings.RATE_LIMIT_BURST, settings.RATE_LIMIT_PER_S)
+    )
+    return Limit(int(burst), float(per_s))
+
+def rate_limit_headers(decision: Decision) -> dict[str, str]:
+    headers = {
+        "RateLimit-Limit": str(decision.limit),
+        "RateLimit-Remaining": str(decision.remaining),
+        "RateLimit-Reset": str(math.ceil(decision.reset_s)),
+    }
+    if not decision.allowed:
+        headers["Retry-After"] = str(max(1, math.ceil(decision.retry_after_s)))
+    return headers
+
+async def enforce_rate_limit(subject: str, scope: str, rid: str) -> None:
+    """Spend one token from ``subject``'s bucket for ``scope``; 429 when empty."""
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return
+    decision = await limiter.acquire(f"{subject}|{scope}", limit_for(scope))
+    observe_rate_limit(scope, decision.allowed)
+    if not decision.allowed:
+        raise errors.rate_limited("rate limit exceeded", rid, rate_limit_headers(decision))
@@ -0,0 +1,26 @@
+from __future__ import annotations
+from typing import Any, Optional
+
+from app.config import settings
+
+_client: Any = None
+
+def get_redis() -> Optional[Any]:
+    """Shared ``redis.asyncio`` client for REDIS_URL, or None when Redis isn't configured.
+
+    ``redis`` is an optional dependency (``pip install -e .[redis]``); anything speaking
+    the Redis protocol (Redis, Valkey, KeyDB, Dragonfly) works.
+    """
+    global _client
+    if not settings.REDIS_URL:
+        return None
+    if _client is None:
+        import redis.asyncio as redis
+
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+def set_redis(client: Any) -> None:
+    """Swap the shared client (tests use an in-process fake)."""
+    global _client
+    _client = client
@@ -0,0 +1,182 @@
+from __future__ import annotations
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Sequence
+
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.config import settings
+from app.infra.db import (
+    async_engine,
+    build_async_engine,
+    build_engine,
+    engine,
+    is_deadline_cancel,
+    session_scope,
+)
+from app.infra.metrics import observe_db_read_route, observe_replica_ejection
+from app.logging import log
+
+logger = log()
+
+# Principal of the current request, bound once it has been authenticated; commits on
+# the primary make it sticky
+_principal: ContextVar[Optional[str]] = ContextVar("db_principal", default=None)
+
+def bind_principal(subject: str) -> None:
+    _principal.set(subject)
+
+@dataclass(eq=False)
+class Replica:
+    name: str
+    # Sync engine sessions bind to (an AsyncEngine's sync_engine in async mode)
+    bind: Engine
+    ejected_until: float = 0.0
+
+class ReplicaRouter:
+    """Picks the engine for read-only sessions.
+
+    Replicas are used round-robin; one failing with a connection error is skipped for
+    ``eject_s``. A principal whose commit on the primary was less than ``sticky_s``
+    ago reads from the primary, so it sees its own writes despite replication lag.
+    Stickiness is per worker.
+    """
+
+    def __init__(self, replicas: Sequence[Replica], *, sticky_s: float, eject_s: float, max_sticky: int = 100_000):
+        self.replicas = list(replicas)
+        self.sticky_s = sticky_s
+        self.eject_s = eject_s
+        self.max_sticky = max_sticky
+        self._sticky: dict[str, float] = {}
+        self._next = 0
+        for replica in self.replicas:
+            self._watch(replica)
+
+    def mark_write(self, subject: str, now: float | None = None) -> None:
+        if not self.replicas:
+            return
+        now = time.monotonic() if now is None else now
+        self._sticky[subject] = now + self.sticky_s
+        if len(self._sticky) > self.max_sticky:
+            for stale in [k for k, until in self._sticky.items() if until <= now]:
+                del self._sticky[stale]
+
+    def is_sticky(self, subject: Optional[str], now: float | None = None) -> bool:
+        if subject is None:
+            return False
+        until = self._sticky.get(subject)
+        return until is not None and until > (time.monotonic() if now is None else now)
+
+    def pick(self, now: float | None = None) -> Optional[Replica]:
+        """Next replica in rotation that is not ejected (None if all are)."""
+        now = time.monotonic() if now is None else now
+        count = len(self.replicas)
+        for offset in range(count):
+            replica = self.replicas[(self._next + offset) % count]
+            if replica.ejected_until <= now:
+                self._next = (self._next + offset + 1) % count
+                return replica
+        return None
+
+    def route(self) -> Optional[Replica]:
+        """Replica for a read-only session of the current request; None: the primary."""
+        if not self.replicas:
+            return None
+        if self.is_sticky(_principal.get()):
+            observe_db_read_route("primary", "sticky")
+            return None
+        replica = self.pick()
+        if replica is None:
+            observe_db_read_route("primary", "no_replica")
+            return None
+        observe_db_read_route(replica.name, "replica")
+        return replica
+
+    def eject(self, replica: Replica, now: float | None = None) -> None:
+        replica.ejected_until = (time.monotonic() if now is None else now) + self.eject_s
+        observe_replica_ejection(replica.name)
+        logger.warning("db_replica_ejected", engine=replica.name, for_s=self.eject_s)
+
+    def _watch(self, replica: Replica) -> None:
+        def on_error(context) -> None:
+            error = context.original_exception
+            if context.is_disconnect or (
+                isinstance(context.sqlalchemy_exception, OperationalError) and not is_deadline_cancel(error)
+            ):
+                self.eject(replica)
+
+        event.listen(replica.bind, "handle_error", on_error)
+
+def build_replica_router(urls: Sequence[str]) -> ReplicaRouter:
+    replicas = []
+    for i, url in enumerate(urls):
+        name = f"replica{i}"
+        bind = build_async_engine(url, name).sync_engine if settings.DATABASE_ASYNC else build_engine(url, name)
+        replicas.append(Replica(name, bind))
+    return ReplicaRouter(replicas, sticky_s=settings.DB_REPLICA_STICKY_S, eject_s=settings.DB_REPLICA_EJECT_S)
+
+replica_router = build_replica_router(settings.DATABASE_REPLICA_URLS)
+
+def _reset_pools_after_fork() -> None:
+    for replica in replica_router.replicas:
+        replica.bind.dispose(close=False)
+
+os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+def set_replica_router(router: ReplicaRouter) -> None:
+    global replica_router
+    replica_router = router
+
+# Session.info key caching the engine picked for the session (None: the primary)
+_READ_BIND = "replica_bind"
+
+class ReplicaSession(Session):
+    """Session for read-only handlers: statements go to the replica chosen on first
+    use (the principal is known by then), writes and flushes to the primary."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            return super().get_bind(mapper, clause=clause, **kw)
+        if _READ_BIND not in self.info:
+            replica = replica_router.route()
+            self.info[_READ_BIND] = replica.bind if replica is not None else None
+        return self.info[_READ_BIND] or super().get_bind(mapper, clause=clause, **kw)
+
+def read_from_replica(db: AsyncSession) -> bool:
+    """Whether ``db`` (from ``read_session_scope``) has been reading from a replica."""
+    return db.sync_session.info.get(_READ_BIND) is not None
+
+@event.listens_for(Session, "after_commit")
+def _mark_sticky(session: Session) -> None:
+    if isinstance(session, ReplicaSession):
+        return
+    subject = _principal.get()
+    if subject is not None:
+        replica_router.mark_write(subject)
+
+ReadSessionLocal = sessionmaker(
+    bind=engine, class_=ReplicaSession, autoflush=False, autocommit=False, expire_on_commit=False
+)
+
+AsyncReadSessionLocal = (
+    async_sessionmaker(bind=async_engine, sync_session_class=ReplicaSession, autoflush=False, expire_on_commit=False)
+    if async_engine is not None
+    else None
+)
+
+@asynccontextmanager
+async def read_session_scope() -> AsyncIterator[AsyncSession]:
+    """``session_scope`` for read-only work, on a replica when one is configured."""
+    if not replica_router.replicas:
+        async with session_scope() as db:
+            yield db
+        return
+    async with session_scope(AsyncReadSessionLocal, ReadSessionLocal) as db:
+        yield db
@@ -0,0 +1,95 @@
+from __future__ import annotations
+import re
+from typing import Optional
+
+from sqlalchemy import ColumnElement, Engine, Integer, Select, column, func, literal_column, make_url, select, table, text
+
+from app.config import settings
+from app.infra.models import Item
+
+# Same word boundaries as FTS5's unicode61 tokenizer: runs of letters and digits
+_TERM = re.compile(r"[^\W_]+")
+# Terms beyond this are ignored; each one is another index lookup
+MAX_TERMS = 8
+
+SQLITE_DDL = (
+    # External content: the index stores tokens only and reads names from items.
+    # Prefix indexes for up to 3 characters: a short prefix reads one posting list
+    # instead of merging those of every word it starts
+    "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts "
+    "USING fts5(name, content='items', content_rowid='id', prefix='1 2 3')",
+    """CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF name ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO items_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+)
+
+# Expression index; queries must use the identical to_tsvector(...) expression
+POSTGRES_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_items_name_search ON items "
+    "USING gin (to_tsvector('simple'::regconfig, name))",
+)
+
+_BACKEND = make_url(settings.DATABASE_URL).get_backend_name()
+
+def install_search_index(engine: Engine) -> None:
+    """Create the name search index (idempotent); backfills it for existing items."""
+    backend = engine.dialect.name
+    with engine.begin() as conn:
+        if backend == "sqlite":
+            exists = conn.scalar(text("SELECT 1 FROM sqlite_master WHERE name = 'items_fts'"))
+            for ddl in SQLITE_DDL:
+                conn.execute(text(ddl))
+            if not exists:
+                conn.execute(text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+        elif backend == "postgresql":
+            for ddl in POSTGRES_DDL:
+                conn.execute(text(ddl))
+
+def search_terms(q: str) -> list[str]:
+    return _TERM.findall(q.lower())[:MAX_TERMS]
+
+def search_select(terms: list[str]) -> Optional[tuple[Select, ColumnElement]]:
+    """``(id, name, created_at)`` of items whose name has a word starting with each
+    term, and the item id column to order and page them by; None if the database has
+    no search index.
+
+    Pages walk matches by id, which the index yields in order, so a page costs the
+    same however many items match. Index-wide relevance (bm25, ``ts_rank``) would
+    score every match first: pages are ranked on their own with ``relevance``.
+    """
+    if _BACKEND == "sqlite":
+        fts = table("items_fts", column("rowid", Integer))
+        # Quoted, so terms are never parsed as FTS5 operators; * makes each a prefix
+        match = " ".join(f'"{term}"*' for term in terms)
+        stmt = (
+            select(Item.id, Item.name, Item.created_at)
+            .select_from(fts)
+            .join(Item, Item.id == fts.c.rowid)
+            .where(literal_column("items_fts").op("MATCH")(match))
+        )
+        # FTS5 orders and bounds its own rowid; the same condition on items.id is a sort
+        key = fts.c.rowid
+    elif _BACKEND == "postgresql":
+        config = literal_column("'simple'::regconfig")
+        query = func.to_tsquery(config, " & ".join(f"{term}:*" for term in terms))
+        stmt = select(Item.id, Item.name, Item.created_at).where(
+            func.to_tsvector(config, Item.name).op("@@")(query)
+        )
+        key = Item.id
+    else:
+        return None
+    return stmt, key
+
+def relevance(name: str, terms: list[str]) -> float:
+    """Share of the name's words starting with a term: the tightest matches score 1."""
+    words = _TERM.findall(name.lower())
+    if not words:
+        return 0.0
+    return sum(any(word.startswith(term) for term in terms) for word in words) / len(words)
@@ -0,0 +1,83 @@
+from __future__ import annotations
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+class Phases:
+    """Time spent per phase (auth, db, idempotency, render, compress) by the current request.
+
+    Phases may overlap: ``db`` counts every statement, including those run while
+    checking an idempotency key. Mutable and shared by every copy of the request's
+    context, so statements run on the threadpool are counted too.
+    """
+
+    __slots__ = ("durations", "active", "render_start")
+
+    def __init__(self):
+        self.durations: dict[str, float] = {}
+        self.active: set[str] = set()
+        self.render_start: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def server_timing(self, total_s: float) -> str:
+        """``Server-Timing`` header value (durations in ms)."""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.durations.items()]
+        entries.append(f"total;dur={total_s * 1000:.2f}")
+        return ", ".join(entries)
+
+_current: ContextVar[Optional[Phases]] = ContextVar("request_phases", default=None)
+
+def start() -> tuple[Phases, Token]:
+    """Start recording for the current request; pass the token to ``reset`` at the end."""
+    phases = Phases()
+    return phases, _current.set(phases)
+
+def reset(token: Token) -> None:
+    _current.reset(token)
+
+def record(name: str, seconds: float) -> None:
+    phases = _current.get()
+    if phases is not None:
+        phases.add(name, seconds)
+
+def render_started() -> None:
+    """The response starts rendering now (unless it already has): the endpoint
+    returned, or is building its response itself."""
+    phases = _current.get()
+    if phases is not None and phases.render_start is None:
+        phases.render_start = time.perf_counter()
+
+def render_finished() -> None:
+    """The response is built: adds the time since ``render_started`` as ``render``."""
+    phases = _current.get()
+    if phases is not None and phases.render_start is not None:
+        phases.add("render", time.perf_counter() - phases.render_start)
+        phases.render_start = None
+
+class phase:
+    """``with phase("auth"): ...`` adds the block's wall time to the request's phase.
+
+    A no-op outside a recorded request, and inside a block of the same phase (so
+    nested lookups aren't counted twice).
+    """
+
+    __slots__ = ("name", "phases", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> None:
+        phases = _current.get()
+        if phases is None or self.name in phases.active:
+            self.phases = None
+            return
+        phases.active.add(self.name)
+        self.phases = phases
+        self.start = time.perf_counter()
+
+    def __exit__(self, *_exc) -> None:
+        if self.phases is not None:
+            self.phases.add(self.name, time.perf_counter() - self.start)
+            self.phases.active.discard(self.name)
@@ -1,24 +1,173 @@
+from __future__ import annotations
+import atexit
 import logging
+import os
+import queue
+import random
+import sys
+import threading
+from typing import Callable, Mapping, Optional, TextIO
+
 import structlog
 
-def configure_logging(level: str) -> None:
+class QueuedWriter:
+    """Bounded line buffer drained to a stream by a daemon thread.
+
+    Callers only enqueue already-rendered lines, so a slow or blocked stdout never
+    stalls the event loop; when the buffer is full the line is dropped, counted and
+    reported to ``on_drop``.
+    """
+
+    BATCH = 1024
+
+    def __init__(
+        self, maxsize: int, stream: Optional[TextIO] = None, on_drop: Optional[Callable[[], None]] = None
+    ):
+        # None: resolve sys.stdout at write time (follows redirection, e.g. pytest capture)
+        self.stream = stream
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._queue: queue.Queue[Optional[str]] = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+            if self.on_drop is not None:
+                self.on_drop()
+
+    def _run(self) -> None:
+        while True:
+            line = self._queue.get()
+            stop = line is None
+            lines = [] if stop else [line]
+            # Drain whatever is already buffered into a single write
+            while not stop and len(lines) < self.BATCH:
+                try:
+                    line = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if line is None:
+                    stop = True
+                else:
+                    lines.append(line)
+            if lines:
+                stream = self.stream or sys.stdout
+                try:
+                    stream.write("\n".join(lines) + "\n")
+                    stream.flush()
+                except Exception:
+                    pass
+            if stop:
+                return
+
+    def restart(self) -> None:
+        """New queue and thread, for a forked child: only the forking thread survives a
+        fork, and the queue's lock may have been held by the writer when it happened."""
+        self._queue = queue.Queue(self._queue.maxsize)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush buffered lines and stop the thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+class QueuedLogger:
+    """structlog logger that hands rendered lines to the current ``QueuedWriter``, or
+    prints them when there is none.
+
+    The writer is looked up per line: loggers are cached on first use, and must
+    follow ``configure_logging`` run again later (tests, benchmarks) rather than
+    keep writing to the writer it closed.
+    """
+
+    def msg(self, message: str) -> None:
+        writer = _writer
+        if writer is None:
+            sys.stdout.write(message + "\n")
+            sys.stdout.flush()
+        else:
+            writer.write(message)
+
+    log = debug = info = warn = warning = error = err = critical = exception = fatal = msg
+
+class RequestLogSampler:
+    """Decides which access-log lines to keep.
+
+    Errors (status >= 400) and requests slower than ``slow_ms`` are always kept; other
+    requests are kept with the rate configured for their route template, else
+    ``default_rate``.
+    """
+
+    def __init__(self, default_rate: float, route_rates: Mapping[str, float], slow_ms: int):
+        self.default_rate = default_rate
+        self.route_rates = dict(route_rates)
+        self.slow_s = slow_ms / 1000
+
+    def rate(self, route: str, status_code: int, duration_s: float) -> float:
+        """Probability this request is logged (1.0 for errors and slow requests)."""
+        if status_code >= 400 or duration_s >= self.slow_s:
+            return 1.0
+        return self.route_rates.get(route, self.default_rate)
+
+    @staticmethod
+    def keep(rate: float) -> bool:
+        return rate >= 1.0 or random.random() < rate
+
+_writer: QueuedWriter | None = None
+
+def configure_logging(
+    level: str, queue_size: int = 0, on_drop: Optional[Callable[[], None]] = None
+) -> None:
+    """``queue_size`` > 0 writes through a background thread with that many buffered
+    lines, calling ``on_drop`` for each line dropped when they are full; 0 prints
+    synchronously on the caller."""
+    global _writer
     logging.basicConfig(
         level=getattr(logging, level.upper(), logging.INFO),
         format="%(message)s",
     )
+    shutdown_logging()
+    if queue_size > 0:
+        _writer = QueuedWriter(queue_size, on_drop=on_drop)
     structlog.configure(
         processors=[
             structlog.processors.TimeStamper(fmt="iso"),
             structlog.processors.add_log_level,
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
+            # Rendered on the caller; only the finished line crosses to the writer
             structlog.processors.JSONRenderer(),
         ],
+        logger_factory=lambda *args: QueuedLogger(),
         wrapper_class=structlog.make_filtering_bound_logger(
             getattr(logging, level.upper(), logging.INFO)
         ),
         cache_logger_on_first_use=True,
     )
 
+def shutdown_logging() -> None:
+    """Flush and stop the queued writer, if any."""
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+
+def _restart_after_fork() -> None:
+    if _writer is not None:
+        _writer.restart()
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_after_fork)
+
 def log():
     return structlog.get_logger()
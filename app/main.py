@@ -1,40 +1,108 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 
 from app.config import settings
-from app.logging import configure_logging, log
+from app.logging import RequestLogSampler, configure_logging, log
 from app.api.v1.router import router as v1_router
-from app.infra.db import init_db
-from app.infra.middleware import RequestContextMiddleware, TimeoutMiddleware
-from app.infra.metrics import metrics_router
+from app.infra.changes import run_compaction
+from app.infra.db import ensure_schema
+from app.infra.idempotency import run_sweeper
+from app.infra.admission import AdmissionControlMiddleware, build_admission_controller
+from app.infra.compression import CompressionMiddleware
+from app.infra.item_cache import item_cache
+from app.infra.middleware import RequestContextMiddleware
+from app.infra.profiling import ProfileMiddleware
+from app.infra.metrics import mark_worker_dead, metrics_router, observe_log_drop
 from app.domain.errors import AppError
 
-configure_logging(settings.LOG_LEVEL)
+configure_logging(settings.LOG_LEVEL, queue_size=settings.LOG_QUEUE_SIZE, on_drop=observe_log_drop)
 logger = log()
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # Already done when preloaded by python -m app.serve
+    ensure_schema()
+    # Cross-worker item cache invalidations (no-op without REDIS_URL)
+    background = [asyncio.create_task(item_cache.listen())]
+    # Table maintenance: one process is enough, more only contend for the write lock
+    if settings.BACKGROUND_JOBS:
+        background.append(asyncio.create_task(run_compaction()))
+        if settings.IDEMPOTENCY_TTL_S > 0:
+            background.append(asyncio.create_task(run_sweeper()))
+    logger.info("startup", env=settings.ENV, background_jobs=settings.BACKGROUND_JOBS)
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        mark_worker_dead()
+
 app = FastAPI(
     title=settings.APP_NAME,
     version="1.0.0",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
-# Middleware order matters: request context first, then timeout wrapper
-app.add_middleware(RequestContextMiddleware)
-app.add_middleware(TimeoutMiddleware, timeout_ms=settings.REQUEST_TIMEOUT_MS)
+# Innermost: a profiled request's own response is swapped for its profile
+if settings.PROFILE_SCOPE:
+    app.add_middleware(
+        ProfileMiddleware, scope=settings.PROFILE_SCOPE, interval_ms=settings.PROFILE_INTERVAL_MS
+    )
+
+# Load shedding inside the request context (last added runs first), so queue time
+# counts against the deadline and shed requests are still logged and counted
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        controller=build_admission_controller(
+            initial=settings.ADMISSION_INITIAL_LIMIT,
+            min_limit=settings.ADMISSION_MIN_LIMIT,
+            max_limit=settings.ADMISSION_MAX_LIMIT,
+            tolerance=settings.ADMISSION_LATENCY_TOLERANCE,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            max_wait_ms=min(settings.ADMISSION_MAX_QUEUE_WAIT_MS, settings.REQUEST_TIMEOUT_MS),
+        ),
+        # Change feed readers sit idle for seconds (long-poll) or indefinitely (SSE)
+        # without using capacity; counting them would pin the limit and its latency
+        exempt_paths=("/metrics", "/v1/items/changes"),
+    )
+
+# Compression inside the request context, so its CPU time shows in request latency
+# (and in Server-Timing as "compress")
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        min_bytes=settings.COMPRESSION_MIN_BYTES,
+        encodings=tuple(settings.COMPRESSION_ENCODINGS),
+        levels=settings.COMPRESSION_LEVELS,
+        route_levels=settings.COMPRESSION_ROUTES,
+    )
+
+# Single pure-ASGI middleware: request context, timeout, access log and metrics
+app.add_middleware(
+    RequestContextMiddleware,
+    timeout_ms=settings.REQUEST_TIMEOUT_MS,
+    sampler=RequestLogSampler(
+        settings.LOG_SAMPLE_RATE, settings.LOG_SAMPLE_ROUTES, slow_ms=settings.LOG_SLOW_MS
+    ),
+    phase_timing=settings.PHASE_TIMING_ENABLED,
+)
 
 app.include_router(v1_router, prefix="/v1")
 app.include_router(metrics_router)
 
-@app.on_event("startup")
-def _startup() -> None:
-    init_db()
-    logger.info("startup", env=settings.ENV)
-
 @app.exception_handler(AppError)
 def app_error_handler(_, exc: AppError):
     # Consistent error envelope
     return JSONResponse(
         status_code=exc.http_status,
+        headers=exc.headers,
         content={
             "error": {
                 "code": exc.code,
@@ -0,0 +1,265 @@
+"""Preforking server for production: ``python -m app.serve [--workers N]``.
+
+The app is imported once, in this process: settings, logging, engines, routes and
+the schema check are paid for here, then each worker is a ``fork()`` that serves the
+shared listening socket straight away. Workers run uvicorn on uvloop and httptools
+when installed. This process only supervises: a worker that exits (recycled after
+``--max-requests`` or above ``--max-rss-mb``, or crashed) is replaced, and on SIGTERM
+or SIGINT workers drain for ``--graceful-timeout`` seconds before being killed.
+Background jobs (``BACKGROUND_JOBS``) run in worker slot 0 only.
+Defaults come from the ``SERVE_*`` settings. For development use
+``uvicorn app.main:app --reload``.
+"""
+from __future__ import annotations
+import argparse
+import gc
+import importlib.util
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Any, Optional
+
+import uvicorn
+
+from app.config import settings
+from app.infra.changes import change_notifier
+from app.infra.db import ensure_schema
+from app.infra.metrics import mark_worker_dead, multiprocess_enabled
+from app.logging import log, shutdown_logging
+
+logger = log()
+
+# Workers crashing sooner than this after starting are respawned with a growing delay
+MIN_UPTIME_S = 1.0
+MAX_RESPAWN_DELAY_S = 10.0
+# Past the graceful timeout, workers still running get SIGKILL after this much more
+KILL_MARGIN_S = 5.0
+
+def rss_bytes() -> int:
+    """Resident memory of this process (0 where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def default_workers() -> int:
+    # Cores this process may run on (a container's cpuset), not every core on the host
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+def http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+def warm_up(app: Any, config: uvicorn.Config) -> None:
+    """Pay once, before forking, for what each worker would otherwise do on its first
+    request: modules imported on first use and FastAPI's per-route state, which is
+    built the first time the router matches a path."""
+    config.get_loop_factory()  # imports uvloop
+    import anyio._backends._asyncio  # noqa: F401  (anyio loads its backend lazily)
+    import concurrent.futures.thread  # noqa: F401  (the threadpool behind to_thread)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "root_path": "", "headers": [], "query_string": b""}
+    for route in app.router.routes:
+        route.matches(dict(scope))
+
+class WorkerServer(uvicorn.Server):
+    """uvicorn server that also exits once its resident memory passes ``max_rss``
+    bytes, and ends change feed waits when it starts draining so long-polls and event
+    streams don't hold the drain up until the graceful timeout.
+
+    uvicorn only checks ``limit_max_requests`` on its 0.1s tick, and its shutdown
+    closes idle connections, so a connection accepted in between would be dropped
+    unanswered. The worker stops accepting as soon as its last request arrives
+    instead; the shared socket's backlog goes to the other workers."""
+
+    def __init__(self, config: uvicorn.Config, max_rss: int = 0):
+        super().__init__(config)
+        self.max_rss = max_rss
+
+    async def startup(self, sockets: Optional[list[socket.socket]] = None) -> None:
+        # Protocols pick up config.loaded_app per connection
+        if self.config.limit_max_requests is not None:
+            app = self.config.loaded_app
+            started = 0
+
+            # uvicorn counts requests as they complete; count them as they start
+            async def counted(scope: dict[str, Any], receive: Any, send: Any) -> None:
+                nonlocal started
+                if scope["type"] == "http":
+                    started += 1
+                    if started >= self.limit_max_requests:
+                        for server in self.servers:
+                            server.close()
+                await app(scope, receive, send)
+
+            self.config.loaded_app = counted
+        await super().startup(sockets)
+
+    async def on_tick(self, counter: int) -> bool:
+        should_exit = await super().on_tick(counter)
+        # Ticks are 0.1s apart; reading /proc once a second is plenty
+        if not should_exit and self.max_rss and counter % 10 == 0:
+            rss = rss_bytes()
+            if rss > self.max_rss:
+                logger.info("worker_recycle", reason="memory", rss_mb=rss // 2**20)
+                should_exit = True
+        if should_exit:
+            change_notifier.close()
+        return should_exit
+
+class Supervisor:
+    """Forks ``workers`` processes serving ``sock`` and keeps that many running."""
+
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int, max_rss: int):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.max_rss = max_rss
+        self.children: dict[int, float] = {}  # pid -> started at (monotonic)
+        self.slots: dict[int, int] = {}  # pid -> worker slot, 0..workers-1
+        self.failures = 0
+        self.respawn_at = 0.0
+        self.kill_at: Optional[float] = None  # set once stopping
+
+    def run(self) -> int:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self.stop)
+        while self.kill_at is None or self.children:
+            for pid, status in self.reap():
+                started = self.children.pop(pid)
+                self.slots.pop(pid, None)
+                mark_worker_dead(pid)
+                code = os.waitstatus_to_exitcode(status)
+                if self.kill_at is None:
+                    logger.info("worker_exit", pid=pid, code=code, uptime_s=round(time.monotonic() - started, 1))
+                    # Recycled workers exit 0 and are replaced at once; crash loops back off
+                    quick = code != 0 and time.monotonic() - started < MIN_UPTIME_S
+                    self.failures = self.failures + 1 if quick else 0
+                    delay = min(MAX_RESPAWN_DELAY_S, 0.1 * 2**self.failures) if self.failures else 0.0
+                    self.respawn_at = time.monotonic() + delay
+            if self.kill_at is None:
+                while len(self.children) < self.workers and time.monotonic() >= self.respawn_at:
+                    self.spawn()
+            elif time.monotonic() >= self.kill_at:
+                logger.warning("worker_kill", pids=sorted(self.children))
+                self.signal_children(signal.SIGKILL)
+                self.kill_at = float("inf")
+            # Queued connections wait in the shared socket's backlog meanwhile
+            time.sleep(0.05)
+        logger.info("shutdown_complete")
+        return 0
+
+    def stop(self, sig: int, _frame) -> None:
+        if self.kill_at is None:
+            self.kill_at = time.monotonic() + (self.config.timeout_graceful_shutdown or 0) + KILL_MARGIN_S
+        self.signal_children(signal.SIGTERM)
+
+    def signal_children(self, sig: int) -> None:
+        for pid in self.children:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def reap(self) -> list[tuple[int, int]]:
+        exited = []
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if pid in self.children:
+                exited.append((pid, status))
+        return exited
+
+    def free_slot(self) -> int:
+        taken = set(self.slots.values())
+        return next(slot for slot in range(self.workers) if slot not in taken)
+
+    def spawn(self) -> None:
+        slot = self.free_slot()
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            self.slots[pid] = slot
+            return
+        # Worker: uvicorn installs its own handlers while serving and re-raises the
+        # signal afterwards, which must not kill the process mid-cleanup
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_IGN)
+        # Whichever worker holds slot 0 (a replacement takes over its slot) runs them
+        settings.BACKGROUND_JOBS = settings.BACKGROUND_JOBS and slot == 0
+        code = 0
+        try:
+            server = WorkerServer(self.config, self.max_rss)
+            server.run(sockets=[self.sock])
+            code = 0 if server.started else 3
+        except BaseException:
+            logger.exception("worker_error")
+            code = 1
+        finally:
+            shutdown_logging()
+            # Never return into the supervisor loop
+            os._exit(code)
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS, help="0: one per CPU core")
+    parser.add_argument("--max-requests", type=int, default=settings.SERVE_MAX_REQUESTS)
+    parser.add_argument("--max-rss-mb", type=int, default=settings.SERVE_MAX_RSS_MB)
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVE_GRACEFUL_TIMEOUT_S)
+    parser.add_argument("--backlog", type=int, default=2048)
+    args = parser.parse_args(argv)
+    workers = args.workers or default_workers()
+
+    start = time.perf_counter()
+    from app.main import app
+
+    ensure_schema()
+    config = uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        loop=event_loop(),
+        http=http_protocol(),
+        backlog=args.backlog,
+        # The app writes its own access log (RequestContextMiddleware)
+        access_log=False,
+        limit_max_requests=args.max_requests or None,
+        limit_max_requests_jitter=args.max_requests // 10,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+    # Protocol classes and the middleware stack, built once for every worker
+    config.load()
+    warm_up(app, config)
+    sock = config.bind_socket()
+    # Listening from now on: connections wait in the backlog until a worker is up
+    sock.listen(args.backlog)
+    logger.info(
+        "serve_start",
+        workers=workers,
+        loop=config.loop,
+        http=config.http,
+        preload_ms=round((time.perf_counter() - start) * 1000, 1),
+    )
+    if workers > 1 and not multiprocess_enabled():
+        logger.warning("metrics_per_worker", hint="set PROMETHEUS_MULTIPROC_DIR to aggregate /metrics")
+    # Preloaded objects are never freed: keep the collector from walking them in every
+    # worker, which would also copy their pages (refcount writes) into each one
+    gc.collect()
+    gc.freeze()
+    return Supervisor(config, sock, workers, args.max_rss_mb * 2**20).run()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Bearer-token decode throughput: HS256 vs RS256 vs ES256, cache on and off.
+
+Each configuration decodes the same token ``--iterations`` times through
+``app.infra.auth.decode_token``; "cache on" therefore measures the hit path.
+
+    python -m benchmarks.bench_auth [--iterations 20000]
+"""
+from __future__ import annotations
+import argparse
+import json
+import tempfile
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk, jwt
+
+from app.config import settings
+from app.infra import auth
+from app.infra.auth import TokenCache
+
+def keypair(algorithm: str):
+    if algorithm == "RS256":
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        private = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public_pem = private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return private_pem, {**jwk.construct(public_pem, algorithm).to_dict(), "kid": "bench"}
+
+def configure(algorithm: str) -> str:
+    payload = {
+        "sub": "bench",
+        "scopes": ["items:read"],
+        "iss": settings.JWT_ISSUER,
+        "aud": settings.JWT_AUDIENCE,
+        "exp": int(time.time()) + 3600,
+    }
+    settings.JWT_ALGORITHM = algorithm
+    auth._keyset = None
+    if algorithm.startswith("HS"):
+        return jwt.encode(payload, settings.JWT_SECRET, algorithm=algorithm)
+    private_pem, public_jwk = keypair(algorithm)
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump({"keys": [public_jwk]}, f)
+    settings.JWT_KEYS_FILE = f.name
+    return jwt.encode(payload, private_pem, algorithm=algorithm, headers={"kid": "bench"})
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    for algorithm in ("HS256", "RS256", "ES256"):
+        token = configure(algorithm)
+        for cache_size in (0, 10_000):
+            auth.token_cache = TokenCache(cache_size)
+            auth.decode_token(token)
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                auth.decode_token(token)
+            elapsed = time.perf_counter() - start
+            label = "on " if cache_size else "off"
+            print(f"{algorithm} cache {label}: {args.iterations / elapsed:10.0f} decodes/s "
+                  f"({elapsed / args.iterations * 1e6:7.1f} us/decode)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Ingest throughput: one ``POST /v1/items`` per item vs ``POST /v1/items:batch``.
+
+Runs the real app over an in-process ASGI transport against a fresh SQLite
+file, so the numbers cover JWT decode, idempotency and the database but not
+HTTP parsing.
+
+    python -m benchmarks.bench_batch [--items 20000] [--batch-size 1000]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-batch-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/bench.db"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# All traffic comes from one principal; keep its rate limit out of the numbers
+os.environ.setdefault("RATE_LIMIT_BACKEND", "off")
+
+import httpx  # noqa: E402
+from jose import jwt  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.infra.db import init_db  # noqa: E402
+
+def auth_header() -> dict:
+    token = jwt.encode(
+        {
+            "sub": "bench",
+            "scopes": ["items:read", "items:write"],
+            "iss": settings.JWT_ISSUER,
+            "aud": settings.JWT_AUDIENCE,
+            "exp": int(time.time()) + 3600,
+        },
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+async def run(items: int, singles: int, batch_size: int) -> None:
+    from app.main import app
+
+    init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", headers=auth_header()
+    ) as client:
+        start = time.perf_counter()
+        for i in range(singles):
+            r = await client.post(
+                "/v1/items", json={"name": f"single-{i}"}, headers={"Idempotency-Key": f"s{i}"}
+            )
+            assert r.status_code == 201
+        elapsed = time.perf_counter() - start
+        print(f"single POST : {singles / elapsed:9.0f} items/s ({singles} items)")
+
+        start = time.perf_counter()
+        for offset in range(0, items, batch_size):
+            ops = [
+                {"op": "create", "name": f"batch-{i}", "idempotency_key": f"b{i}"}
+                for i in range(offset, min(offset + batch_size, items))
+            ]
+            r = await client.post("/v1/items:batch", json={"operations": ops})
+            assert r.status_code == 200
+        elapsed = time.perf_counter() - start
+        print(f"batch POST  : {items / elapsed:9.0f} items/s "
+              f"({items} items, {batch_size} per batch)")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--singles", type=int, default=1_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.singles, args.batch_size))
+
+if __name__ == "__main__":
+    main()
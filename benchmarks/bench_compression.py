@@ -0,0 +1,80 @@
+"""CPU cost versus bytes saved per response encoding and level.
+
+Compresses two payloads shaped like the app's responses with the same
+compressors ``CompressionMiddleware`` uses: a ``GET /v1/items?limit=100`` page
+(one complete body) and a 10,000-row NDJSON export sent in 1,000-row chunks,
+flushed after each chunk as the middleware does for streams. Reports the
+compressed size, CPU time per payload and throughput. Encodings whose optional
+package (``brotli``, ``zstandard``) isn't installed are listed as skipped.
+
+    python -m benchmarks.bench_compression [--repeats 50]
+"""
+from __future__ import annotations
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import orjson
+
+from app.infra.compression import COMPRESSORS
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 6), "zstd": (1, 3, 9)}
+WORDS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet")
+
+def rows(n: int) -> list[dict]:
+    rng = random.Random(7)
+    base = datetime(2026, 1, 1)
+    return [
+        {
+            "id": i + 1,
+            "name": " ".join(rng.choices(WORDS, k=3)) + f" {rng.randrange(10_000)}",
+            "created_at": (base + timedelta(seconds=i * 7)).isoformat() + "Z",
+        }
+        for i in range(n)
+    ]
+
+def list_page() -> list[bytes]:
+    return [orjson.dumps({"items": rows(100), "next_cursor": "eyJjcmVhdGVkX2F0Ijoi", "prev_cursor": None})]
+
+def export_chunks() -> list[bytes]:
+    lines = [orjson.dumps(row) + b"\n" for row in rows(10_000)]
+    return [b"".join(lines[i:i + 1000]) for i in range(0, len(lines), 1000)]
+
+def compress(encoding: str, level: int, chunks: list[bytes]) -> int:
+    compressor = COMPRESSORS[encoding](level)
+    size = 0
+    for i, chunk in enumerate(chunks):
+        last = i == len(chunks) - 1
+        size += len(compressor.compress(chunk) + (compressor.finish() if last else compressor.flush()))
+    return size
+
+def run(name: str, chunks: list[bytes], repeats: int) -> None:
+    raw = sum(len(c) for c in chunks)
+    print(f"\n{name}: {raw} bytes in {len(chunks)} chunk(s)")
+    print(f"{'encoding':<10}{'level':>6}{'bytes':>10}{'saved':>8}{'cpu p50':>11}{'MB/s':>9}{'us/KB saved':>13}")
+    for encoding, levels in LEVELS.items():
+        if encoding not in COMPRESSORS:
+            print(f"{encoding:<10}{'skipped (package not installed)':>40}")
+            continue
+        for level in levels:
+            samples = []
+            for _ in range(repeats):
+                start = time.process_time()
+                size = compress(encoding, level, chunks)
+                samples.append(time.process_time() - start)
+            cpu = statistics.median(samples)
+            saved = raw - size
+            print(f"{encoding:<10}{level:>6}{size:>10}{saved / raw:>7.0%}{cpu * 1e6:>9.0f}us"
+                  f"{raw / cpu / 1e6:>9.0f}{cpu * 1e6 / (saved / 1024):>13.1f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    run("list page (limit=100)", list_page(), args.repeats)
+    run("export (10k rows, streamed)", export_chunks(), max(1, args.repeats // 5))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""A/B the async and threadpool database modes under high concurrency.
+
+Starts a uvicorn subprocess per mode (``DATABASE_ASYNC=true|false``) against a
+fresh SQLite file, seeds a few items, then holds ``--concurrency`` connections
+open issuing ``GET /v1/items`` and ``GET /v1/items/{id}`` for ``--seconds``.
+
+    python -m benchmarks.bench_db_modes [--concurrency 500] [--seconds 15]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from jose import jwt
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def token(env: dict) -> str:
+    payload = {
+        "sub": "bench",
+        "scopes": ["items:read", "items:write"],
+        "iss": env["JWT_ISSUER"],
+        "aud": env["JWT_AUDIENCE"],
+        "exp": int(time.time()) + 3600,
+    }
+    return jwt.encode(payload, env["JWT_SECRET"], algorithm="HS256")
+
+async def wait_ready(base: str) -> None:
+    async with httpx.AsyncClient() as client:
+        for _ in range(200):
+            try:
+                await client.get(f"{base}/metrics")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+async def load(base: str, headers: dict, concurrency: int, seconds: float) -> list[float]:
+    latencies: list[float] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, headers=headers, limits=limits, timeout=60) as client:
+        ids = []
+        for i in range(20):
+            r = await client.post("/v1/items", json={"name": f"n{i}"},
+                                  headers={"Idempotency-Key": f"seed-{i}"})
+            ids.append(r.json()["id"])
+        stop = time.perf_counter() + seconds
+
+        async def worker(n: int) -> None:
+            i = n
+            while time.perf_counter() < stop:
+                path = "/v1/items?limit=25" if i % 2 else f"/v1/items/{ids[i % len(ids)]}"
+                start = time.perf_counter()
+                r = await client.get(path)
+                if r.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                i += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies
+
+def run_mode(async_mode: bool, args) -> None:
+    workdir = tempfile.mkdtemp(prefix="bench-db-")
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+        "DATABASE_ASYNC": "true" if async_mode else "false",
+        "LOG_LEVEL": "WARNING",
+        "RATE_LIMIT_BACKEND": "off",
+        "JWT_ISSUER": "bench", "JWT_AUDIENCE": "bench", "JWT_SECRET": "bench",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        asyncio.run(wait_ready(base))
+        headers = {"Authorization": f"Bearer {token(env)}"}
+        lat = asyncio.run(load(base, headers, args.concurrency, args.seconds))
+    finally:
+        proc.terminate()
+        proc.wait()
+    q = statistics.quantiles(lat, n=100)
+    mode = "async" if async_mode else "sync"
+    print(f"{mode:>5}: {len(lat) / args.seconds:8.0f} req/s  "
+          f"p50={q[49] * 1000:7.1f}ms  p99={q[98] * 1000:7.1f}ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=15)
+    args = parser.parse_args()
+    for async_mode in (False, True):
+        run_mode(async_mode, args)
+
+if __name__ == "__main__":
+    main()
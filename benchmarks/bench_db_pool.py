@@ -0,0 +1,127 @@
+"""Concurrent write throughput: SQLite/pool defaults vs the tuned settings.
+
+Each configuration runs in a fresh subprocess (settings are read at import) against
+a fresh SQLite file: ``--concurrency`` clients send ``POST /v1/items`` through the
+real app over an in-process ASGI transport, while the same number of clients page
+through ``GET /v1/items``. Reports write/read throughput, failed requests (e.g.
+"database is locked") and the p95 pool checkout wait.
+
+- default: rollback journal, synchronous=FULL, driver busy timeout, 5+10 pool
+- tuned:   the shipped settings (WAL, synchronous=NORMAL, busy_timeout=5000)
+
+    python -m benchmarks.bench_db_pool [--writes 1000] [--concurrency 32]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CONFIGS = {
+    "default": {"SQLITE_JOURNAL_MODE": "", "SQLITE_SYNCHRONOUS": "", "SQLITE_BUSY_TIMEOUT_MS": "0"},
+    "tuned": {},
+}
+
+def checkout_wait_p95() -> float:
+    from app.infra.metrics import DB_POOL_CHECKOUT_WAIT
+
+    buckets = [
+        (float(s.labels["le"]), s.value)
+        for s in DB_POOL_CHECKOUT_WAIT.labels(engine="async").collect()[0].samples
+        if s.name.endswith("_bucket")
+    ]
+    total = buckets[-1][1]
+    return next((le for le, count in buckets if count >= 0.95 * total), float("inf"))
+
+async def child(writes: int, concurrency: int) -> dict:
+    import httpx
+    from jose import jwt
+
+    from app.config import settings
+    from app.infra.db import init_db
+    from app.main import app
+
+    init_db()
+    token = jwt.encode(
+        {
+            "sub": "bench",
+            "scopes": ["items:read", "items:write"],
+            "iss": settings.JWT_ISSUER,
+            "aud": settings.JWT_AUDIENCE,
+            "exp": int(time.time()) + 3600,
+        },
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    counts = {"writes": 0, "reads": 0, "failed": 0}
+    remaining = writes
+    done = False
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://bench",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+
+        async def writer() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                r = await client.post(
+                    "/v1/items", json={"name": "w"}, headers={"Idempotency-Key": f"k{remaining}"}
+                )
+                counts["writes" if r.status_code == 201 else "failed"] += 1
+
+        async def reader() -> None:
+            while not done:
+                r = await client.get("/v1/items", params={"limit": 25})
+                counts["reads" if r.status_code == 200 else "failed"] += 1
+
+        start = time.perf_counter()
+        readers = [asyncio.create_task(reader()) for _ in range(concurrency)]
+        await asyncio.gather(*(writer() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done = True
+        await asyncio.gather(*readers)
+    return {
+        "writes_per_s": counts["writes"] / elapsed,
+        "reads_per_s": counts["reads"] / elapsed,
+        "failed": counts["failed"],
+        "checkout_wait_p95_ms": checkout_wait_p95() * 1000,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.writes, args.concurrency))))
+        return
+
+    for name, overrides in CONFIGS.items():
+        env = {
+            **os.environ,
+            **overrides,
+            "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp(prefix='bench-db-pool-')}/bench.db",
+            "LOG_LEVEL": "WARNING",
+            # One principal sends everything; its rate limit would dominate
+            "RATE_LIMIT_BACKEND": "off",
+        }
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_db_pool", "--child",
+             "--writes", str(args.writes), "--concurrency", str(args.concurrency)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{name:8}: {r['writes_per_s']:7.0f} writes/s  {r['reads_per_s']:7.0f} reads/s  "
+              f"failed {r['failed']:4d}  checkout wait p95 <= {r['checkout_wait_p95_ms']:.1f}ms")
+
+if __name__ == "__main__":
+    main()
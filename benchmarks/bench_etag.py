@@ -0,0 +1,82 @@
+"""``GET /v1/items/{id}`` on a hot key: uncached vs cached 200 vs 304.
+
+Runs the real endpoint over an in-process ASGI transport. "uncached" disables the
+item cache so every request reads the row; "cached" serves the stored body; "304"
+sends the current ETag in ``If-None-Match`` and gets an empty response.
+
+    python -m benchmarks.bench_etag [--requests 2000]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-etag-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/bench.db"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# All traffic comes from one principal; keep its rate limit out of the numbers
+os.environ.setdefault("RATE_LIMIT_BACKEND", "off")
+
+import httpx  # noqa: E402
+from jose import jwt  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.infra.db import init_db  # noqa: E402
+from app.infra.item_cache import ItemCache  # noqa: E402
+
+def token() -> str:
+    return jwt.encode(
+        {
+            "sub": "bench",
+            "scopes": ["items:read", "items:write"],
+            "iss": settings.JWT_ISSUER,
+            "aud": settings.JWT_AUDIENCE,
+            "exp": int(time.time()) + 3600,
+        },
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+
+async def run(requests: int) -> None:
+    from app.api.v1.routes import items
+    from app.main import app
+
+    init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", headers={"Authorization": f"Bearer {token()}"}
+    ) as client:
+        r = await client.post("/v1/items", json={"name": "hot"}, headers={"Idempotency-Key": "hot"})
+        path = f"/v1/items/{r.json()['id']}"
+        etag = (await client.get(path)).headers["ETag"]
+
+        cases = (
+            ("uncached", ItemCache(0, 0), {}, 200),
+            ("cached  ", ItemCache(10, 3600), {}, 200),
+            ("304     ", ItemCache(10, 3600), {"If-None-Match": etag}, 304),
+        )
+        for label, cache, headers, expected in cases:
+            items.item_cache = cache
+            await client.get(path, headers=headers)
+            samples = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                r = await client.get(path, headers=headers)
+                samples.append(time.perf_counter() - start)
+                assert r.status_code == expected
+            total = sum(samples)
+            print(f"{label}: {requests / total:8.0f} req/s  "
+                  f"median {statistics.median(samples) * 1000:6.2f}ms  "
+                  f"body {len(r.content):3d}B")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Create throughput on SQLite WAL: one transaction per create vs group commit.
+
+Each mode runs in a fresh subprocess (settings are read at import) against a fresh
+SQLite file: ``--concurrency`` clients send ``POST /v1/items`` with unique
+Idempotency-Keys through the real app over an in-process ASGI transport. Reports
+creates/s, latency percentiles and database commits per create.
+
+- single: item and idempotency record inserted and committed in one transaction
+- group:  concurrent creates share a transaction (ITEMS_GROUP_COMMIT_WINDOW_MS)
+
+    python -m benchmarks.bench_group_commit [--writes 2000] [--concurrency 32] [--window-ms 2]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+async def child(writes: int, concurrency: int) -> dict:
+    import httpx
+    from jose import jwt
+    from sqlalchemy import event
+
+    from app.config import settings
+    from app.infra import db
+    from app.main import app
+
+    db.init_db()
+    commits = 0
+
+    def count_commit(_conn) -> None:
+        nonlocal commits
+        commits += 1
+
+    event.listen(db.async_engine.sync_engine if settings.DATABASE_ASYNC else db.engine, "commit", count_commit)
+    token = jwt.encode(
+        {
+            "sub": "bench",
+            "scopes": ["items:read", "items:write"],
+            "iss": settings.JWT_ISSUER,
+            "aud": settings.JWT_AUDIENCE,
+            "exp": int(time.time()) + 3600,
+        },
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    latencies: list[float] = []
+    failed = 0
+    remaining = writes
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://bench",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+
+        async def writer() -> None:
+            nonlocal remaining, failed
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                r = await client.post(
+                    "/v1/items", json={"name": "w"}, headers={"Idempotency-Key": f"k{remaining}"}
+                )
+                if r.status_code == 201:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    failed += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(writer() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "creates_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "commits_per_create": commits / max(len(latencies), 1),
+        "failed": failed,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.writes, args.concurrency))))
+        return
+
+    modes = {"single": "0", "group": str(args.window_ms)}
+    for name, window_ms in modes.items():
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp(prefix='bench-group-commit-')}/bench.db",
+            "ITEMS_GROUP_COMMIT_WINDOW_MS": window_ms,
+            "LOG_LEVEL": "WARNING",
+            # One principal sends everything; its rate limit would dominate
+            "RATE_LIMIT_BACKEND": "off",
+        }
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_group_commit", "--child",
+             "--writes", str(args.writes), "--concurrency", str(args.concurrency)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{name:6}: {r['creates_per_s']:6.0f} creates/s  p50 {r['p50_ms']:6.1f}ms  "
+              f"p99 {r['p99_ms']:6.1f}ms  {r['commits_per_create']:.2f} commits/create  "
+              f"failed {r['failed']}")
+
+if __name__ == "__main__":
+    main()
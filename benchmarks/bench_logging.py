@@ -0,0 +1,93 @@
+"""Access-log overhead per request at a paced request rate (default 10k rps).
+
+Emits the same ``request`` line the middleware writes, paced at ``--rps`` for
+``--seconds``, with stdout redirected to a pipe drained by a deliberately slow
+reader (``--reader-kbps``), which makes stdout back up the way it does under a
+slow log shipper. Caller-side time per request is reported for:
+
+- inline:  synchronous writes on the caller (LOG_QUEUE_SIZE=0)
+- queued:  rendered on the caller, written by the background thread
+- sampled: queued, keeping 1% of successful requests (LOG_SAMPLE_RATE=0.01)
+
+    python -m benchmarks.bench_logging [--rps 10000] [--seconds 2] [--reader-kbps 1024]
+"""
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+import structlog
+
+from app import logging as app_logging
+from app.logging import RequestLogSampler, configure_logging
+
+def slow_reader(fd: int, kbps: int, done: threading.Event) -> None:
+    chunk = 4096
+    interval = chunk / (kbps * 1024)
+    while os.read(fd, chunk):
+        # Once timing is over, drain at full speed so the writer can flush
+        if not done.is_set():
+            time.sleep(interval)
+    os.close(fd)
+
+def run(mode: str, rps: int, seconds: float, kbps: int) -> None:
+    read_fd, write_fd = os.pipe()
+    done = threading.Event()
+    reader = threading.Thread(target=slow_reader, args=(read_fd, kbps, done), daemon=True)
+    reader.start()
+    real_stdout = sys.stdout
+    sys.stdout = os.fdopen(write_fd, "w", buffering=1)
+    try:
+        configure_logging("INFO", queue_size=0 if mode == "inline" else 10_000)
+        logger = structlog.get_logger()
+        sampler = RequestLogSampler(0.01 if mode == "sampled" else 1.0, {}, slow_ms=500)
+
+        samples = []
+        total = int(rps * seconds)
+        start = time.perf_counter()
+        for i in range(total):
+            target = start + i / rps
+            while (now := time.perf_counter()) < target:
+                pass
+            rate = sampler.rate("/v1/items/{item_id}", 200, 0.002)
+            if RequestLogSampler.keep(rate):
+                logger.info(
+                    "request",
+                    request_id=f"req_{i:016d}",
+                    method="GET",
+                    path=f"/v1/items/{i}",
+                    route="/v1/items/{item_id}",
+                    query="",
+                    status_code=200,
+                    traceparent=None,
+                    duration_ms=2,
+                )
+            samples.append(time.perf_counter() - now)
+        achieved = total / (time.perf_counter() - start)
+        writer = app_logging._writer
+        dropped = writer.dropped if writer else 0
+    finally:
+        done.set()
+        app_logging.shutdown_logging()
+        sys.stdout.close()
+        sys.stdout = real_stdout
+        reader.join()
+    samples.sort()
+    print(f"{mode:8}: mean {statistics.fmean(samples) * 1e6:8.1f}us  "
+          f"p99 {samples[int(len(samples) * 0.99)] * 1e6:8.1f}us  "
+          f"max {samples[-1] * 1e3:8.2f}ms  achieved {achieved:6.0f} rps  dropped {dropped}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rps", type=int, default=10_000)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--reader-kbps", type=int, default=1024)
+    args = parser.parse_args()
+    for mode in ("inline", "queued", "sampled"):
+        run(mode, args.rps, args.seconds, args.reader_kbps)
+
+if __name__ == "__main__":
+    main()
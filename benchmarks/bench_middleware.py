@@ -0,0 +1,114 @@
+"""Per-request overhead of the request middleware stack.
+
+Compares the previous ``BaseHTTPMiddleware`` pair (request context + timeout)
+with the pure-ASGI ``RequestContextMiddleware``, driving the ASGI app directly
+so no HTTP parsing or socket I/O is included.
+
+    python -m benchmarks.bench_middleware [--requests 20000]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import logging
+import secrets
+import time
+
+import anyio
+import structlog
+from fastapi import Request, Response
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.infra.metrics import observe_request
+from app.infra.middleware import RequestContextMiddleware
+
+class LegacyRequestContextMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        rid = request.headers.get("X-Request-Id") or f"req_{secrets.token_urlsafe(12)}"
+        request.state.request_id = rid
+        request.state.traceparent = request.headers.get("traceparent")
+        start = time.perf_counter()
+        try:
+            return await call_next(request)
+        finally:
+            structlog.get_logger().info(
+                "request", request_id=rid, path=request.url.path,
+                duration_ms=int((time.perf_counter() - start) * 1000),
+            )
+
+class LegacyTimeoutMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, timeout_ms: int):
+        super().__init__(app)
+        self.timeout_ms = timeout_ms
+
+    async def dispatch(self, request: Request, call_next):
+        start = time.perf_counter()
+        try:
+            with anyio.fail_after(self.timeout_ms / 1000):
+                response = await call_next(request)
+        except TimeoutError:
+            response = Response(status_code=504)
+        observe_request(
+            method=request.method, path=request.url.path,
+            status_code=response.status_code, duration_s=time.perf_counter() - start,
+        )
+        response.headers["X-Request-Id"] = request.state.request_id
+        return response
+
+async def endpoint(request):
+    return PlainTextResponse("ok")
+
+def build(stack: str):
+    app = Starlette(routes=[Route("/bench", endpoint)])
+    if stack == "legacy":
+        app.add_middleware(LegacyRequestContextMiddleware)
+        app.add_middleware(LegacyTimeoutMiddleware, timeout_ms=8000)
+    elif stack == "asgi":
+        app.add_middleware(RequestContextMiddleware, timeout_ms=8000)
+    return app
+
+async def drive(app, n: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/bench", "raw_path": b"/bench",
+        "query_string": b"", "headers": [(b"host", b"bench")], "server": ("bench", 80),
+        "client": ("127.0.0.1", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / n
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    # Keep log rendering in the measurement but send it nowhere
+    structlog.configure(
+        processors=[structlog.processors.JSONRenderer()],
+        logger_factory=structlog.PrintLoggerFactory(open("/dev/null", "w")),
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+    )
+
+    results = {}
+    for stack in ("none", "legacy", "asgi"):
+        results[stack] = asyncio.run(drive(build(stack), args.requests))
+        print(f"{stack:>7}: {results[stack] * 1e6:8.1f} us/request")
+    for stack in ("legacy", "asgi"):
+        overhead = (results[stack] - results["none"]) * 1e6
+        print(f"{stack:>7} middleware overhead: {overhead:8.1f} us/request")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Per-page latency of ``GET /v1/items`` from page 1 to page 10,000.
+
+Seeds ``--rows`` items (default 1M; try 10M) into a fresh SQLite file, then
+times keyset pages at increasing depth through the real endpoint over an
+in-process ASGI transport. Cursors for deep pages are computed up front and
+are not part of the timing. With the ``(created_at, id)`` index and the
+row-value predicate, latency should stay flat as depth grows.
+
+    python -m benchmarks.bench_pagination [--rows 1000000] [--limit 100]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-pagination-")
+DB_PATH = f"{WORKDIR}/bench.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# All traffic comes from one principal; keep its rate limit out of the numbers
+os.environ.setdefault("RATE_LIMIT_BACKEND", "off")
+
+import httpx  # noqa: E402
+from jose import jwt  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.infra.db import init_db  # noqa: E402
+from app.infra.pagination import encode_cursor  # noqa: E402
+
+PAGES = (1, 10, 100, 1_000, 10_000)
+
+def seed(rows: int) -> None:
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    base = datetime(2026, 1, 1)
+    batch = 100_000
+    for start in range(0, rows, batch):
+        # Three rows per millisecond so the id tie-breaker is exercised
+        conn.executemany(
+            "INSERT INTO items (id, name, created_at, updated_at, version) VALUES (?, ?, ?, ?, 1)",
+            (
+                (i + 1, f"item-{i}", ts, ts)
+                for i in range(start, min(start + batch, rows))
+                for ts in [(base + timedelta(milliseconds=i // 3)).isoformat(" ")]
+            ),
+        )
+        conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+def cursor_for_page(page: int, limit: int) -> str | None:
+    if page == 1:
+        return None
+    conn = sqlite3.connect(DB_PATH)
+    created_at, id = conn.execute(
+        "SELECT created_at, id FROM items ORDER BY created_at, id LIMIT 1 OFFSET ?",
+        ((page - 1) * limit - 1,),
+    ).fetchone()
+    conn.close()
+    return encode_cursor(datetime.fromisoformat(created_at).isoformat(), id)
+
+def query_plan() -> str:
+    conn = sqlite3.connect(DB_PATH)
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id, name, created_at FROM items "
+        "WHERE (created_at, id) > (?, ?) ORDER BY created_at, id LIMIT 101",
+        ("2026-01-01 00:00:00", 1),
+    ).fetchall()
+    conn.close()
+    return "; ".join(row[-1] for row in plan)
+
+async def time_pages(limit: int, repeats: int) -> None:
+    from app.main import app
+
+    token = jwt.encode(
+        {
+            "sub": "bench",
+            "scopes": ["items:read"],
+            "iss": settings.JWT_ISSUER,
+            "aud": settings.JWT_AUDIENCE,
+            "exp": int(time.time()) + 3600,
+        },
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", headers={"Authorization": f"Bearer {token}"}
+    ) as client:
+        for page in PAGES:
+            cursor = cursor_for_page(page, limit)
+            params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                r = await client.get("/v1/items", params=params)
+                samples.append(time.perf_counter() - start)
+                assert r.status_code == 200 and len(r.json()["items"]) == limit
+            print(f"page {page:>6}: median {statistics.median(samples) * 1000:7.2f}ms  "
+                  f"max {max(samples) * 1000:7.2f}ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    if args.rows < PAGES[-1] * args.limit:
+        parser.error(f"--rows must be at least {PAGES[-1] * args.limit}")
+
+    start = time.perf_counter()
+    seed(args.rows)
+    print(f"seeded {args.rows} rows in {time.perf_counter() - start:.1f}s")
+    print(f"plan: {query_plan()}")
+    asyncio.run(time_pages(args.limit, args.repeats))
+
+if __name__ == "__main__":
+    main()
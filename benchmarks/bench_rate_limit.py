@@ -0,0 +1,52 @@
+"""Per-request cost of the rate limiter check on the in-process backend.
+
+Times ``enforce_rate_limit`` (bucket lookup, GCRA update, metrics) as called from
+``require_scopes``, across ``--principals`` distinct principals, and reports
+p50/p99/max against the 20us p99 budget. Burst and refill are set high enough
+that every request is allowed, which is the common (and slower) path.
+
+    python -m benchmarks.bench_rate_limit [--requests 200000] [--principals 10000]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import time
+
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app.config import settings  # noqa: E402
+from app.infra.rate_limit import enforce_rate_limit  # noqa: E402
+
+BUDGET_US = 20.0
+
+async def run(requests: int, principals: int) -> None:
+    settings.RATE_LIMIT_BURST = 10**9
+    settings.RATE_LIMIT_PER_S = 10**9
+    subjects = [f"user-{i}" for i in range(principals)]
+    for subject in subjects:
+        await enforce_rate_limit(subject, "items:read", "req_bench")
+
+    samples = []
+    perf_ns = time.perf_counter_ns
+    for i in range(requests):
+        subject = subjects[i % principals]
+        start = perf_ns()
+        await enforce_rate_limit(subject, "items:read", "req_bench")
+        samples.append(perf_ns() - start)
+    samples.sort()
+    p50, p99 = samples[len(samples) // 2] / 1000, samples[int(len(samples) * 0.99)] / 1000
+    verdict = "OK" if p99 < BUDGET_US else "OVER BUDGET"
+    print(f"{requests} checks, {principals} principals: p50 {p50:.2f}us  p99 {p99:.2f}us  "
+          f"max {samples[-1] / 1000:.1f}us  [{verdict}, budget p99 < {BUDGET_US:.0f}us]")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--principals", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.principals))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Latency of name search (``GET /v1/items?q=``) against a ``LIKE '%x%'`` scan.
+
+Seeds ``--rows`` items (default 1M) named with three words from a synthetic
+vocabulary into a fresh SQLite file; the FTS5 index is kept up to date by its
+triggers as rows go in. For queries of increasing breadth it then times the
+real endpoint over an in-process ASGI transport, the FTS query the endpoint
+runs, and the substring scan it replaces (which has to read every row).
+
+    python -m benchmarks.bench_search [--rows 1000000] [--limit 25]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-search-")
+DB_PATH = f"{WORKDIR}/bench.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# All traffic comes from one principal; keep its rate limit out of the numbers
+os.environ.setdefault("RATE_LIMIT_BACKEND", "off")
+
+import httpx  # noqa: E402
+from jose import jwt  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.infra.db import init_db  # noqa: E402
+
+SYLLABLES = ("ka", "lo", "mi", "ra", "ten", "vo", "zu", "bel", "dor", "fin", "gra", "hu", "ix", "ja", "pe", "sto")
+
+def vocabulary() -> list[str]:
+    # 16 + 256 + 4096 words of one to three syllables
+    return ["".join(p) for n in (1, 2, 3) for p in itertools.product(SYLLABLES, repeat=n)]
+
+def seed(rows: int) -> None:
+    init_db()
+    words = vocabulary()
+    rng = random.Random(42)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA synchronous=OFF")
+    base = datetime(2026, 1, 1)
+    batch = 100_000
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO items (id, name, created_at, updated_at, version) VALUES (?, ?, ?, ?, 1)",
+            (
+                (i + 1, " ".join(rng.choices(words, k=3)), ts, ts)
+                for i in range(start, min(start + batch, rows))
+                for ts in [(base + timedelta(milliseconds=i)).isoformat(" ")]
+            ),
+        )
+        conn.commit()
+    # Merge the index segments written batch by batch, as a quiet period would
+    conn.execute("INSERT INTO items_fts(items_fts) VALUES ('optimize')")
+    conn.execute("ANALYZE")
+    conn.close()
+
+# (label, q): a rare word, a rare word and a common prefix, a prefix matching ~1 in 6
+# names, and a single letter
+QUERIES = (
+    ("word", "gratenzu"),
+    ("two words", "gratenzu dor"),
+    ("prefix", "gra"),
+    ("letter", "g"),
+)
+
+def p(samples: list[float], q: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(q) - 1] * 1000 if len(samples) > 1 else samples[0] * 1000
+
+def time_sql(sql: str, params: tuple, repeats: int) -> tuple[list[float], int]:
+    conn = sqlite3.connect(DB_PATH)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = conn.execute(sql, params).fetchall()
+        samples.append(time.perf_counter() - start)
+    matches = conn.execute(
+        "SELECT count(*) FROM items_fts WHERE items_fts MATCH ?", (params[0],)
+    ).fetchone()[0] if "MATCH" in sql else len(rows)
+    conn.close()
+    return samples, matches
+
+# What the endpoint runs for a first page (app.infra.search.search_select)
+FTS_SQL = (
+    "SELECT items.id, items.name, items.created_at FROM items_fts "
+    "JOIN items ON items.id = items_fts.rowid WHERE items_fts MATCH ? ORDER BY items_fts.rowid DESC LIMIT ?"
+)
+# The same results without the index: rows are read newest first until the page
+# fills, all of them for a rare word
+LIKE_SQL = "SELECT id, name, created_at FROM items WHERE name LIKE ? ORDER BY id DESC LIMIT ?"
+
+async def time_endpoint(params: dict, repeats: int, client: httpx.AsyncClient) -> list[float]:
+    await client.get("/v1/items", params=params)  # warm the page cache
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        r = await client.get("/v1/items", params=params)
+        samples.append(time.perf_counter() - start)
+        assert r.status_code == 200
+    return samples
+
+async def run(limit: int, repeats: int, like_repeats: int) -> None:
+    from app.main import app
+
+    token = jwt.encode(
+        {
+            "sub": "bench",
+            "scopes": ["items:read"],
+            "iss": settings.JWT_ISSUER,
+            "aud": settings.JWT_AUDIENCE,
+            "exp": int(time.time()) + 3600,
+        },
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", headers={"Authorization": f"Bearer {token}"}
+    ) as client:
+        # The same endpoint without q: what the rest of the request costs
+        listing = await time_endpoint({"limit": limit}, repeats, client)
+        print(f"{'query':<24}{'matches':>9}{'endpoint p50':>14}{'p99':>9}{'fts p50':>10}{'like p50':>11}")
+        print(f"{'(no q)':<24}{'':>9}{p(listing, 50):>12.2f}ms{p(listing, 99):>7.2f}ms")
+        for label, q in QUERIES:
+            endpoint = await time_endpoint({"q": q, "limit": limit}, repeats, client)
+            match = " ".join(f'"{term}"*' for term in q.split())
+            fts, matches = time_sql(FTS_SQL, (match, limit + 1), repeats)
+            # Favours LIKE: one substring, no restriction to word starts
+            like, _ = time_sql(LIKE_SQL, (f"%{q.split()[0]}%", limit + 1), like_repeats)
+            print(f"{label + ' ' + repr(q):<24}{matches:>9}{p(endpoint, 50):>12.2f}ms{p(endpoint, 99):>7.2f}ms"
+                  f"{p(fts, 50):>8.2f}ms{p(like, 50):>9.2f}ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=25)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--like-repeats", type=int, default=5, help="the scan is slow; fewer samples")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seed(args.rows)
+    print(f"seeded {args.rows} rows (with FTS index) in {time.perf_counter() - start:.1f}s")
+    asyncio.run(run(args.limit, args.repeats, args.like_repeats))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Import time and time-to-first-request, per way of starting the server.
+
+Each run starts a fresh process against its own SQLite database and times:
+
+- ``import app.main`` in a bare interpreter (settings, logging, engines, routes)
+- time to first request: from spawning the server until ``GET /metrics`` answers,
+  for ``uvicorn app.main:app`` and ``python -m app.serve``, with 1 and ``--workers``
+  workers (uvicorn's spawn a fresh interpreter each, importing the app again)
+- worker replacement: the only worker of ``python -m app.serve --workers 1`` is
+  killed and a request sent at once; it waits in the listening socket's backlog for
+  the forked replacement, so its latency is what a recycled or crashed worker costs
+  (needs Linux, for /proc)
+
+"cold" starts on an empty database (schema created), "warm" on an existing one.
+
+    python -m benchmarks.bench_startup [--repeats 5] [--workers 4]
+"""
+from __future__ import annotations
+import argparse
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def env_for(db_path: str) -> dict[str, str]:
+    return {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "LOG_LEVEL": "WARNING"}
+
+def get(port: int, path: str = "/metrics") -> int:
+    # A new connection per request, and no client setup (httpx builds an SSL context
+    # per call, which would be counted as startup time)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+def wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if get(port) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.002)
+    raise RuntimeError(f"port {port} did not answer")
+
+def stop(proc: subprocess.Popen) -> None:
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+def time_import(db_path: str) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], env=env_for(db_path), check=True, capture_output=True, text=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+def time_to_first_request(command: list[str], db_path: str) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        command + ["--host", "127.0.0.1", "--port", str(port)],
+        env=env_for(db_path),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port)
+        return time.perf_counter() - start
+    finally:
+        stop(proc)
+
+def worker_pid(server_pid: int) -> int:
+    with open(f"/proc/{server_pid}/task/{server_pid}/children") as f:
+        return int(f.read().split()[0])
+
+def worker_replacement(db_path: str, kills: int) -> list[float]:
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", "1", "--host", "127.0.0.1", "--port", str(port)],
+        env=env_for(db_path),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    samples = []
+    try:
+        wait_ready(port)
+        for _ in range(kills):
+            # Past the supervisor's minimum uptime, so it respawns without backing off
+            time.sleep(1.2)
+            os.kill(worker_pid(proc.pid), signal.SIGKILL)
+            start = time.perf_counter()
+            get(port)
+            samples.append(time.perf_counter() - start)
+    finally:
+        stop(proc)
+    return samples
+
+def fmt(samples: list[float]) -> str:
+    return f"{statistics.median(samples) * 1000:>9.0f}ms{max(samples) * 1000:>9.0f}ms"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    uvicorn = [sys.executable, "-m", "uvicorn", "app.main:app", "--log-level", "warning"]
+    serve = [sys.executable, "-m", "app.serve"]
+    cases = {
+        "import app.main": time_import,
+        "uvicorn app.main:app": lambda db: time_to_first_request(uvicorn, db),
+        f"uvicorn --workers {args.workers}": lambda db: time_to_first_request(
+            uvicorn + ["--workers", str(args.workers)], db
+        ),
+        "app.serve --workers 1": lambda db: time_to_first_request(serve + ["--workers", "1"], db),
+        f"app.serve --workers {args.workers}": lambda db: time_to_first_request(
+            serve + ["--workers", str(args.workers)], db
+        ),
+    }
+    print(f"{'':<28}{'state':>6}{'p50':>11}{'max':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n, (name, measure) in enumerate(cases.items()):
+            for state in ("cold", "warm"):
+                samples = []
+                for i in range(args.repeats):
+                    # cold: a new file each time; warm: the schema from the first run stays
+                    db_path = os.path.join(tmp, f"{n}-{state}-{i if state == 'cold' else 0}.db")
+                    if state == "warm" and not os.path.exists(db_path):
+                        measure(db_path)
+                    samples.append(measure(db_path))
+                print(f"{name:<28}{state:>6}{fmt(samples)}")
+        samples = worker_replacement(os.path.join(tmp, "replace.db"), args.repeats * 2)
+        print(f"{'forked worker replacement':<28}{'warm':>6}{fmt(samples)}")
+
+if __name__ == "__main__":
+    main()
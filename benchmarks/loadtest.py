@@ -0,0 +1,335 @@
+"""Load test and regression gate for the items API.
+
+``run`` seeds a fresh SQLite database, then drives ``app.main:app`` with a traffic
+mix and reports throughput and p50/p95/p99 latency per route template. Two targets:
+
+- ``asgi``: in-process over ``httpx.ASGITransport`` (no sockets or HTTP parsing)
+- ``uvicorn``: a real ``uvicorn`` subprocess on a local port
+
+The default mix is weighted create/list/get/update/delete traffic. ``--replay``
+takes a JSON-lines file of recorded requests instead and plays it in order, cycling:
+
+    {"method": "GET", "path": "/v1/items?limit=25"}
+    {"method": "GET", "path": "/v1/items/{item_id}"}
+    {"method": "PUT", "path": "/v1/items/{item_id}", "json": {"name": "renamed"}}
+    {"method": "POST", "path": "/v1/items", "json": {"name": "new"}}
+
+``{item_id}`` is replaced with a random seeded id, and creates get a fresh
+Idempotency-Key unless the line sets ``headers``. ``--out`` writes the results as
+JSON. ``compare`` exits non-zero when a route's p95 or throughput is worse than the
+baseline by more than ``--threshold``:
+
+    python -m benchmarks.loadtest run --target asgi --requests 5000 --out baseline.json
+    python -m benchmarks.loadtest run --target uvicorn --concurrency 32 --out current.json
+    python -m benchmarks.loadtest compare baseline.json current.json [--threshold 0.1]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-loadtest-")
+DB_PATH = f"{WORKDIR}/bench.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# All traffic comes from one principal; keep its rate limit out of the numbers
+os.environ.setdefault("RATE_LIMIT_BACKEND", "off")
+
+import httpx  # noqa: E402
+from jose import jwt  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.infra.db import init_db  # noqa: E402
+
+# (weight, method, path, json body)
+DEFAULT_MIX = (
+    (40, "GET", "/v1/items?limit=25", None),
+    (35, "GET", "/v1/items/{item_id}", None),
+    (10, "POST", "/v1/items", {"name": "created"}),
+    (10, "PUT", "/v1/items/{item_id}", {"name": "updated"}),
+    (5, "DELETE", "/v1/items/{created_id}", None),
+)
+
+@dataclass
+class RequestSpec:
+    method: str
+    path: str
+    json: Any = None
+    headers: dict = field(default_factory=dict)
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies)
+
+        def pct(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "throughput_rps": round(len(ordered) / elapsed, 1),
+            "p50_ms": round(pct(0.50), 3),
+            "p95_ms": round(pct(0.95), 3),
+            "p99_ms": round(pct(0.99), 3),
+        }
+
+def seed(rows: int) -> None:
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    base = datetime(2026, 1, 1)
+    conn.executemany(
+        "INSERT INTO items (id, name, created_at, updated_at, version) VALUES (?, ?, ?, ?, 1)",
+        (
+            (i + 1, f"item-{i}", ts, ts)
+            for i in range(rows)
+            for ts in [(base + timedelta(milliseconds=i)).isoformat(" ")]
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+def load_replay(path: str) -> list[RequestSpec]:
+    with open(path, encoding="utf-8") as f:
+        return [
+            RequestSpec(d["method"].upper(), d["path"], d.get("json"), d.get("headers", {}))
+            for d in map(json.loads, filter(str.strip, f))
+        ]
+
+def route_matcher(templates: list[str]):
+    """Map concrete paths back to the app's route templates (from its OpenAPI)."""
+    compiled = [
+        (re.compile("^" + re.sub(r"\\{[^/]+?\\}", "[^/]+", re.escape(t)) + "$"), t)
+        for t in sorted(templates, key=lambda t: t.count("{"))
+    ]
+
+    def match(path: str) -> str:
+        path = path.split("?", 1)[0]
+        return next((t for pattern, t in compiled if pattern.match(path)), "<unmatched>")
+
+    return match
+
+def auth_header() -> dict:
+    token = jwt.encode(
+        {
+            "sub": "bench",
+            "scopes": ["items:read", "items:write"],
+            "iss": settings.JWT_ISSUER,
+            "aud": settings.JWT_AUDIENCE,
+            "exp": int(time.time()) + 3600,
+        },
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+class Traffic:
+    """Hands out concrete requests from the weighted mix or a replayed recording."""
+
+    def __init__(self, replay: list[RequestSpec] | None, seeded: int, rng: random.Random):
+        self.replay = replay
+        self.seeded = seeded
+        self.rng = rng
+        self.position = 0
+        # Deletes only target items created during the run, so gets/updates stay valid
+        self.created: list[int] = []
+
+    def next(self) -> RequestSpec | None:
+        if self.replay:
+            spec = self.replay[self.position % len(self.replay)]
+            self.position += 1
+        else:
+            _, method, path, body = self.rng.choices(DEFAULT_MIX, [m[0] for m in DEFAULT_MIX])[0]
+            spec = RequestSpec(method, path, body)
+        path = spec.path.replace("{item_id}", str(self.rng.randint(1, self.seeded)))
+        if "{created_id}" in path:
+            if not self.created:
+                return None
+            path = path.replace("{created_id}", str(self.created.pop()))
+        headers = dict(spec.headers)
+        if spec.method == "POST" and "Idempotency-Key" not in headers:
+            headers["Idempotency-Key"] = uuid.uuid4().hex
+        return RequestSpec(spec.method, path, spec.json, headers)
+
+async def drive(
+    client: httpx.AsyncClient,
+    traffic: Traffic,
+    match,
+    requests: int,
+    concurrency: int,
+) -> dict:
+    stats: dict[str, RouteStats] = defaultdict(RouteStats)
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            spec = traffic.next()
+            if spec is None:
+                continue
+            remaining -= 1
+            start = time.perf_counter()
+            r = await client.request(spec.method, spec.path, json=spec.json, headers=spec.headers)
+            elapsed = time.perf_counter() - start
+            route = stats[f"{spec.method} {match(spec.path)}"]
+            route.latencies.append(elapsed)
+            if r.status_code >= 400:
+                route.errors += 1
+            elif spec.method == "POST" and r.status_code == 201:
+                traffic.created.append(r.json()["id"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "total": {"requests": requests, "seconds": round(elapsed, 3),
+                  "throughput_rps": round(requests / elapsed, 1)},
+        "routes": {route: s.summary(elapsed) for route, s in sorted(stats.items())},
+    }
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def start_uvicorn() -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url) as probe:
+        for _ in range(200):
+            try:
+                await probe.get("/metrics")
+                return proc, base_url
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+async def run(args: argparse.Namespace) -> dict:
+    from app.main import app
+
+    seed(args.seed)
+    match = route_matcher(list(app.openapi()["paths"]))
+    traffic = Traffic(
+        load_replay(args.replay) if args.replay else None, args.seed, random.Random(args.rng_seed)
+    )
+    proc = None
+    if args.target == "uvicorn":
+        proc, base_url = await start_uvicorn()
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=auth_header(),
+            limits=httpx.Limits(max_connections=args.concurrency),
+        )
+    else:
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", headers=auth_header()
+        )
+    try:
+        async with client:
+            # Warm-up: first-request costs (imports, pools, caches) stay out of the numbers
+            await drive(client, traffic, match, min(200, args.requests), args.concurrency)
+            result = await drive(client, traffic, match, args.requests, args.concurrency)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    result["config"] = {
+        "target": args.target,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seed_rows": args.seed,
+        "replay": args.replay,
+    }
+    return result
+
+def print_result(result: dict) -> None:
+    total = result["total"]
+    print(f"{total['requests']} requests in {total['seconds']}s "
+          f"({total['throughput_rps']} req/s, {result['config']['target']})")
+    print(f"{'route':40} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, s in result["routes"].items():
+        print(f"{route:40} {s['requests']:7d} {s['errors']:5d} {s['throughput_rps']:8.1f} "
+              f"{s['p50_ms']:8.2f} {s['p95_ms']:8.2f} {s['p99_ms']:8.2f}")
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Regressions of ``current`` against ``baseline`` (empty when within threshold)."""
+    failures = []
+    for route, base in baseline["routes"].items():
+        now = current["routes"].get(route)
+        if now is None:
+            continue
+        p95 = now["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rps = 1 - now["throughput_rps"] / base["throughput_rps"] if base["throughput_rps"] else 0.0
+        flag = "REGRESSED" if p95 > threshold or rps > threshold else "ok"
+        print(f"{route:40} p95 {base['p95_ms']:8.2f} -> {now['p95_ms']:8.2f} ({p95:+7.1%})  "
+              f"rps {base['throughput_rps']:8.1f} -> {now['throughput_rps']:8.1f} ({-rps:+7.1%})  "
+              f"{flag}")
+        if flag != "ok":
+            failures.append(route)
+    return failures
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="drive the app and report per-route latency")
+    run_p.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    run_p.add_argument("--requests", type=int, default=5000)
+    run_p.add_argument("--concurrency", type=int, default=16)
+    run_p.add_argument("--seed", type=int, default=10_000, help="items seeded before the run")
+    run_p.add_argument("--replay", help="JSON-lines file of recorded requests")
+    run_p.add_argument("--rng-seed", type=int, default=0)
+    run_p.add_argument("--out", help="write results as JSON (e.g. a baseline)")
+
+    cmp_p = sub.add_parser("compare", help="fail if a route regressed against a baseline")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--threshold", type=float, default=0.10,
+                       help="allowed relative p95 increase / throughput drop (default 0.10)")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        result = asyncio.run(run(args))
+        print_result(result)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    failures = compare(baseline, current, args.threshold)
+    if failures:
+        print(f"{len(failures)} route(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+import os
+import tempfile
+import time
+
+import pytest
+
+# Point the app at a throwaway database before app.config is imported
+_db_dir = tempfile.mkdtemp(prefix="fastapi-prod-skeleton-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+# Tests fire bursts from one principal; test_rate_limit.py turns the limiter on
+os.environ["RATE_LIMIT_BACKEND"] = "off"
+# Nor should bursts be shed by the app's admission controller, whose adaptive state
+# would carry over between tests; test_admission.py builds its own
+os.environ["ADMISSION_ENABLED"] = "false"
+
+@pytest.fixture(scope="session", autouse=True)
+def _schema():
+    from app.infra.db import init_db
+    init_db()
+
+def bearer(sub: str = "user1", scopes: tuple[str, ...] = ("items:read", "items:write")) -> dict[str, str]:
+    """Authorization header carrying a token the app accepts."""
+    from jose import jwt
+
+    from app.config import settings
+
+    token = jwt.encode(
+        {
+            "sub": sub,
+            "scopes": list(scopes),
+            "iss": settings.JWT_ISSUER,
+            "aud": settings.JWT_AUDIENCE,
+            "exp": int(time.time()) + 3600,
+        },
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+class FakeRedis:
+    """In-process stand-in for the subset of redis.asyncio the app uses."""
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.published: list[tuple[str, str]] = []
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+@pytest.fixture()
+def fake_redis():
+    return FakeRedis()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from app.infra import middleware
+from app.infra.admission import (
+    PRIORITY_READ,
+    PRIORITY_WRITE,
+    AdmissionControlMiddleware,
+    build_admission_controller,
+)
+from app.infra.middleware import RequestContextMiddleware
+
+# Simulated backend: CAPACITY requests at full speed, slower for everyone beyond that
+CAPACITY = 4
+WORK_S = 0.04
+DEADLINE_MS = 200
+
+def overload_app(admission: bool) -> FastAPI:
+    app = FastAPI()
+    active = 0
+
+    @app.get("/work")
+    async def work():
+        nonlocal active
+        active += 1
+        try:
+            done = 0.0
+            last = time.perf_counter()
+            while done < WORK_S:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                done += (now - last) * min(1.0, CAPACITY / active)
+                last = now
+        finally:
+            active -= 1
+        return {"ok": True}
+
+    if admission:
+        app.add_middleware(
+            AdmissionControlMiddleware,
+            controller=build_admission_controller(
+                initial=16, min_limit=2, max_limit=64, tolerance=2.0, max_queue=256, max_wait_ms=100
+            ),
+        )
+    app.add_middleware(RequestContextMiddleware, timeout_ms=DEADLINE_MS)
+    return app
+
+async def call(app, path: str) -> tuple[int, dict[bytes, bytes]]:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    result: dict = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            result["headers"] = dict(message["headers"])
+
+    await app(scope, receive, send)
+    return result["status"], result["headers"]
+
+async def offered_load(app, rate: float, duration_s: float) -> list[tuple[int, dict]]:
+    """Open-loop arrivals: requests keep coming whether or not earlier ones finished."""
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(rate * duration_s)):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(call(app, "/work")))
+    return await asyncio.gather(*tasks)
+
+def test_goodput_holds_at_3x_capacity(monkeypatch):
+    monkeypatch.setattr(middleware.logger, "info", lambda *a, **kw: None)
+    capacity_rps = CAPACITY / WORK_S
+    duration = 1.5
+
+    shed = asyncio.run(offered_load(overload_app(True), 3 * capacity_rps, duration))
+    unshed = asyncio.run(offered_load(overload_app(False), 3 * capacity_rps, duration))
+
+    goodput = sum(status == 200 for status, _ in shed)
+    goodput_unshed = sum(status == 200 for status, _ in unshed)
+    assert goodput >= 0.6 * capacity_rps * duration
+    assert goodput_unshed < goodput / 2
+    rejected = [headers for status, headers in shed if status == 503]
+    assert rejected and all(b"retry-after" in headers for headers in rejected)
+
+def test_reads_are_admitted_before_writes():
+    controller = build_admission_controller(
+        initial=1, min_limit=1, max_limit=1, tolerance=2.0, max_queue=10, max_wait_ms=1000
+    )
+    order: list[str] = []
+
+    async def waiter(name: str, priority: int) -> None:
+        assert await controller.acquire(priority) is None
+        order.append(name)
+        controller.release()
+
+    async def run() -> None:
+        assert await controller.acquire(PRIORITY_WRITE) is None
+        write = asyncio.create_task(waiter("write", PRIORITY_WRITE))
+        await asyncio.sleep(0)
+        read = asyncio.create_task(waiter("read", PRIORITY_READ))
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(write, read)
+
+    asyncio.run(run())
+    assert order == ["read", "write"]
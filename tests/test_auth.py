@@ -0,0 +1,94 @@
+from __future__ import annotations
+import json
+import os
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwk, jwt, JWTError
+
+from app.config import settings
+from app.infra import auth
+from app.infra.auth import TokenCache, decode_token
+
+def hs_token(sub="user1", exp_in=3600) -> str:
+    payload = {
+        "sub": sub,
+        "scopes": ["items:read"],
+        "iss": settings.JWT_ISSUER,
+        "aud": settings.JWT_AUDIENCE,
+        "exp": int(time.time()) + exp_in,
+    }
+    return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
+
+def es_keypair(kid: str):
+    private = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    public_jwk = {**jwk.construct(public_pem, "ES256").to_dict(), "kid": kid}
+    return private_pem, public_jwk
+
+def es_token(private_pem: bytes, kid: str, sub="user1") -> str:
+    payload = {
+        "sub": sub,
+        "scopes": ["items:read"],
+        "iss": settings.JWT_ISSUER,
+        "aud": settings.JWT_AUDIENCE,
+        "exp": int(time.time()) + 3600,
+    }
+    return jwt.encode(payload, private_pem, algorithm="ES256", headers={"kid": kid})
+
+@pytest.fixture()
+def fresh_cache(monkeypatch):
+    cache = TokenCache(maxsize=2)
+    monkeypatch.setattr(auth, "token_cache", cache)
+    return cache
+
+def test_cache_hit_skips_verification(monkeypatch, fresh_cache):
+    calls = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *a, **kw: calls.append(1) or real_decode(*a, **kw))
+
+    token = hs_token()
+    assert decode_token(token).subject == "user1"
+    assert decode_token(token).subject == "user1"
+    assert len(calls) == 1
+
+def test_cache_entry_evicted_at_exp(monkeypatch, fresh_cache):
+    token = hs_token(exp_in=60)
+    decode_token(token)
+    assert fresh_cache.get(token) is not None
+
+    monkeypatch.setattr(auth.time, "time", lambda: time.monotonic() + 10**10)
+    assert fresh_cache.get(token) is None
+
+def test_cache_is_bounded(fresh_cache):
+    for sub in ("a", "b", "c"):
+        decode_token(hs_token(sub=sub))
+    assert len(fresh_cache._entries) == 2
+
+def test_es256_keyset_rotation(monkeypatch, tmp_path, fresh_cache):
+    keys_file = tmp_path / "jwks.json"
+    old_private, old_public = es_keypair("old")
+    keys_file.write_text(json.dumps({"keys": [old_public]}))
+    monkeypatch.setattr(settings, "JWT_ALGORITHM", "ES256")
+    monkeypatch.setattr(settings, "JWT_KEYS_FILE", str(keys_file))
+    monkeypatch.setattr(auth, "_keyset", None)
+
+    assert decode_token(es_token(old_private, "old")).subject == "user1"
+
+    # Rotate: new key replaces old; unknown kid forces a re-read
+    new_private, new_public = es_keypair("new")
+    keys_file.write_text(json.dumps({"keys": [new_public]}))
+    os.utime(keys_file, (time.time() + 5, time.time() + 5))
+
+    assert decode_token(es_token(new_private, "new")).subject == "user1"
+    with pytest.raises(JWTError):
+        decode_token(es_token(old_private, "old"))
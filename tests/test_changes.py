@@ -0,0 +1,150 @@
+from __future__ import annotations
+import asyncio
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.api.v1.routes import items
+from app.config import settings
+from app.infra import changes
+from app.infra.db import session_scope
+from app.infra.models import ItemChange
+from app.main import app
+from tests.conftest import bearer
+
+client = TestClient(app)
+
+def head() -> int:
+    r = client.get("/v1/items/changes", headers=bearer("changes"))
+    assert r.status_code == 200 and r.json()["changes"] == []
+    return r.json()["next_since"]
+
+def test_writes_are_logged_in_commit_order():
+    h = bearer("changes")
+    since = head()
+
+    item_id = client.post("/v1/items", json={"name": "a"}, headers={**h, "Idempotency-Key": "chg-1"}).json()["id"]
+    client.put(f"/v1/items/{item_id}", json={"name": "b"}, headers=h)
+    batch = client.post(
+        "/v1/items:batch",
+        json={"operations": [
+            {"op": "create", "name": "c", "idempotency_key": "chg-2"},
+            {"op": "delete", "id": item_id},
+            {"op": "delete", "id": 987654321},
+        ]},
+        headers=h,
+    ).json()["results"]
+    # Replays and misses write nothing
+    client.post("/v1/items", json={"name": "a"}, headers={**h, "Idempotency-Key": "chg-1"})
+    client.delete(f"/v1/items/{item_id}", headers=h)
+
+    r = client.get(f"/v1/items/changes?since={since}", headers=h)
+    assert r.status_code == 200
+    body = r.json()
+    assert [(c["item_id"], c["op"], c["name"]) for c in body["changes"]] == [
+        (item_id, "create", "a"),
+        (item_id, "update", "b"),
+        (batch[0]["item"]["id"], "create", "c"),
+        (item_id, "delete", None),
+    ]
+    seqs = [c["seq"] for c in body["changes"]]
+    assert seqs == sorted(seqs) and body["next_since"] == seqs[-1]
+
+    page = client.get(f"/v1/items/changes?since={since}&limit=2", headers=h).json()
+    assert [c["seq"] for c in page["changes"]] == seqs[:2] and page["next_since"] == seqs[1]
+
+def test_long_poll_wakes_on_commit_and_on_other_workers():
+    h = bearer("changes")
+    since = head()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=h) as ac:
+            # Woken by this worker's commit
+            poll = asyncio.create_task(ac.get(f"/v1/items/changes?since={since}&wait=5"))
+            await asyncio.sleep(0.1)
+            start = time.perf_counter()
+            await ac.post("/v1/items", json={"name": "lp"}, headers={"Idempotency-Key": "chg-lp"})
+            local = await poll
+            local_s = time.perf_counter() - start
+
+            # A commit this worker didn't see: found by the notifier's watcher
+            after = local.json()["next_since"]
+            poll = asyncio.create_task(ac.get(f"/v1/items/changes?since={after}&wait=5"))
+            await asyncio.sleep(0.1)
+            start = time.perf_counter()
+            async with session_scope() as db:
+                await db.execute(insert(ItemChange).values(item_id=1, op="update", name="elsewhere"))
+                await db.commit()
+            remote = await poll
+            remote_s = time.perf_counter() - start
+
+            # Nothing new: an empty answer once the wait is over
+            quiet = await ac.get(f"/v1/items/changes?since={remote.json()['next_since']}&wait=0.2")
+        return local, local_s, remote, remote_s, quiet
+
+    local, local_s, remote, remote_s, quiet = asyncio.run(scenario())
+    assert [c["name"] for c in local.json()["changes"]] == ["lp"]
+    assert local_s < 1
+    assert [c["name"] for c in remote.json()["changes"]] == ["elsewhere"]
+    assert remote_s < settings.ITEMS_CHANGES_POLL_MS / 1000 + 1
+    assert quiet.status_code == 200 and quiet.json()["changes"] == []
+
+def test_event_stream_delivers_new_changes():
+    since = head()
+
+    async def scenario():
+        stream = items._change_stream(since, 100, [], changes.change_notifier.generation)
+        first = asyncio.create_task(anext(stream))
+        await asyncio.sleep(0.1)
+        assert not first.done()
+        async with session_scope() as db:
+            await changes.record_changes(db, [{"item_id": 7, "op": "create", "name": "sse"}])
+            await db.commit()
+        changes.change_notifier.notify()
+        event = await asyncio.wait_for(first, 2)
+        await stream.aclose()
+        return event
+
+    event = asyncio.run(scenario())
+    assert event.startswith(b"id: %d\nevent: change\ndata: " % (since + 1))
+    assert b'"name":"sse"' in event
+
+def test_compaction_bounds_log_and_expires_old_cursors():
+    h = bearer("changes")
+    client.post("/v1/items", json={"name": "x"}, headers={**h, "Idempotency-Key": "chg-compact"})
+    latest = head()
+
+    removed = asyncio.run(changes.compact_changes(retain_rows=1))
+
+    assert removed >= 1
+    # The retained change is still served to readers that had seen the one before it
+    kept = client.get(f"/v1/items/changes?since={latest - 1}", headers=h).json()["changes"]
+    assert [c["seq"] for c in kept] == [latest]
+    r = client.get("/v1/items/changes?since=0", headers=h)
+    assert r.status_code == 410
+    assert r.json()["error"]["code"] == "GONE"
+
+def test_event_stream_ends_when_worker_drains():
+    since = head()
+
+    async def scenario():
+        notifier = changes.ChangeNotifier(poll_s=60)
+        stream = items._change_stream(since, 100, [], notifier.generation)
+        items.change_notifier, original = notifier, items.change_notifier
+        try:
+            pending = asyncio.create_task(anext(stream, None))
+            await asyncio.sleep(0.1)
+            notifier.close()
+            ended = await asyncio.wait_for(pending, 2)
+            # Long-polls don't start waiting either
+            waited = await notifier.wait(since, notifier.generation, 30)
+        finally:
+            items.change_notifier = original
+        return ended, waited
+
+    ended, waited = asyncio.run(scenario())
+    assert ended is None
+    assert waited is False
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.infra.compression import COMPRESSORS, CompressionMiddleware, accepted_encodings
+from app.infra.middleware import RequestContextMiddleware
+from app.main import app
+from tests.conftest import bearer
+
+def test_large_list_is_gzipped_and_small_item_is_not():
+    client = TestClient(app)
+    h = bearer("compression")
+    for i in range(30):
+        client.post("/v1/items", json={"name": f"compressible {i}"}, headers={**h, "Idempotency-Key": f"gz-{i}"})
+
+    plain = client.get("/v1/items?limit=100", headers={**h, "Accept-Encoding": "identity"})
+    r = client.get("/v1/items?limit=100", headers={**h, "Accept-Encoding": "gzip"})
+
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert int(r.headers["content-length"]) < len(plain.content)
+    assert r.json() == plain.json()
+    assert "content-encoding" not in plain.headers and "Accept-Encoding" in plain.headers["vary"]
+
+    item_id = r.json()["items"][0]["id"]
+    small = client.get(f"/v1/items/{item_id}", headers={**h, "Accept-Encoding": "gzip"})
+    assert small.status_code == 200 and "content-encoding" not in small.headers
+    unchanged = client.get(
+        f"/v1/items/{item_id}", headers={**h, "Accept-Encoding": "gzip", "If-None-Match": small.headers["etag"]}
+    )
+    assert unchanged.status_code == 304 and "content-encoding" not in unchanged.headers
+
+def test_accept_encoding_negotiation():
+    assert accepted_encodings("gzip;q=0.5, br, zstd;q=0") == {"gzip": 0.5, "br": 1.0, "zstd": 0.0}
+
+    demo = FastAPI()
+
+    @demo.get("/big")
+    async def big():
+        return Response("x" * 4096, media_type="text/plain")
+
+    demo.add_middleware(CompressionMiddleware, min_bytes=1024, encodings=("gzip",))
+    client = TestClient(demo)
+    assert client.get("/big", headers={"Accept-Encoding": "gzip;q=0"}).headers.get("content-encoding") is None
+    assert client.get("/big", headers={"Accept-Encoding": "*"}).headers["content-encoding"] == "gzip"
+    assert client.get("/big", headers={"Accept-Encoding": "br"}).headers.get("content-encoding") is None
+
+def stream_app(**options) -> FastAPI:
+    demo = FastAPI()
+
+    @demo.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield b'{"event": %d}\n' % i
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    demo.add_middleware(CompressionMiddleware, **options)
+    return demo
+
+def run_asgi(asgi_app, path: str, encoding: str = "gzip") -> list[dict]:
+    messages: list[dict] = []
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"accept-encoding", encoding.encode())], "scheme": "http", "server": ("test", 80),
+        "client": ("test", 1), "root_path": "", "http_version": "1.1",
+    }
+
+    async def receive():
+        await asyncio.Event().wait()  # no disconnect
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    return messages
+
+def test_streams_are_compressed_chunk_by_chunk():
+    messages = run_asgi(stream_app(min_bytes=1024, encodings=("gzip",)), "/stream")
+
+    start, *bodies = messages
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip" and b"content-length" not in headers
+    # Each chunk is flushed as it arrives: decodable on its own, nothing held back
+    decoder = zlib.decompressobj(31)
+    lines = [decoder.decompress(m["body"]) for m in bodies if m["body"]]
+    assert lines[:3] == [b'{"event": 0}\n', b'{"event": 1}\n', b'{"event": 2}\n']
+    assert gzip.decompress(b"".join(m["body"] for m in bodies)).count(b"event") == 3
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    if encoding == "br":
+        import brotli
+
+        return brotli.decompress(data)
+    if encoding == "zstd":
+        import zstandard
+
+        # Streamed frames don't declare their size, so one-shot decompress() can't be used
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return gzip.decompress(data)
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_each_installed_encoder_round_trips(encoding):
+    if encoding not in COMPRESSORS:
+        pytest.skip(f"{encoding} needs the compression extra")
+    demo = stream_app(encodings=(encoding,))
+
+    @demo.get("/big")
+    async def big():
+        return Response("compress me " * 500, media_type="text/plain")
+
+    expected = {"/big": b"compress me " * 500, "/stream": b'{"event": 0}\n{"event": 1}\n{"event": 2}\n'}
+    for path, body in expected.items():
+        start, *bodies = run_asgi(demo, path, encoding)
+        assert dict(start["headers"])[b"content-encoding"] == encoding.encode()
+        assert decompress(encoding, b"".join(m["body"] for m in bodies)) == body
+
+def test_route_level_zero_turns_compression_off():
+    messages = run_asgi(
+        stream_app(encodings=("gzip",), route_levels={"/stream": {"gzip": 0}}), "/stream"
+    )
+
+    assert b"content-encoding" not in dict(messages[0]["headers"])
+    assert b"".join(m.get("body", b"") for m in messages[1:]).count(b"event") == 3
+
+def test_idle_event_stream_sends_headers_before_the_first_event():
+    demo = FastAPI()
+
+    @demo.get("/events")
+    async def events():
+        async def stream():
+            # Longer than the request timeout: headers must already be out to lift it
+            await asyncio.sleep(0.5)
+            yield b"id: 1\nevent: change\ndata: {}\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    demo.add_middleware(CompressionMiddleware, encodings=("gzip",))
+    demo.add_middleware(RequestContextMiddleware, timeout_ms=200)
+    messages = run_asgi(demo, "/events")
+
+    start, *bodies = messages
+    assert start["status"] == 200
+    assert dict(start["headers"])[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(b"".join(m["body"] for m in bodies)).startswith(b"id: 1\n")
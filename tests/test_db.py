@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.infra.db import build_engine
+from app.infra.metrics import DB_CONNECTION_LIFETIME, DB_POOL_CHECKOUT_WAIT, DB_POOL_SATURATION
+
+def histogram_count(histogram) -> float:
+    return next(
+        s.value for s in histogram.labels(engine="sync").collect()[0].samples
+        if s.name.endswith("_count")
+    )
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path}/pragmas.db")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.SQLITE_BUSY_TIMEOUT_MS
+    engine.dispose()
+
+def test_pool_limits_and_metrics(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 1)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT_S", 0.05)
+    engine = build_engine(f"sqlite:///{tmp_path}/pool.db")
+    waits = histogram_count(DB_POOL_CHECKOUT_WAIT)
+    lifetimes = histogram_count(DB_CONNECTION_LIFETIME)
+
+    first = engine.connect()
+    second = engine.connect()
+    assert DB_POOL_SATURATION.labels(engine="sync")._value.get() == 1.0
+    with pytest.raises(PoolTimeout):
+        engine.connect()
+    assert histogram_count(DB_POOL_CHECKOUT_WAIT) == waits + 3
+
+    second.close()  # overflow connection is closed, not pooled
+    first.close()
+    assert DB_POOL_SATURATION.labels(engine="sync")._value.get() == 0.0
+    engine.dispose()
+    assert histogram_count(DB_CONNECTION_LIFETIME) == lifetimes + 2
+
+# items and idempotency_records as the first release created them
+BASELINE_SCHEMA = (
+    "CREATE TABLE items (id INTEGER NOT NULL, name VARCHAR(200) NOT NULL, "
+    "created_at DATETIME NOT NULL, PRIMARY KEY (id))",
+    "CREATE TABLE idempotency_records (id INTEGER NOT NULL, principal_id VARCHAR(200) NOT NULL, "
+    "route_key VARCHAR(200) NOT NULL, idem_key VARCHAR(200) NOT NULL, request_hash VARCHAR(64) NOT NULL, "
+    "status_code INTEGER NOT NULL, response_body TEXT NOT NULL, created_at DATETIME NOT NULL, "
+    "PRIMARY KEY (id), CONSTRAINT uq_idem_scope UNIQUE (principal_id, route_key, idem_key))",
+)
+
+def test_init_db_upgrades_a_baseline_database(monkeypatch, tmp_path):
+    from app.infra import db
+    from app.infra.models import Item
+
+    engine = build_engine(f"sqlite:///{tmp_path}/baseline.db")
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO items (id, name, created_at) VALUES (1, 'old', '2025-01-02 03:04:05')"))
+    monkeypatch.setattr(db, "engine", engine)
+
+    db.init_db()
+    db.init_db()  # nothing left to add the second time
+
+    with Session(engine) as session:
+        item = session.get(Item, 1)
+        assert item.version == 1
+        assert item.updated_at == item.created_at
+        item.name = "renamed"
+        session.commit()
+        assert item.version == 2
+    with engine.connect() as conn:
+        found = conn.execute(text("SELECT rowid FROM items_fts WHERE items_fts MATCH 'renamed'")).all()
+        assert found == [(1,)]
+    engine.dispose()
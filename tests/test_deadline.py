@@ -0,0 +1,55 @@
+from __future__ import annotations
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from app.config import settings
+from app.infra import db
+from app.infra.deps import db_session, deadline_remaining
+from app.infra.middleware import RequestContextMiddleware
+
+# Counts to 10^9 one row at a time: minutes of work unless interrupted
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+    "SELECT count(*) FROM c"
+)
+
+def deadline_count(outcome: str) -> float:
+    return REGISTRY.get_sample_value("db_deadline_statements_total", {"outcome": outcome}) or 0.0
+
+def slow_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow(session=Depends(db_session), remaining=Depends(deadline_remaining)):
+        assert 0 < remaining <= 0.3
+        await session.execute(SLOW_QUERY)
+        return {"ok": True}
+
+    app.add_middleware(RequestContextMiddleware, timeout_ms=300)
+    return app
+
+@pytest.mark.parametrize("use_async", [True, False], ids=["async", "threadpool"])
+def test_deadline_cancels_statement_and_frees_connection(monkeypatch, use_async):
+    monkeypatch.setattr(settings, "DATABASE_ASYNC", use_async)
+    pool = (db.async_engine.sync_engine if use_async else db.engine).pool
+    cancelled = deadline_count("cancelled")
+
+    with TestClient(slow_app()) as client:
+        start = time.perf_counter()
+        resp = client.get("/slow")
+        elapsed = time.perf_counter() - start
+
+    assert resp.status_code == 504
+    assert elapsed < 2
+    assert deadline_count("cancelled") == cancelled + 1
+    assert pool.checkedout() == 0
+
+def test_no_deadline_outside_requests():
+    assert deadline_remaining() is None
+    with db.engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+from app.infra import item_cache as item_cache_module
+from app.infra.item_cache import INVALIDATION_CHANNEL, ItemCache, etag_matches
+from app.infra.metrics import ITEM_CACHE
+from app.main import app
+from tests.test_items import auth_headers
+
+client = TestClient(app)
+
+def cache_events(event: str) -> float:
+    return ITEM_CACHE.labels(event=event)._value.get()
+
+def create(name: str, key: str) -> int:
+    h = auth_headers()
+    h["Idempotency-Key"] = key
+    return client.post("/v1/items", json={"name": name}, headers=h).json()["id"]
+
+def test_etag_matching_rules():
+    assert etag_matches('"1-2"', '"1-2"')
+    assert etag_matches('"0-1", W/"1-2"', '"1-2"')
+    assert not etag_matches('W/"1-2"', '"1-2"', weak=False)
+    assert etag_matches("*", '"1-2"', weak=False)
+    assert not etag_matches(None, '"1-2"')
+
+def test_get_serves_cache_and_not_modified(monkeypatch):
+    monkeypatch.setattr("app.api.v1.routes.items.item_cache", ItemCache(10, 60))
+    item_id = create("etag", "etag-1")
+    h = auth_headers(scopes=("items:read",))
+
+    hits = cache_events("hit")
+    first = client.get(f"/v1/items/{item_id}", headers=h)
+    second = client.get(f"/v1/items/{item_id}", headers=h)
+    assert first.status_code == second.status_code == 200
+    assert second.content == first.content
+    assert first.headers["ETag"] == f'"{item_id}-1"'
+    assert cache_events("hit") == hits + 1
+
+    r = client.get(f"/v1/items/{item_id}", headers={**h, "If-None-Match": first.headers["ETag"]})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["ETag"] == first.headers["ETag"]
+
+def test_update_invalidates_and_checks_if_match(monkeypatch, fake_redis):
+    monkeypatch.setattr(item_cache_module, "get_redis", lambda: fake_redis)
+    item_id = create("before", "etag-2")
+    h = auth_headers()
+    etag = client.get(f"/v1/items/{item_id}", headers=h).headers["ETag"]
+
+    r = client.put(f"/v1/items/{item_id}", json={"name": "after"}, headers={**h, "If-Match": etag})
+    assert r.status_code == 200
+    new_etag = r.headers["ETag"]
+    assert new_etag == f'"{item_id}-2"'
+    assert (INVALIDATION_CHANNEL, str(item_id)) in fake_redis.published
+
+    # The cached pre-update copy is gone
+    r = client.get(f"/v1/items/{item_id}", headers={**h, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["name"] == "after"
+
+    # Writing against the stale ETag is rejected
+    r = client.put(f"/v1/items/{item_id}", json={"name": "lost"}, headers={**h, "If-Match": etag})
+    assert r.status_code == 412
+    assert r.json()["error"]["code"] == "PRECONDITION_FAILED"
+
+    client.delete(f"/v1/items/{item_id}", headers=h)
+    assert client.get(f"/v1/items/{item_id}", headers=h).status_code == 404
+
+def test_batch_update_bumps_version():
+    item_id = create("batch", "etag-3")
+    h = auth_headers()
+    etag = client.get(f"/v1/items/{item_id}", headers=h).headers["ETag"]
+    ops = {"operations": [{"op": "update", "id": item_id, "name": "batched"}]}
+    assert client.post("/v1/items:batch", json=ops, headers=h).status_code == 200
+
+    r = client.get(f"/v1/items/{item_id}", headers={**h, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] == f'"{item_id}-2"'
+    assert r.json()["name"] == "batched"
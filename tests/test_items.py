@@ -53,3 +53,149 @@ def test_cursor_pagination_is_opaque():
     if body["next_cursor"]:
         # Ensure it's urlsafe base64-ish and not raw JSON
         assert "{" not in body["next_cursor"]
+
+@pytest.mark.parametrize("use_async", [True, False], ids=["async", "sync"])
+def test_item_lifecycle(monkeypatch, use_async):
+    monkeypatch.setattr(settings, "DATABASE_ASYNC", use_async)
+    h = auth_headers()
+    h["Idempotency-Key"] = f"lifecycle-{use_async}"
+
+    created = client.post("/v1/items", json={"name": "a"}, headers=h)
+    assert created.status_code == 201
+    item_id = created.json()["id"]
+
+    r = client.get(f"/v1/items/{item_id}", headers=auth_headers())
+    assert r.status_code == 200
+    assert r.json()["name"] == "a"
+
+    r = client.put(f"/v1/items/{item_id}", json={"name": "b"}, headers=auth_headers())
+    assert r.status_code == 200
+    assert r.json()["name"] == "b"
+
+    assert client.delete(f"/v1/items/{item_id}", headers=auth_headers()).status_code == 204
+    r = client.get(f"/v1/items/{item_id}", headers=auth_headers())
+    assert r.status_code == 404
+    assert r.json()["error"]["code"] == "NOT_FOUND"
+
+def test_cursor_pagination_walks_back_to_same_pages():
+    h = auth_headers()
+    for i in range(5):
+        hh = dict(h)
+        hh["Idempotency-Key"] = f"walk{i}"
+        client.post("/v1/items", json={"name": f"w{i}"}, headers=hh)
+
+    pages = []
+    r = client.get("/v1/items?limit=2", headers=h).json()
+    assert r["prev_cursor"] is None
+    pages.append([it["id"] for it in r["items"]])
+    while r["next_cursor"]:
+        r = client.get(f"/v1/items?limit=2&cursor={r['next_cursor']}", headers=h).json()
+        pages.append([it["id"] for it in r["items"]])
+    flat = [i for p in pages for i in p]
+    assert flat == sorted(flat)
+
+    back = []
+    while r["prev_cursor"]:
+        r = client.get(f"/v1/items?limit=2&cursor={r['prev_cursor']}", headers=h).json()
+        back.append([it["id"] for it in r["items"]])
+    assert back == pages[-2::-1]
+    assert r["next_cursor"] is not None
+
+@pytest.mark.parametrize("use_async", [True, False], ids=["async", "sync"])
+def test_batch_operations(monkeypatch, use_async):
+    monkeypatch.setattr(settings, "DATABASE_ASYNC", use_async)
+    h = auth_headers()
+    pre = dict(h)
+    pre["Idempotency-Key"] = f"batch-pre-{use_async}"
+    existing = client.post("/v1/items", json={"name": "old"}, headers=pre).json()
+
+    ops = [
+        {"op": "create", "name": "b1", "idempotency_key": f"batch-1-{use_async}"},
+        {"op": "create", "name": "b1", "idempotency_key": f"batch-1-{use_async}"},
+        {"op": "create", "name": "old", "idempotency_key": f"batch-pre-{use_async}"},
+        {"op": "create", "name": "other", "idempotency_key": f"batch-pre-{use_async}"},
+        {"op": "create", "name": "no key"},
+        {"op": "update", "id": existing["id"], "name": "renamed"},
+        {"op": "update", "id": 10**9, "name": "ghost"},
+        {"op": "delete", "id": 10**9},
+    ]
+    r = client.post("/v1/items:batch", json={"operations": ops}, headers=h)
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [res["status"] for res in results] == [201, 201, 201, 409, 400, 200, 404, 204]
+    assert results[0]["item"]["id"] == results[1]["item"]["id"]
+    assert results[2]["item"]["id"] == existing["id"]
+    assert results[4]["error"]["code"] == "INVALID_ARGUMENT"
+
+    created_id = results[0]["item"]["id"]
+    assert client.get(f"/v1/items/{created_id}", headers=h).json()["name"] == "b1"
+    assert client.get(f"/v1/items/{existing['id']}", headers=h).json()["name"] == "renamed"
+
+    # Batch creates share the single-create idempotency scope
+    single = dict(h)
+    single["Idempotency-Key"] = f"batch-1-{use_async}"
+    assert client.post("/v1/items", json={"name": "b1"}, headers=single).json()["id"] == created_id
+
+    r = client.post(
+        "/v1/items:batch", json={"operations": [{"op": "delete", "id": created_id}]}, headers=h
+    )
+    assert r.json()["results"][0]["status"] == 204
+    assert client.get(f"/v1/items/{created_id}", headers=h).status_code == 404
+
+@pytest.mark.parametrize("use_async", [True, False], ids=["async", "sync"])
+def test_export_streams_and_resumes(monkeypatch, use_async):
+    monkeypatch.setattr(settings, "DATABASE_ASYNC", use_async)
+    monkeypatch.setattr(settings, "ITEMS_EXPORT_CHUNK_ROWS", 2)
+    h = auth_headers()
+    for i in range(3):
+        hh = dict(h)
+        hh["Idempotency-Key"] = f"export{i}"
+        client.post("/v1/items", json={"name": f"e{i}"}, headers=hh)
+
+    r = client.get("/v1/items:export", headers=h)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert len(lines) >= 3
+    assert [x["id"] for x in lines] == sorted(x["id"] for x in lines)
+
+    resumed = client.get(f"/v1/items:export?cursor={lines[0]['cursor']}", headers=h)
+    assert [json.loads(line)["id"] for line in resumed.text.splitlines()] == [x["id"] for x in lines[1:]]
+
+    r = client.get("/v1/items:export?format=csv", headers=h)
+    rows = r.text.splitlines()
+    assert rows[0] == "id,name,created_at,cursor"
+    assert len(rows) == len(lines) + 1
+
+def test_export_rejects_search_cursors():
+    h = auth_headers()
+    for i in range(2):
+        client.post("/v1/items", json={"name": f"alpha {i}"}, headers={**h, "Idempotency-Key": f"export-alpha-{i}"})
+    found = client.get("/v1/items", params={"q": "alpha", "limit": 1}, headers=h).json()
+
+    r = client.get("/v1/items:export", params={"cursor": found["next_cursor"]}, headers=h)
+    assert r.status_code == 400
+    assert r.json()["error"]["code"] == "INVALID_ARGUMENT"
+
+def test_fast_path_matches_model_path(monkeypatch):
+    h = auth_headers()
+    for i in range(3):
+        client.post("/v1/items", json={"name": f"fast-é-{i}"}, headers={**h, "Idempotency-Key": f"fast{i}"})
+
+    bodies = {}
+    for fast in (True, False):
+        monkeypatch.setattr(settings, "RESPONSE_FAST_PATH", fast)
+        page = client.get("/v1/items?limit=2", headers=h)
+        cursor = page.json()["next_cursor"]
+        first = page.json()["items"][0]
+        bodies[fast] = (
+            page.content,
+            client.get(f"/v1/items?limit=2&cursor={cursor}", headers=h).content,
+            client.put(f"/v1/items/{first['id']}", json={"name": first["name"]}, headers=h).content,
+        )
+        assert page.headers["content-type"] == "application/json"
+    assert bodies[True] == bodies[False]
+
+    # The schema still comes from response_model
+    schema = app.openapi()["paths"]["/v1/items"]["get"]["responses"]["200"]
+    assert schema["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/ItemListOut"}
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import io
+import json
+import threading
+import time
+
+import anyio
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.infra import middleware
+from app.config import settings
+from app.infra.metrics import LOG_LINES_DROPPED, observe_log_drop
+from app.infra.middleware import UNMATCHED_ROUTE, RequestContextMiddleware
+from app.logging import QueuedWriter, RequestLogSampler, configure_logging, log, shutdown_logging
+
+class BlockedStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.unblocked = threading.Event()
+
+    def write(self, s):
+        self.unblocked.wait()
+        return super().write(s)
+
+def test_queued_writer_flushes_in_order_on_close():
+    stream = io.StringIO()
+    writer = QueuedWriter(100, stream)
+    for i in range(50):
+        writer.write(f"line {i}")
+    writer.close()
+    assert stream.getvalue().splitlines() == [f"line {i}" for i in range(50)]
+
+def test_full_buffer_drops_instead_of_blocking():
+    stream = BlockedStream()
+    writer = QueuedWriter(2, stream, on_drop=observe_log_drop)
+    dropped = LOG_LINES_DROPPED._value.get()
+
+    start = time.perf_counter()
+    for i in range(20):
+        writer.write(f"line {i}")
+    assert time.perf_counter() - start < 0.5
+    assert writer.dropped > 0
+    assert LOG_LINES_DROPPED._value.get() == dropped + writer.dropped
+
+    stream.unblocked.set()
+    writer.close()
+    assert len(stream.getvalue().splitlines()) == 20 - writer.dropped
+
+def test_cached_loggers_follow_reconfigure(capsys):
+    logger = log()
+    try:
+        configure_logging("INFO", queue_size=100)
+        logger.info("queued", n=1)
+        # Reconfiguring closes the writer the cached logger was bound with
+        configure_logging("INFO", queue_size=100)
+        logger.info("queued", n=2)
+        configure_logging("INFO")
+        logger.info("printed", n=3)
+        shutdown_logging()
+    finally:
+        configure_logging(settings.LOG_LEVEL, queue_size=settings.LOG_QUEUE_SIZE, on_drop=observe_log_drop)
+    lines = [line for line in capsys.readouterr().out.splitlines() if '"n": ' in line]
+    assert [json.loads(line)["n"] for line in lines] == [1, 2, 3]
+
+def test_sampling_keeps_errors_and_slow_requests(monkeypatch):
+    logged = []
+    monkeypatch.setattr(middleware.logger, "info", lambda event, **kw: logged.append(kw))
+
+    router = APIRouter()
+
+    @router.get("/{thing_id}")
+    async def get_thing(thing_id: int):
+        if thing_id == 0:
+            await anyio.sleep(0.06)
+        return {"id": thing_id}
+
+    app = FastAPI()
+    sampler = RequestLogSampler(0.0, {}, slow_ms=50)
+    app.add_middleware(RequestContextMiddleware, timeout_ms=1000, sampler=sampler)
+    app.include_router(router, prefix="/things")
+    client = TestClient(app)
+    client.get("/things/1")  # warm-up; the first request can exceed slow_ms
+    logged.clear()
+
+    for i in range(1, 6):
+        client.get(f"/things/{i}")
+    client.get("/things/0")
+    client.get("/things/nope")
+    client.get("/missing")
+
+    assert [(r["path"], r["route"], r["status_code"]) for r in logged] == [
+        ("/things/0", "/things/{thing_id}", 200),
+        ("/things/nope", "/things/{thing_id}", 422),
+        ("/missing", UNMATCHED_ROUTE, 404),
+    ]
+
+    # Per-route override wins over the default rate
+    logged.clear()
+    sampler.route_rates["/things/{thing_id}"] = 1.0
+    client.get("/things/1")
+    assert len(logged) == 1 and "sample_rate" not in logged[0]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import asyncio
+import os
+import subprocess
+import sys
+
+from fastapi import APIRouter, FastAPI, Response
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+from app.infra import middleware
+from app.infra.db import engine
+from app.infra.metrics import DB_POOL_CHECKED_OUT, MULTIPROC_DIR_ENV
+from app.infra.middleware import RequestContextMiddleware
+
+def series(prefix: str) -> set[tuple]:
+    return {
+        tuple(sorted(s.labels.items()))
+        for metric in REGISTRY.collect()
+        if metric.name == "http_requests"
+        for s in metric.samples
+        if s.labels.get("path", "").startswith(prefix) or s.labels.get("path") == "<unmatched>"
+    }
+
+async def call(app, method: str, path: str) -> None:
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+def test_series_do_not_grow_with_item_ids(monkeypatch):
+    monkeypatch.setattr(middleware.logger, "info", lambda *a, **kw: None)
+    router = APIRouter()
+
+    @router.get("/{widget_id}")
+    async def get_widget(widget_id: int):
+        return Response(status_code=204)
+
+    @router.get(":count")
+    async def count_widgets():
+        return Response(status_code=204)
+
+    # Nested prefixes, as app.main mounts the v1 routers
+    v1 = APIRouter()
+    v1.include_router(router, prefix="/widgets")
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware, timeout_ms=1000)
+    app.include_router(v1, prefix="/v1")
+
+    async def run(ids: range) -> None:
+        for i in ids:
+            await call(app, "GET", f"/v1/widgets/{i}")
+        for i in ids[:100]:
+            await call(app, "GET", f"/nowhere/{i}")
+        await call(app, "BREW", "/v1/widgets/1")
+        await call(app, "GET", "/v1/widgets:count")
+
+    asyncio.run(run(range(100)))
+    baseline = series("/v1/widgets")
+    asyncio.run(run(range(100, 3_100)))
+    assert series("/v1/widgets") == baseline
+    assert {dict(s)["path"] for s in baseline} == {"/v1/widgets/{widget_id}", "/v1/widgets:count", "<unmatched>"}
+    assert {dict(s)["method"] for s in baseline} == {"GET", "OTHER"}
+
+def test_pool_checked_out_gauge():
+    gauge = DB_POOL_CHECKED_OUT.labels(engine="sync")
+    before = gauge._value.get()
+    with engine.connect():
+        assert gauge._value.get() == before + 1
+    assert gauge._value.get() == before
+
+def test_multiprocess_mode_aggregates_workers(tmp_path):
+    env = {**os.environ, MULTIPROC_DIR_ENV: str(tmp_path)}
+    worker = (
+        "from app.infra.metrics import observe_request; "
+        "observe_request(method='GET', path='/v1/items/{item_id}', status_code=200, duration_s=0.01)"
+    )
+    for _ in range(3):
+        subprocess.run([sys.executable, "-c", worker], env=env, check=True)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+    assert registry.get_sample_value(
+        "http_requests_total",
+        {"method": "GET", "path": "/v1/items/{item_id}", "status_code": "200"},
+    ) == 3
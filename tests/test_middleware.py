@@ -0,0 +1,69 @@
+from __future__ import annotations
+import anyio
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.infra import middleware
+from app.infra.middleware import RequestContextMiddleware
+
+def make_app(timeout_ms: int = 50) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware, timeout_ms=timeout_ms)
+
+    @app.get("/fast")
+    async def fast():
+        return {"ok": True}
+
+    @app.get("/slow")
+    async def slow():
+        await anyio.sleep(1)
+        return {"ok": True}
+
+    @app.get("/teapot", status_code=418)
+    async def teapot():
+        return {"ok": False}
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for i in range(3):
+                await anyio.sleep(0.03)
+                yield f"{i}\n".encode()
+        return StreamingResponse(body(), media_type="text/plain")
+
+    return app
+
+def test_request_id_and_traceparent_propagated():
+    client = TestClient(make_app())
+    r = client.get("/fast", headers={"X-Request-Id": "req_given", "traceparent": "00-abc-def-01"})
+    assert r.status_code == 200
+    assert r.headers["X-Request-Id"] == "req_given"
+    assert r.headers["traceparent"] == "00-abc-def-01"
+
+    r = client.get("/fast")
+    assert r.headers["X-Request-Id"].startswith("req_")
+
+def test_timeout_returns_envelope():
+    client = TestClient(make_app())
+    r = client.get("/slow", headers={"X-Request-Id": "req_slow"})
+    assert r.status_code == 504
+    assert r.json()["error"] == {
+        "code": "TIMEOUT",
+        "message": "request timed out",
+        "request_id": "req_slow",
+    }
+
+def test_streaming_body_not_cut_by_deadline():
+    client = TestClient(make_app(timeout_ms=50))
+    r = client.get("/stream")
+    assert r.status_code == 200
+    assert r.text == "0\n1\n2\n"
+
+def test_metrics_see_real_status_code(monkeypatch):
+    seen = []
+    monkeypatch.setattr(middleware, "observe_request", lambda **kw: seen.append(kw))
+    client = TestClient(make_app())
+    client.get("/teapot")
+    client.get("/slow")
+    assert [s["status_code"] for s in seen] == [418, 504]
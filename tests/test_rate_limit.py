@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.infra import rate_limit
+from app.infra.rate_limit import Limit, MemoryRateLimiter
+from app.main import app
+from tests.test_items import auth_headers, make_token
+
+client = TestClient(app)
+
+@pytest.fixture()
+def limiter(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 3)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_S", 0.5)
+    limiter = MemoryRateLimiter()
+    rate_limit.set_rate_limiter(limiter)
+    yield limiter
+    rate_limit.set_rate_limiter(None)
+
+def test_bucket_refills_at_rate():
+    limiter = MemoryRateLimiter(shards=4)
+    limit = Limit(burst=2, per_s=10)
+    assert [limiter.acquire_now("k", limit, now=100.0).remaining for _ in range(2)] == [1, 0]
+
+    denied = limiter.acquire_now("k", limit, now=100.0)
+    assert not denied.allowed
+    assert denied.retry_after_s == pytest.approx(0.1)
+    assert limiter.acquire_now("k", limit, now=100.1).allowed
+    # Fully refilled after burst / rate
+    assert limiter.acquire_now("k", limit, now=101.0).remaining == 1
+
+def test_full_shard_sweeps_refilled_keys():
+    limiter = MemoryRateLimiter(shards=1, max_keys=10)
+    limit = Limit(burst=1, per_s=1)
+    for i in range(10):
+        limiter.acquire_now(f"old{i}", limit, now=0.0)
+    limiter.acquire_now("new", limit, now=5.0)
+    assert list(limiter._shards[0]) == ["new"]
+
+def test_over_limit_returns_429_envelope(limiter):
+    h = auth_headers(scopes=("items:read",))
+    for _ in range(3):
+        assert client.get("/v1/items", headers=h).status_code == 200
+
+    r = client.get("/v1/items", headers={**h, "X-Request-Id": "req_limited"})
+    assert r.status_code == 429
+    assert r.json()["error"] == {
+        "code": "RATE_LIMITED",
+        "message": "rate limit exceeded",
+        "request_id": "req_limited",
+    }
+    assert r.headers["Retry-After"] == "2"
+    assert r.headers["RateLimit-Limit"] == "3"
+    assert r.headers["RateLimit-Remaining"] == "0"
+
+    # Buckets are per principal and per scope set
+    other = {"Authorization": f"Bearer {make_token(sub='user2', scopes=('items:read',))}"}
+    assert client.get("/v1/items", headers=other).status_code == 200
+    write = auth_headers()
+    assert client.put("/v1/items/999999", json={"name": "x"}, headers=write).status_code == 404
@@ -0,0 +1,84 @@
+from __future__ import annotations
+import sqlite3
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import make_url
+
+from app.config import settings
+from app.infra import replicas
+from app.main import app
+from tests.conftest import bearer
+
+client = TestClient(app, raise_server_exceptions=False)
+
+# Present only in the replica copies, named after the replica holding it
+MARKER_ID = 10_000_000
+
+def route_count(engine: str, reason: str) -> float:
+    return REGISTRY.get_sample_value("db_read_routes_total", {"engine": engine, "reason": reason}) or 0.0
+
+def copy_primary(path, name: str) -> str:
+    """SQLite file copy of the primary standing in for a replica."""
+    primary = sqlite3.connect(make_url(settings.DATABASE_URL).database)
+    replica = sqlite3.connect(path)
+    try:
+        primary.backup(replica)
+        replica.execute(
+            "INSERT INTO items (id, name, version, created_at, updated_at) "
+            "VALUES (?, ?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)",
+            (MARKER_ID, name),
+        )
+        replica.commit()
+    finally:
+        replica.close()
+        primary.close()
+    return f"sqlite:///{path}"
+
+@pytest.fixture()
+def use_replicas(tmp_path):
+    original = replicas.replica_router
+
+    def install(*urls: str) -> replicas.ReplicaRouter:
+        router = replicas.build_replica_router(urls)
+        replicas.set_replica_router(router)
+        return router
+
+    yield install
+    replicas.set_replica_router(original)
+
+def test_reads_rotate_over_replicas_and_writers_read_their_writes(tmp_path, use_replicas):
+    use_replicas(copy_primary(tmp_path / "r0.db", "replica0"), copy_primary(tmp_path / "r1.db", "replica1"))
+    reader, writer = bearer("replica-reader"), bearer("replica-writer")
+    routed = route_count("replica0", "replica") + route_count("replica1", "replica")
+
+    names = {client.get(f"/v1/items/{MARKER_ID}", headers=reader).json()["name"] for _ in range(2)}
+    assert names == {"replica0", "replica1"}
+    assert client.get("/v1/items?limit=1", headers=reader).status_code == 200
+    assert route_count("replica0", "replica") + route_count("replica1", "replica") == routed + 3
+
+    created = client.post("/v1/items", json={"name": "fresh"}, headers={**writer, "Idempotency-Key": "replica-ryw"})
+    assert created.status_code == 201
+    sticky = route_count("primary", "sticky")
+    # The copies don't have the new item; the writer is sent to the primary
+    assert client.get(f"/v1/items/{created.json()['id']}", headers=writer).status_code == 200
+    assert client.get(f"/v1/items/{MARKER_ID}", headers=writer).status_code == 404
+    assert route_count("primary", "sticky") == sticky + 2
+    # Everyone else stays on the replicas
+    assert client.get(f"/v1/items/{MARKER_ID}", headers=reader).status_code == 200
+
+def test_failing_replica_is_ejected(tmp_path, use_replicas):
+    router = use_replicas(f"sqlite:///{tmp_path}/missing/r0.db", copy_primary(tmp_path / "r1.db", "replica1"))
+    reader = bearer("replica-reader")
+
+    statuses = [client.get(f"/v1/items/{MARKER_ID}", headers=reader).status_code for _ in range(4)]
+    assert statuses == [500, 200, 200, 200]
+    assert router.replicas[0].ejected_until > time.monotonic()
+    assert REGISTRY.get_sample_value("db_replica_ejections_total", {"engine": "replica0"}) >= 1
+
+    router.replicas[1].ejected_until = time.monotonic() + 60
+    no_replica = route_count("primary", "no_replica")
+    assert client.get(f"/v1/items/{MARKER_ID}", headers=reader).status_code == 404
+    assert route_count("primary", "no_replica") == no_replica + 1
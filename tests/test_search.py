@@ -0,0 +1,100 @@
+from __future__ import annotations
+from fastapi.testclient import TestClient
+
+from app.main import app
+from tests.conftest import bearer
+
+client = TestClient(app)
+
+def create(name: str) -> int:
+    r = client.post("/v1/items", json={"name": name}, headers={**bearer("search"), "Idempotency-Key": f"search-{name}"})
+    assert r.status_code == 201
+    return r.json()["id"]
+
+def search(q: str, **params) -> dict:
+    r = client.get("/v1/items", params={"q": q, **params}, headers=bearer("search"))
+    assert r.status_code == 200, r.text
+    return r.json()
+
+def names(body: dict) -> list[str]:
+    return [item["name"] for item in body["items"]]
+
+def test_prefix_and_multi_term_matching():
+    for name in ("Zephyrine lamp", "zephyr-table lamp", "desk zephyr", "zeppelin lamp"):
+        create(name)
+
+    assert sorted(names(search("zephyr"))) == ["Zephyrine lamp", "desk zephyr", "zephyr-table lamp"]
+    assert sorted(names(search("ZEPH lamp"))) == ["Zephyrine lamp", "zephyr-table lamp"]
+    # Terms match word starts only, and operators in q are just text
+    assert names(search("phyr")) == []
+    assert names(search('zeppelin" OR "desk')) == []
+
+def test_search_pages_forward_and_back():
+    ids = [create(f"quokka {i}") for i in range(5)]
+
+    seen, body = [], search("quokka", limit=2)
+    pages = [body]
+    while body["next_cursor"]:
+        seen += [item["id"] for item in body["items"]]
+        body = search("quokka", limit=2, cursor=body["next_cursor"])
+        pages.append(body)
+    seen += [item["id"] for item in body["items"]]
+
+    assert sorted(seen) == ids and len(set(seen)) == len(ids)
+    back = search("quokka", limit=2, cursor=pages[-1]["prev_cursor"])
+    assert back["items"] == pages[-2]["items"]
+
+def test_search_pages_through_every_match():
+    ids = {create(f"widget {i}") for i in range(120)}
+
+    seen, body = [], search("widget", limit=50)
+    while True:
+        seen += [item["id"] for item in body["items"]]
+        if not body["next_cursor"]:
+            break
+        body = search("widget", limit=50, cursor=body["next_cursor"])
+
+    assert len(seen) == 120 and set(seen) == ids
+
+def test_search_pages_stay_put_while_items_are_written():
+    ids = [create(f"axolotl {i}") for i in range(6)]
+    first = search("axolotl", limit=3)
+
+    # A new match and a renamed one land ahead of the cursor, not in later pages
+    create("axolotl tank")
+    client.put(f"/v1/items/{ids[0]}", json={"name": "axolotl renamed"}, headers=bearer("search"))
+    second = search("axolotl", limit=3, cursor=first["next_cursor"])
+
+    assert {item["id"] for item in first["items"] + second["items"]} == set(ids)
+    assert second["next_cursor"] is None
+
+def test_search_ranks_by_relevance():
+    create("gecko stand with a long description of the gecko")
+    create("gecko gecko gecko")
+    create("lamp for a gecko")
+
+    assert names(search("gecko"))[0] == "gecko gecko gecko"
+
+def test_index_follows_renames_and_deletes():
+    h = bearer("search")
+    item_id = create("wombat burrow")
+    client.put(f"/v1/items/{item_id}", json={"name": "numbat burrow"}, headers=h)
+    assert names(search("wombat")) == []
+    assert names(search("numbat")) == ["numbat burrow"]
+
+    client.delete(f"/v1/items/{item_id}", headers=h)
+    assert names(search("numbat")) == []
+
+def test_bad_queries_and_mismatched_cursors():
+    h = bearer("search")
+    create("platypus")
+    assert client.get("/v1/items", params={"q": "!!"}, headers=h).status_code == 400
+
+    listing = client.get("/v1/items", params={"limit": 1}, headers=h).json()
+    r = client.get("/v1/items", params={"q": "platypus", "cursor": listing["next_cursor"]}, headers=h)
+    assert r.status_code == 400
+
+    create("platypus two")
+    found = search("platypus", limit=1)
+    r = client.get("/v1/items", params={"cursor": found["next_cursor"]}, headers=h)
+    assert r.status_code == 400
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from app.infra import db
+from app.serve import Supervisor
+from tests.conftest import bearer
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_schema_is_checked_once_per_process(monkeypatch):
+    # conftest ran init_db; workers forked from a preloaded server skip it the same way
+    def fail() -> None:
+        raise AssertionError("init_db ran again")
+
+    monkeypatch.setattr(db, "init_db", fail)
+    db.ensure_schema()
+
+def test_replacement_worker_takes_the_free_slot():
+    supervisor = Supervisor(config=None, sock=None, workers=3, max_rss=0)
+    assert supervisor.free_slot() == 0
+    supervisor.slots = {101: 0, 102: 1, 103: 2}
+    # Slot 0, which runs the background jobs, is handed to whoever replaces its worker
+    del supervisor.slots[101]
+    assert supervisor.free_slot() == 0
+    supervisor.slots[104] = 0
+    del supervisor.slots[103]
+    assert supervisor.free_slot() == 2
+
+def test_workers_recycle_and_drain_on_sigterm():
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryFile("w+") as out:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "app.serve", "--workers", "2", "--port", str(port),
+             "--max-requests", "3", "--graceful-timeout", "10"],
+            env=os.environ.copy(),
+            stdout=out,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            for _ in range(200):
+                try:
+                    httpx.get(f"{base_url}/metrics")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.05)
+            # A connection each: recycled workers are replaced while requests keep coming
+            statuses = [httpx.get(f"{base_url}/metrics").status_code for _ in range(20)]
+            # Let workers that just reached their limit be replaced before the long-poll
+            time.sleep(0.5)
+
+            poll: dict = {}
+
+            def long_poll() -> None:
+                start = time.perf_counter()
+                r = httpx.get(f"{base_url}/v1/items/changes?wait=20", headers=bearer("serve", ("items:read",)), timeout=30)
+                poll.update(status=r.status_code, seconds=time.perf_counter() - start)
+
+            waiter = threading.Thread(target=long_poll)
+            waiter.start()
+            time.sleep(0.5)
+            proc.send_signal(signal.SIGTERM)
+            code = proc.wait(timeout=10)
+            waiter.join(5)
+        finally:
+            proc.kill()
+        out.seek(0)
+        log = out.read()
+
+    assert statuses == [200] * 20
+    assert log.count('"worker_exit"') >= 4
+    # Only the worker in slot 0 (first or replacement) runs compaction and the sweeper
+    startups = [line for line in log.splitlines() if '"startup"' in line]
+    assert sum('"background_jobs": true' in line for line in startups) >= 1
+    assert sum('"background_jobs": false' in line for line in startups) >= 1
+    # The open long-poll was answered instead of holding the drain for 20s
+    assert poll["status"] == 200 and poll["seconds"] < 5
+    assert code == 0 and "shutdown_complete" in log
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.config import settings
+from app.infra.middleware import RequestContextMiddleware
+from app.infra.profiling import ProfileMiddleware
+from app.main import app
+from tests.conftest import bearer
+
+def phase_count(path: str, phase: str) -> float:
+    return REGISTRY.get_sample_value(
+        "http_request_phase_duration_seconds_count", {"path": path, "phase": phase}
+    ) or 0.0
+
+def test_server_timing_and_phase_histograms():
+    client = TestClient(app)
+    before = {phase: phase_count("/v1/items", phase) for phase in ("auth", "db", "render")}
+
+    r = client.get("/v1/items?limit=5", headers=bearer("timing", ("items:read",)))
+
+    assert r.status_code == 200
+    timings = dict(entry.split(";dur=") for entry in r.headers["server-timing"].split(", "))
+    assert {"auth", "db", "render", "total"} <= timings.keys()
+    assert float(timings["db"]) <= float(timings["total"])
+    for phase, count in before.items():
+        assert phase_count("/v1/items", phase) == count + 1
+
+def test_render_phase_reported_without_fast_path(monkeypatch):
+    # response_model validation and serialization happen after the endpoint returns
+    monkeypatch.setattr(settings, "RESPONSE_FAST_PATH", False)
+    client = TestClient(app)
+
+    r = client.get("/v1/items?limit=5", headers=bearer("timing", ("items:read",)))
+
+    assert r.status_code == 200
+    assert "render;dur=" in r.headers["server-timing"]
+
+def burn_cpu(seconds: float) -> int:
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+def profiled_app() -> FastAPI:
+    profiled = FastAPI()
+
+    @profiled.get("/work", status_code=202)
+    async def work():
+        return {"n": burn_cpu(0.1)}
+
+    profiled.add_middleware(ProfileMiddleware, scope="debug:profile")
+    profiled.add_middleware(RequestContextMiddleware, timeout_ms=2000, phase_timing=True)
+    return profiled
+
+def test_profile_replaces_response_for_authorized_requests():
+    client = TestClient(profiled_app())
+
+    r = client.get("/work", headers={"X-Profile": "1", **bearer("timing", ("debug:profile",))})
+
+    assert r.status_code == 200
+    assert r.headers["x-profile-status"] == "202"
+    assert r.headers["content-disposition"].startswith("attachment")
+    assert int(r.headers["x-profile-samples"]) > 0
+    assert "burn_cpu (tests/test_timing.py" in r.text
+    # Folded stacks: "frame;frame;... count"
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in r.text.splitlines())
+
+def test_profile_header_ignored_without_scope():
+    client = TestClient(profiled_app())
+
+    r = client.get("/work", headers={"X-Profile": "1", **bearer("timing", ("items:read",))})
+
+    assert r.status_code == 202
+    assert "x-profile-status" not in r.headers